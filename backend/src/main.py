@@ -3,44 +3,66 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+import click
+from flask import Flask, current_app, send_from_directory
 from flask_cors import CORS
-from src.models.user import db
-from src.routes.user import user_bp
-from src.routes.auth import auth_bp
-from src.routes.forms import forms_bp
-from src.routes.admin import admin_bp
-from src.routes.data_init import data_init_bp
-
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'mofet_forms_secret_key_2025_secure'
-
-# Enable CORS for all routes
-CORS(app, supports_credentials=True)
-
-# Register blueprints
-app.register_blueprint(user_bp, url_prefix='/api/users')
-app.register_blueprint(auth_bp, url_prefix='/api/auth')
-app.register_blueprint(forms_bp, url_prefix='/api/forms')
-app.register_blueprint(admin_bp, url_prefix='/api/admin')
-app.register_blueprint(data_init_bp, url_prefix='/api/data')
-
-# Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-
-# Create database tables
-with app.app_context():
+from werkzeug.utils import import_string
+from src.services.database import init_database
+
+DATABASE_DIR = os.path.join(os.path.dirname(__file__), 'database')
+
+# Blueprints are imported by create_app(), not when this module is imported, so
+# tooling that only needs the factory (CLI discovery, worker preloading) stays cheap
+BLUEPRINTS = [
+    ('src.routes.auth:auth_bp', '/api/auth'),
+    ('src.routes.forms:forms_bp', '/api/forms'),
+    ('src.routes.admin:admin_bp', '/api/admin'),
+    ('src.routes.data_init:data_init_bp', '/api/data'),
+]
+
+def create_app(config=None):
+    """Build a configured application; does no schema work (see the init-db command)"""
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'mofet_forms_secret_key_2025_secure')
+
+    # Database configuration; DATABASE_URL in the environment overrides this SQLite default
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(DATABASE_DIR, 'app.db')}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    if config:
+        app.config.update(config)
+
+    # Enable CORS for all routes
+    CORS(app, supports_credentials=True)
+
+    init_database(app)
+
+    # Register blueprints
+    for import_name, url_prefix in BLUEPRINTS:
+        app.register_blueprint(import_string(import_name), url_prefix=url_prefix)
+
+    register_commands(app)
+    app.add_url_rule('/api/health', view_func=health_check, methods=['GET'])
+    app.add_url_rule('/', view_func=serve, defaults={'path': ''})
+    app.add_url_rule('/<path:path>', view_func=serve)
+    return app
+
+def init_db():
+    """Apply pending migrations and seed first-run data; safe to run repeatedly.
+
+    Must be called inside an application context.
+    """
+    from src.models.user import db, User, Form, FormStats
+    from src.services.migrations import upgrade
+    from src.services.search_index import rebuild_search_index, search_index_is_empty
+    from src.services.statistics import rebuild_form_stats
+
     # Create database directory if it doesn't exist
-    db_dir = os.path.join(os.path.dirname(__file__), 'database')
-    if not os.path.exists(db_dir):
-        os.makedirs(db_dir)
-    
-    db.create_all()
-    
+    if db.engine.dialect.name == 'sqlite' and not os.path.exists(DATABASE_DIR):
+        os.makedirs(DATABASE_DIR)
+
+    upgrade()
+
     # Create default admin user if no users exist
-    from src.models.user import User
     if User.query.count() == 0:
         admin_user = User(
             email='admin@mofet.com',
@@ -52,15 +74,95 @@ with app.app_context():
         admin_user.set_password('admin123')
         admin_user.otp_enabled = True
         admin_user.generate_otp_secret()
-        
+
         db.session.add(admin_user)
         db.session.commit()
         print("Default admin user created: admin@mofet.com / admin123")
 
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
+    # Databases created before FormStats existed need their counters seeded once
+    if FormStats.query.first() is None and Form.query.first() is not None:
+        rebuild_form_stats()
+    
+    # Migrations create the search table empty; its rows come from the application's tokenizer
+    if search_index_is_empty() and Form.query.first() is not None:
+        rebuild_search_index()
+
+def register_commands(app):
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Migrate the schema to the latest revision and seed the default admin"""
+        init_db()
+        print("Database is ready")
+
+    @app.cli.group('db')
+    def db_command():
+        """Versioned schema migrations"""
+
+    @db_command.command('upgrade')
+    @click.option('--to', 'target', default=None, help='Revision to stop at (default: latest)')
+    def db_upgrade(target):
+        """Apply pending migrations"""
+        from src.services.migrations import MigrationError, upgrade
+        try:
+            applied = upgrade(target)
+        except MigrationError as e:
+            raise click.ClickException(str(e))
+        print(f"Applied {len(applied)} migration(s)" if applied else "Already up to date")
+
+    @db_command.command('downgrade')
+    @click.option('--to', 'target', required=True, help="Revision to return to, or 'base' to revert everything")
+    def db_downgrade(target):
+        """Revert migrations newer than a revision"""
+        from src.services.migrations import MigrationError, downgrade
+        try:
+            reverted = downgrade(target)
+        except MigrationError as e:
+            raise click.ClickException(str(e))
+        print(f"Reverted {len(reverted)} migration(s)")
+
+    @db_command.command('current')
+    def db_current():
+        """Show the revision the database is at"""
+        from src.services.migrations import current_revision
+        print(current_revision())
+
+    @db_command.command('history')
+    def db_history():
+        """List migrations and whether each is applied"""
+        from src.services.migrations import applied_revisions, load_migrations
+        applied = set(applied_revisions())
+        for migration in load_migrations():
+            state = 'applied' if migration.revision in applied else 'pending'
+            print(f"{migration.revision} {state:8} {migration.description}")
+
+    @app.cli.command('rebuild-stats')
+    def rebuild_stats():
+        """Recompute the FormStats counters from scratch and report any drift"""
+        from src.services.statistics import rebuild_form_stats
+        drift = rebuild_form_stats()
+        if not drift:
+            print("Form statistics are in sync")
+            return
+        for (scope, key), (stored, actual) in sorted(drift.items()):
+            print(f"{scope}:{key} stored={stored} actual={actual}")
+        print(f"Corrected {len(drift)} drifted counter(s)")
+
+    @app.cli.command('rebuild-field-index')
+    def rebuild_field_index_command():
+        """Re-extract indexed form_data fields into FormFieldValue for every form"""
+        from src.services.field_index import rebuild_field_index
+        written = rebuild_field_index()
+        print(f"Indexed {written} field value(s)")
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index_command():
+        """Recreate the full-text search index from every form and approval comment"""
+        from src.services.search_index import rebuild_search_index
+        indexed = rebuild_search_index()
+        print(f"Indexed {indexed} form(s) for search")
+
 def serve(path):
-    static_folder_path = app.static_folder
+    static_folder_path = current_app.static_folder
     if static_folder_path is None:
         return "Static folder not configured", 404
 
@@ -73,10 +175,13 @@ def serve(path):
         else:
             return "index.html not found", 404
 
-@app.route('/api/health', methods=['GET'])
 def health_check():
     return {'status': 'healthy', 'message': 'Mofet Forms API is running'}, 200
 
 
 if __name__ == '__main__':
+    app = create_app()
+    # The development server prepares the schema itself; deployments run `flask init-db` once
+    with app.app_context():
+        init_db()
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,160 @@
+"""Baseline: the schema that db.create_all() and the startup backfills used to build.
+
+The tables below are a frozen copy of the models as they stood at this revision;
+later model changes belong in later migrations, never here. Databases created
+before migrations existed already have most of this schema: every step skips what
+is present, so upgrading them only records the revision and fills gaps (missing
+tables, nullable columns and indexes from these definitions).
+
+On SQLite the empty full-text search table is created here too. Its rows come
+from the application's tokenizer, so init-db fills it (see main.init_db).
+"""
+from datetime import datetime
+from sqlalchemy import (
+    JSON, Boolean, Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, Text,
+    UniqueConstraint
+)
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision = '0001'
+description = 'Baseline schema'
+
+JSONType = JSON().with_variant(JSONB(), 'postgresql')
+
+SEARCH_TABLE = 'form_search'
+
+metadata = MetaData()
+
+Table(
+    'user', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('email', String(120), unique=True, nullable=False),
+    Column('password_hash', String(255), nullable=False),
+    Column('full_name', String(100), nullable=False),
+    Column('phone', String(20), nullable=True),
+    Column('role', String(20), nullable=False, default='user'),
+    Column('is_active', Boolean, default=True),
+    Column('created_at', DateTime, default=datetime.utcnow),
+    Column('last_login', DateTime, nullable=True),
+    Column('otp_secret', String(32), nullable=True),
+    Column('otp_enabled', Boolean, default=False),
+)
+
+Table(
+    'form_template', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('name_hebrew', String(100), nullable=False),
+    Column('description', Text, nullable=True),
+    Column('form_type', String(50), nullable=False),
+    Column('fields_config', JSONType, nullable=False),
+    Column('approval_chain', JSONType, nullable=False),
+    Column('is_active', Boolean, default=True),
+    Column('created_at', DateTime, default=datetime.utcnow),
+    Column('updated_at', DateTime, default=datetime.utcnow),
+    Column('created_by', Integer, ForeignKey('user.id'), nullable=False),
+)
+
+Table(
+    'form', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('template_id', Integer, ForeignKey('form_template.id'), nullable=False),
+    Column('initiator_id', Integer, ForeignKey('user.id'), nullable=False),
+    Column('form_data', JSONType, nullable=False),
+    Column('status', String(20), nullable=False, default='pending'),
+    Column('current_step', Integer, default=0),
+    Column('created_at', DateTime, default=datetime.utcnow),
+    Column('updated_at', DateTime, default=datetime.utcnow),
+    Column('completed_at', DateTime, nullable=True),
+    Index('ix_form_initiator_created', 'initiator_id', 'created_at'),
+    Index('ix_form_status_created', 'status', 'created_at'),
+    Index('ix_form_template_status', 'template_id', 'status'),
+    Index('ix_form_created_id', 'created_at', 'id'),
+)
+
+Table(
+    'form_approval', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('form_id', Integer, ForeignKey('form.id'), nullable=False),
+    Column('approver_id', Integer, ForeignKey('user.id'), nullable=False),
+    Column('step_number', Integer, nullable=False),
+    Column('action', String(20), nullable=True),
+    Column('comments', Text, nullable=True),
+    Column('action_date', DateTime, nullable=True),
+    Column('is_additional', Boolean, default=False),
+    Column('added_by', Integer, ForeignKey('user.id'), nullable=True),
+    Index('ix_form_approval_approver_action', 'approver_id', 'action'),
+    Index('ix_form_approval_form_approver_action', 'form_id', 'approver_id', 'action'),
+)
+
+Table(
+    'form_field_value', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('form_id', Integer, ForeignKey('form.id'), nullable=False),
+    Column('field_name', String(100), nullable=False),
+    Column('value', String(500), nullable=False),
+    Index('ix_form_field_value_lookup', 'field_name', 'value', 'form_id'),
+    Index('ix_form_field_value_form', 'form_id'),
+)
+
+Table(
+    'form_stats', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('scope', String(20), nullable=False),
+    Column('key', String(50), nullable=False),
+    Column('count', Integer, nullable=False, default=0),
+    UniqueConstraint('scope', 'key', name='uq_form_stats_scope_key'),
+)
+
+Table(
+    'role', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(50), nullable=False, unique=True),
+    Column('name_hebrew', String(50), nullable=False),
+    Column('description', Text, nullable=True),
+    Column('permissions', JSONType, nullable=False),
+    Column('updated_at', DateTime, default=datetime.utcnow),
+)
+
+Table(
+    'user_role', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('user.id'), nullable=False),
+    Column('role_id', Integer, ForeignKey('role.id'), nullable=False),
+    Column('assigned_at', DateTime, default=datetime.utcnow),
+    Column('assigned_by', Integer, ForeignKey('user.id'), nullable=True),
+    Index('ix_user_role_role_user', 'role_id', 'user_id'),
+    Index('ix_user_role_user', 'user_id'),
+)
+
+Table(
+    'otp_code', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('user.id'), nullable=False),
+    Column('code', String(6), nullable=False),
+    Column('created_at', DateTime, default=datetime.utcnow),
+    Column('expires_at', DateTime, nullable=False),
+    Column('used', Boolean, default=False),
+    Index('ix_otp_code_user_code', 'user_id', 'code'),
+    Index('ix_otp_code_expires', 'expires_at'),
+)
+
+def upgrade(op):
+    for table in metadata.sorted_tables:
+        if not op.has_table(table.name):
+            op.create_table(table)
+            continue
+        # Legacy databases predate some nullable columns (e.g. the updated_at ETag stamps)
+        for column in table.columns:
+            if column.nullable and column.server_default is None:
+                op.add_column(table.name, column)
+        for index in table.indexes:
+            op.create_index(index.name, table.name, [column.name for column in index.columns], unique=index.unique)
+    # FTS5 (rowid = form.id) only exists on SQLite
+    if op.dialect == 'sqlite' and not op.has_table(SEARCH_TABLE):
+        op.execute(f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(content, comments, tokenize = 'unicode61')")
+
+def downgrade(op):
+    op.drop_table(SEARCH_TABLE)
+    for table in reversed(metadata.sorted_tables):
+        op.drop_table(table.name)
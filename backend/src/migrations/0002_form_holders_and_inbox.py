@@ -0,0 +1,98 @@
+"""Denormalized current approvers on Form and the FormInbox table behind pending_for_me"""
+from collections import defaultdict
+from sqlalchemy import (
+    JSON, Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, bindparam, delete,
+    insert, select, update
+)
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision = '0002'
+description = 'Form pending_step/current_approver_ids and form_inbox'
+
+JSONType = JSON().with_variant(JSONB(), 'postgresql')
+
+# Frozen definitions as of this revision, limited to the columns used here
+metadata = MetaData()
+Table('user', metadata, Column('id', Integer, primary_key=True))
+form = Table(
+    'form', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('status', String(20), nullable=False),
+    Column('current_step', Integer),
+    Column('created_at', DateTime),
+    Column('pending_step', Integer, nullable=True),
+    Column('current_approver_ids', JSONType, nullable=True),
+)
+form_approval = Table(
+    'form_approval', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('form_id', Integer, nullable=False),
+    Column('approver_id', Integer, nullable=False),
+    Column('step_number', Integer, nullable=False),
+    Column('action', String(20), nullable=True),
+)
+form_inbox = Table(
+    'form_inbox', metadata,
+    Column('user_id', Integer, ForeignKey('user.id'), primary_key=True),
+    Column('form_id', Integer, ForeignKey('form.id'), primary_key=True),
+    Column('form_created_at', DateTime, nullable=False),
+    Index('ix_form_inbox_user_created', 'user_id', 'form_created_at', 'form_id'),
+    Index('ix_form_inbox_form', 'form_id'),
+)
+
+def backfill_holders(connection, form_ids):
+    """Derive holders and inbox rows for a batch of forms from their pending approvals.
+
+    A pending form is held by the approvers still pending at its current step; every
+    pending approval, at any step, puts the form in that approver's inbox.
+    """
+    pending = defaultdict(list)
+    for form_id, step, approver_id in connection.execute(
+        select(form_approval.c.form_id, form_approval.c.step_number, form_approval.c.approver_id).where(
+            form_approval.c.form_id.in_(form_ids),
+            form_approval.c.action == 'pending'
+        )
+    ):
+        pending[form_id].append((step, approver_id))
+    rows = connection.execute(
+        select(form.c.id, form.c.status, form.c.current_step, form.c.created_at).where(form.c.id.in_(form_ids))
+    ).all()
+
+    holders = []
+    inbox = []
+    for row in rows:
+        approver_ids = sorted(
+            {approver_id for step, approver_id in pending[row.id] if step == row.current_step}
+        ) if row.status == 'pending' else []
+        holders.append({
+            'holder_form_id': row.id,
+            'holder_step': row.current_step if approver_ids else None,
+            'holder_ids': approver_ids,
+        })
+        inbox.extend(
+            {'user_id': approver_id, 'form_id': row.id, 'form_created_at': row.created_at}
+            for approver_id in dict.fromkeys(approver_id for _, approver_id in pending[row.id])
+        )
+    if holders:
+        connection.execute(
+            update(form).where(form.c.id == bindparam('holder_form_id')).values(
+                pending_step=bindparam('holder_step'),
+                current_approver_ids=bindparam('holder_ids')
+            ),
+            holders
+        )
+    connection.execute(delete(form_inbox).where(form_inbox.c.form_id.in_(form_ids)))
+    if inbox:
+        connection.execute(insert(form_inbox), inbox)
+
+def upgrade(op):
+    op.add_column('form', Column('pending_step', Integer, nullable=True))
+    op.add_column('form', Column('current_approver_ids', JSONType, nullable=True))
+    op.create_table(form_inbox)
+    # Every form is visited, so a re-run also repairs rows written while it was running
+    op.backfill('form', backfill_holders)
+
+def downgrade(op):
+    op.drop_table('form_inbox')
+    op.drop_column('form', 'current_approver_ids')
+    op.drop_column('form', 'pending_step')
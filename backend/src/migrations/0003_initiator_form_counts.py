@@ -0,0 +1,37 @@
+"""Per-initiator form counters in form_stats, behind the dashboard's my_forms figure"""
+from sqlalchemy import Column, Integer, MetaData, String, Table, cast, exists, func, insert, literal, select
+
+revision = '0003'
+description = 'Per-initiator form counts in form_stats'
+
+INITIATOR_SCOPE = 'initiator'
+
+# Frozen definitions as of this revision
+metadata = MetaData()
+form = Table(
+    'form', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('initiator_id', Integer, nullable=False),
+)
+form_stats = Table(
+    'form_stats', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('scope', String(20), nullable=False),
+    Column('key', String(50), nullable=False),
+    Column('count', Integer, nullable=False),
+)
+
+def upgrade(op):
+    op.execute(form_stats.delete().where(form_stats.c.scope == INITIATOR_SCOPE))
+    # Only databases whose counters are already seeded need the new scope filled in:
+    # an empty form_stats is rebuilt whole by init-db, which must still find it empty
+    seeded = exists(select(form_stats.c.id).where(form_stats.c.scope != INITIATOR_SCOPE))
+    op.execute(insert(form_stats).from_select(
+        ['scope', 'key', 'count'],
+        select(literal(INITIATOR_SCOPE), cast(form.c.initiator_id, String(50)), func.count(form.c.id))
+        .where(seeded)
+        .group_by(form.c.initiator_id)
+    ))
+
+def downgrade(op):
+    op.execute(form_stats.delete().where(form_stats.c.scope == INITIATOR_SCOPE))
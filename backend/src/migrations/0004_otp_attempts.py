@@ -0,0 +1,11 @@
+"""Failed verification attempts per OTP code, counted in the database so every worker shares them"""
+from sqlalchemy import Column, Integer
+
+revision = '0004'
+description = 'otp_code.attempts'
+
+def upgrade(op):
+    op.add_column('otp_code', Column('attempts', Integer, nullable=False, server_default='0'))
+
+def downgrade(op):
+    op.drop_column('otp_code', 'attempts')
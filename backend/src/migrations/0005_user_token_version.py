@@ -0,0 +1,11 @@
+"""Per-user token version, carried by refresh tokens so logout can revoke them"""
+from sqlalchemy import Column, Integer
+
+revision = '0005'
+description = 'user.token_version'
+
+def upgrade(op):
+    op.add_column('user', Column('token_version', Integer, nullable=False, server_default='0'))
+
+def downgrade(op):
+    op.drop_column('user', 'token_version')
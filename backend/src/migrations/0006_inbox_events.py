@@ -0,0 +1,25 @@
+"""inbox_event: the change log that carries inbox stream updates between worker processes"""
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table
+
+revision = '0006'
+description = 'inbox_event change log'
+
+# Frozen definitions as of this revision; the referenced tables only need their keys
+metadata = MetaData()
+Table('user', metadata, Column('id', Integer, primary_key=True))
+Table('form', metadata, Column('id', Integer, primary_key=True))
+inbox_event = Table(
+    'inbox_event', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('user.id'), nullable=False),
+    Column('form_id', Integer, ForeignKey('form.id'), nullable=False),
+    Column('change', String(10), nullable=False),
+    Column('created_at', DateTime, nullable=False),
+    Index('ix_inbox_event_created', 'created_at'),
+)
+
+def upgrade(op):
+    op.create_table(inbox_event)
+
+def downgrade(op):
+    op.drop_table('inbox_event')
@@ -1,10 +1,15 @@
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import joinedload
+from src.services.passwords import hash_password, needs_rehash, verify_password
 from datetime import datetime
 import secrets
 
 db = SQLAlchemy()
 
+# JSON everywhere, stored as binary JSONB on PostgreSQL
+JSONType = db.JSON().with_variant(JSONB(), 'postgresql')
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
@@ -20,15 +25,21 @@ class User(db.Model):
     otp_secret = db.Column(db.String(32), nullable=True)
     otp_enabled = db.Column(db.Boolean, default=False)
     
+    # Bumped on logout to revoke the refresh tokens issued so far
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
     # Relationships
     initiated_forms = db.relationship('Form', foreign_keys='Form.initiator_id', backref='initiator', lazy='dynamic')
-    approvals = db.relationship('FormApproval', backref='approver', lazy='dynamic')
+    approvals = db.relationship('FormApproval', foreign_keys='FormApproval.approver_id', backref='approver', lazy='dynamic')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return needs_rehash(self.password_hash)
     
     def generate_otp_secret(self):
         self.otp_secret = secrets.token_hex(16)
@@ -56,10 +67,11 @@ class FormTemplate(db.Model):
     name_hebrew = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
     form_type = db.Column(db.String(50), nullable=False)  # 'sms', 'software', 'tags'
-    fields_config = db.Column(db.JSON, nullable=False)  # JSON configuration of form fields
-    approval_chain = db.Column(db.JSON, nullable=False)  # JSON array of role IDs in order
+    fields_config = db.Column(JSONType, nullable=False)  # JSON configuration of form fields
+    approval_chain = db.Column(JSONType, nullable=False)  # JSON array of role IDs in order
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # Drives ETags
     created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
     # Relationships
@@ -82,15 +94,31 @@ class Form(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     template_id = db.Column(db.Integer, db.ForeignKey('form_template.id'), nullable=False)
     initiator_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    form_data = db.Column(db.JSON, nullable=False)  # JSON data of form fields
+    form_data = db.Column(JSONType, nullable=False)  # JSON data of form fields
     status = db.Column(db.String(20), nullable=False, default='pending')  # 'pending', 'approved', 'rejected', 'completed'
     current_step = db.Column(db.Integer, default=0)  # Current step in approval chain
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # Drives ETags
     completed_at = db.Column(db.DateTime, nullable=True)
+    # Denormalized by services.inbox: the step and approvers holding a pending form, else NULL / []
+    pending_step = db.Column(db.Integer, nullable=True)
+    current_approver_ids = db.Column(JSONType, nullable=True)
+    
+    __table_args__ = (
+        db.Index('ix_form_initiator_created', 'initiator_id', 'created_at'),
+        db.Index('ix_form_status_created', 'status', 'created_at'),
+        db.Index('ix_form_template_status', 'template_id', 'status'),
+        db.Index('ix_form_created_id', 'created_at', 'id'),
+    )
     
     # Relationships
     approvals = db.relationship('FormApproval', backref='form', lazy='dynamic', cascade='all, delete-orphan')
 
+    @classmethod
+    def query_for_listing(cls):
+        """Query that eager-loads everything to_dict() reads, so listings don't issue a SELECT per row"""
+        return cls.query.options(joinedload(cls.template), joinedload(cls.initiator))
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -101,10 +129,35 @@ class Form(db.Model):
             'form_data': self.form_data,
             'status': self.status,
             'current_step': self.current_step,
+            'pending_step': self.pending_step,
+            'current_approver_ids': self.current_approver_ids or [],
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None
         }
 
+class FormInbox(db.Model):
+    """One row per (user, form) while the user has a pending approval on the form, kept by services.inbox"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    form_id = db.Column(db.Integer, db.ForeignKey('form.id'), primary_key=True)
+    form_created_at = db.Column(db.DateTime, nullable=False)  # Copied from Form so the inbox is read in index order
+    
+    __table_args__ = (
+        db.Index('ix_form_inbox_user_created', 'user_id', 'form_created_at', 'form_id'),
+        db.Index('ix_form_inbox_form', 'form_id'),
+    )
+
+class InboxEvent(db.Model):
+    """Change log of inbox additions and removals, written with the change and polled by every worker's streams"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    form_id = db.Column(db.Integer, db.ForeignKey('form.id'), nullable=False)
+    change = db.Column(db.String(10), nullable=False)  # 'added' or 'removed'
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_inbox_event_created', 'created_at'),
+    )
+
 class FormApproval(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     form_id = db.Column(db.Integer, db.ForeignKey('form.id'), nullable=False)
@@ -115,6 +168,16 @@ class FormApproval(db.Model):
     action_date = db.Column(db.DateTime, nullable=True)
     is_additional = db.Column(db.Boolean, default=False)  # True if this is an additional approver
     added_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)  # Who added this approver
+
+    __table_args__ = (
+        db.Index('ix_form_approval_approver_action', 'approver_id', 'action'),
+        db.Index('ix_form_approval_form_approver_action', 'form_id', 'approver_id', 'action'),
+    )
+
+    @classmethod
+    def query_for_listing(cls):
+        """Query that eager-loads the approver read by to_dict()"""
+        return cls.query.options(joinedload(cls.approver))
     
     def to_dict(self):
         return {
@@ -129,12 +192,44 @@ class FormApproval(db.Model):
             'is_additional': self.is_additional
         }
 
+class FormFieldValue(db.Model):
+    """Values of template fields marked 'indexed', extracted from form_data by services.field_index"""
+    id = db.Column(db.Integer, primary_key=True)
+    form_id = db.Column(db.Integer, db.ForeignKey('form.id'), nullable=False)
+    field_name = db.Column(db.String(100), nullable=False)
+    value = db.Column(db.String(500), nullable=False)  # Normalized text; one row per value of multi-selects
+    
+    __table_args__ = (
+        # Covers field.<name>=<value> filters without touching the table
+        db.Index('ix_form_field_value_lookup', 'field_name', 'value', 'form_id'),
+        db.Index('ix_form_field_value_form', 'form_id'),
+    )
+
+class FormStats(db.Model):
+    """Materialized form counters, kept in step with form transitions by services.statistics"""
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(20), nullable=False)  # 'status', 'template', 'approver_pending'
+    key = db.Column(db.String(50), nullable=False)  # status name, template ID or approver user ID
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'key', name='uq_form_stats_scope_key'),
+    )
+    
+    def to_dict(self):
+        return {
+            'scope': self.scope,
+            'key': self.key,
+            'count': self.count
+        }
+
 class Role(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False, unique=True)
     name_hebrew = db.Column(db.String(50), nullable=False)
     description = db.Column(db.Text, nullable=True)
-    permissions = db.Column(db.JSON, nullable=False)  # JSON object with permissions
+    permissions = db.Column(JSONType, nullable=False)  # JSON object with permissions
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # Drives ETags
     
     def to_dict(self):
         return {
@@ -152,6 +247,11 @@ class UserRole(db.Model):
     assigned_at = db.Column(db.DateTime, default=datetime.utcnow)
     assigned_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     
+    __table_args__ = (
+        db.Index('ix_user_role_role_user', 'role_id', 'user_id'),
+        db.Index('ix_user_role_user', 'user_id'),
+    )
+    
     # Relationships
     user = db.relationship('User', foreign_keys=[user_id], backref='user_roles')
     role = db.relationship('Role', backref='user_assignments')
@@ -171,7 +271,13 @@ class OTPCode(db.Model):
     code = db.Column(db.String(6), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     expires_at = db.Column(db.DateTime, nullable=False)
-    used = db.Column(db.Boolean, default=False)
+    used = db.Column(db.Boolean, default=False)  # Set once verified or superseded by a newer code
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Failed verifications
+    
+    __table_args__ = (
+        db.Index('ix_otp_code_user_code', 'user_id', 'code'),
+        db.Index('ix_otp_code_expires', 'expires_at'),
+    )
     
     # Relationships
     user = db.relationship('User', backref='otp_codes')
@@ -183,6 +289,6 @@ class OTPCode(db.Model):
             'code': self.code,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'expires_at': self.expires_at.isoformat() if self.expires_at else None,
-            'used': self.used
+            'used': self.used,
+            'attempts': self.attempts
         }
-
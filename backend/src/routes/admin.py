@@ -1,20 +1,69 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from src.models.user import db, User, Role, UserRole, FormTemplate, Form, FormApproval
 from datetime import datetime
-from werkzeug.security import generate_password_hash
+from sqlalchemy import case, func
+from src.services.approvers import invalidate_role_approvers
+from src.services.statistics import get_form_summary
+from src.services.authorization import current_user_id, invalidate_principal, require_admin
+from src.services.export import export_chunks, export_lines
+from src.services.http_cache import conditional_json, make_etag
 
 admin_bp = Blueprint('admin', __name__)
 
-def require_admin(f):
-    """Decorator to require admin role"""
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return jsonify({'error': 'Authentication required'}), 401
-        if session.get('user_role') != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        return f(*args, **kwargs)
-    decorated_function.__name__ = f.__name__
-    return decorated_function
+FIELD_TYPES = [
+    {
+        'type': 'text',
+        'name': 'טקסט',
+        'description': 'שדה טקסט חופשי',
+        'properties': ['required', 'placeholder', 'maxLength', 'indexed']
+    },
+    {
+        'type': 'number',
+        'name': 'מספר',
+        'description': 'שדה מספרי',
+        'properties': ['required', 'min', 'max', 'placeholder', 'indexed']
+    },
+    {
+        'type': 'date',
+        'name': 'תאריך',
+        'description': 'בחירת תאריך',
+        'properties': ['required', 'minDate', 'maxDate', 'indexed']
+    },
+    {
+        'type': 'select',
+        'name': 'בחירה מרשימה',
+        'description': 'רשימה נפתחת',
+        'properties': ['required', 'options', 'multiple', 'indexed']
+    },
+    {
+        'type': 'textarea',
+        'name': 'טקסט ארוך',
+        'description': 'שדה טקסט מרובה שורות',
+        'properties': ['required', 'placeholder', 'rows', 'maxLength']
+    },
+    {
+        'type': 'checkbox',
+        'name': 'תיבת סימון',
+        'description': 'תיבת סימון בודדת',
+        'properties': ['required', 'label', 'indexed']
+    },
+    {
+        'type': 'radio',
+        'name': 'בחירה יחידה',
+        'description': 'כפתורי בחירה',
+        'properties': ['required', 'options', 'indexed']
+    },
+    {
+        'type': 'file',
+        'name': 'קובץ',
+        'description': 'העלאת קובץ',
+        'properties': ['required', 'accept', 'maxSize']
+    }
+]
+
+# The field type catalogue only changes with a deploy
+FIELD_TYPES_ETAG = make_etag('field_types', FIELD_TYPES)
+FIELD_TYPES_CACHE_CONTROL = 'private, max-age=3600'
 
 # User Management
 @admin_bp.route('/users', methods=['GET'])
@@ -24,13 +73,15 @@ def get_users():
         users = User.query.all()
         users_data = []
         
+        # Load all role assignments in one query instead of one per user
+        roles_by_user = {}
+        user_roles = db.session.query(UserRole.user_id, Role).join(Role).all()
+        for assigned_user_id, role in user_roles:
+            roles_by_user.setdefault(assigned_user_id, []).append({'id': role.id, 'name': role.name_hebrew})
+        
         for user in users:
             user_data = user.to_dict()
-            # Get user roles
-            user_roles = db.session.query(UserRole, Role).join(Role).filter(
-                UserRole.user_id == user.id
-            ).all()
-            user_data['roles'] = [{'id': role.id, 'name': role.name_hebrew} for _, role in user_roles]
+            user_data['roles'] = roles_by_user.get(user.id, [])
             users_data.append(user_data)
         
         return jsonify({'users': users_data}), 200
@@ -71,11 +122,12 @@ def create_user():
             user_role = UserRole(
                 user_id=user.id,
                 role_id=role_id,
-                assigned_by=session['user_id']
+                assigned_by=current_user_id()
             )
             db.session.add(user_role)
         
         db.session.commit()
+        invalidate_role_approvers()
         
         return jsonify({
             'message': 'User created successfully',
@@ -117,11 +169,13 @@ def update_user(user_id):
                 user_role = UserRole(
                     user_id=user.id,
                     role_id=role_id,
-                    assigned_by=session['user_id']
+                    assigned_by=current_user_id()
                 )
                 db.session.add(user_role)
         
         db.session.commit()
+        invalidate_role_approvers()
+        invalidate_principal(user.id)
         
         return jsonify({
             'message': 'User updated successfully',
@@ -138,12 +192,14 @@ def delete_user(user_id):
         user = User.query.get_or_404(user_id)
         
         # Don't allow deleting the current admin
-        if user.id == session['user_id']:
+        if user.id == current_user_id():
             return jsonify({'error': 'Cannot delete your own account'}), 400
         
         # Soft delete - deactivate instead of actual deletion
         user.is_active = False
         db.session.commit()
+        invalidate_role_approvers()
+        invalidate_principal(user.id)
         
         return jsonify({'message': 'User deactivated successfully'}), 200
         
@@ -155,8 +211,12 @@ def delete_user(user_id):
 @require_admin
 def get_roles():
     try:
-        roles = Role.query.all()
-        return jsonify({'roles': [role.to_dict() for role in roles]}), 200
+        # Any create, edit or delete changes the row count or the latest updated_at
+        count, last_updated = db.session.query(func.count(Role.id), func.max(Role.updated_at)).one()
+        return conditional_json(
+            make_etag('roles', count, last_updated),
+            lambda: {'roles': [role.to_dict() for role in Role.query.all()]}
+        )
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -230,34 +290,40 @@ def delete_role(role_id):
 @require_admin
 def get_system_overview():
     try:
+        form_summary = get_form_summary()
+        by_status = form_summary['by_status']
+        
+        total_users, active_users = db.session.query(
+            func.count(User.id),
+            func.sum(case((User.is_active == True, 1), else_=0))
+        ).one()
+        
+        templates = FormTemplate.query.filter_by(is_active=True).all()
+        
         stats = {
-            'total_users': User.query.count(),
-            'active_users': User.query.filter_by(is_active=True).count(),
-            'total_forms': Form.query.count(),
-            'pending_forms': Form.query.filter(Form.status.in_(['pending', 'awaiting_final_approval'])).count(),
-            'completed_forms': Form.query.filter_by(status='completed').count(),
-            'rejected_forms': Form.query.filter_by(status='rejected').count(),
-            'total_templates': FormTemplate.query.filter_by(is_active=True).count(),
+            'total_users': total_users,
+            'active_users': active_users or 0,
+            'total_forms': form_summary['total'],
+            'pending_forms': form_summary['pending'],
+            'completed_forms': by_status.get('completed', 0),
+            'rejected_forms': by_status.get('rejected', 0),
+            'total_templates': len(templates),
             'total_roles': Role.query.count()
         }
         
         # Forms by status
         stats['forms_by_status'] = {
-            'pending': Form.query.filter_by(status='pending').count(),
-            'awaiting_final_approval': Form.query.filter_by(status='awaiting_final_approval').count(),
-            'completed': Form.query.filter_by(status='completed').count(),
-            'rejected': Form.query.filter_by(status='rejected').count()
+            status: by_status.get(status, 0)
+            for status in ('pending', 'awaiting_final_approval', 'completed', 'rejected')
         }
         
         # Forms by template
         stats['forms_by_template'] = {}
-        templates = FormTemplate.query.filter_by(is_active=True).all()
         for template in templates:
-            count = Form.query.filter_by(template_id=template.id).count()
-            stats['forms_by_template'][template.name_hebrew] = count
+            stats['forms_by_template'][template.name_hebrew] = form_summary['by_template'].get(template.id, 0)
         
         # Recent activity
-        recent_forms = Form.query.order_by(Form.created_at.desc()).limit(5).all()
+        recent_forms = Form.query_for_listing().order_by(Form.created_at.desc()).limit(5).all()
         stats['recent_forms'] = [form.to_dict() for form in recent_forms]
         
         return jsonify({'statistics': stats}), 200
@@ -271,77 +337,25 @@ def get_system_overview():
 def get_available_field_types():
     """Get available field types for the form builder"""
     try:
-        field_types = [
-            {
-                'type': 'text',
-                'name': 'טקסט',
-                'description': 'שדה טקסט חופשי',
-                'properties': ['required', 'placeholder', 'maxLength']
-            },
-            {
-                'type': 'number',
-                'name': 'מספר',
-                'description': 'שדה מספרי',
-                'properties': ['required', 'min', 'max', 'placeholder']
-            },
-            {
-                'type': 'date',
-                'name': 'תאריך',
-                'description': 'בחירת תאריך',
-                'properties': ['required', 'minDate', 'maxDate']
-            },
-            {
-                'type': 'select',
-                'name': 'בחירה מרשימה',
-                'description': 'רשימה נפתחת',
-                'properties': ['required', 'options', 'multiple']
-            },
-            {
-                'type': 'textarea',
-                'name': 'טקסט ארוך',
-                'description': 'שדה טקסט מרובה שורות',
-                'properties': ['required', 'placeholder', 'rows', 'maxLength']
-            },
-            {
-                'type': 'checkbox',
-                'name': 'תיבת סימון',
-                'description': 'תיבת סימון בודדת',
-                'properties': ['required', 'label']
-            },
-            {
-                'type': 'radio',
-                'name': 'בחירה יחידה',
-                'description': 'כפתורי בחירה',
-                'properties': ['required', 'options']
-            },
-            {
-                'type': 'file',
-                'name': 'קובץ',
-                'description': 'העלאת קובץ',
-                'properties': ['required', 'accept', 'maxSize']
-            }
-        ]
-        
-        return jsonify({'field_types': field_types}), 200
-        
+        return conditional_json(FIELD_TYPES_ETAG, lambda: {'field_types': FIELD_TYPES}, FIELD_TYPES_CACHE_CONTROL)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @admin_bp.route('/backup/export', methods=['GET'])
 @require_admin
 def export_data():
-    """Export system data for backup"""
+    """Export system data for backup as streamed NDJSON, gzip-compressed with ?compress=gzip"""
     try:
-        export_data = {
-            'users': [user.to_dict() for user in User.query.all()],
-            'roles': [role.to_dict() for role in Role.query.all()],
-            'templates': [template.to_dict() for template in FormTemplate.query.all()],
-            'forms': [form.to_dict() for form in Form.query.all()],
-            'export_date': datetime.utcnow().isoformat()
-        }
-        
-        return jsonify(export_data), 200
+        compress = request.args.get('compress') == 'gzip'
+        filename = f"mofet-backup-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.ndjson"
+        if compress:
+            filename += '.gz'
+        
+        return Response(
+            stream_with_context(export_chunks(export_lines(db.session), compress)),
+            mimetype='application/gzip' if compress else 'application/x-ndjson',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-
@@ -1,6 +1,13 @@
 from flask import Blueprint, request, jsonify, session
-from src.models.user import db, User, OTPCode
-from datetime import datetime, timedelta
+from src.models.user import db, User
+from src.services.otp import OTP_LOCKED, OTP_VALID, allow_otp_resend, issue_otp, verify_otp_code
+from src.services.authorization import current_user_id, require_auth
+from src.services.sms import send_sms
+from src.services.tokens import (
+    access_token_max_age, get_request_claims, issue_access_token, issue_tokens, load_refresh_token,
+    revoke_refresh_tokens
+)
+from datetime import datetime
 import random
 import string
 
@@ -11,8 +18,8 @@ def generate_otp():
     return ''.join(random.choices(string.digits, k=6))
 
 def send_otp_sms(phone, code):
-    """Simulate sending OTP via SMS - in production, integrate with SMS service"""
-    print(f"SMS to {phone}: Your OTP code is {code}")
+    """Queue the OTP SMS; delivery and retries happen off the request thread"""
+    send_sms(phone, f"Your OTP code is {code}")
     return True
 
 @auth_bp.route('/login', methods=['POST'])
@@ -32,6 +39,10 @@ def login():
         if not user.is_active:
             return jsonify({'error': 'Account is deactivated'}), 401
         
+        # Upgrade hashes made under an older hashing policy while the plain password is at hand
+        if user.password_needs_rehash():
+            user.set_password(password)
+        
         # Update last login
         user.last_login = datetime.utcnow()
         db.session.commit()
@@ -45,16 +56,7 @@ def login():
         if user.otp_enabled and user.phone:
             # Generate and send OTP
             otp_code = generate_otp()
-            expires_at = datetime.utcnow() + timedelta(minutes=5)
-            
-            # Save OTP to database
-            otp = OTPCode(
-                user_id=user.id,
-                code=otp_code,
-                expires_at=expires_at
-            )
-            db.session.add(otp)
-            db.session.commit()
+            issue_otp(user.id, otp_code)
             
             # Send OTP via SMS
             send_otp_sms(user.phone, otp_code)
@@ -68,7 +70,8 @@ def login():
         return jsonify({
             'message': 'Login successful',
             'user': user.to_dict(),
-            'requires_otp': False
+            'requires_otp': False,
+            **issue_tokens(user)
         }), 200
         
     except Exception as e:
@@ -84,20 +87,18 @@ def verify_otp():
         if not user_id or not otp_code:
             return jsonify({'error': 'User ID and OTP code are required'}), 400
         
-        # Find valid OTP
-        otp = OTPCode.query.filter_by(
-            user_id=user_id,
-            code=otp_code,
-            used=False
-        ).filter(OTPCode.expires_at > datetime.utcnow()).first()
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid user ID'}), 400
         
-        if not otp:
+        # Codes are single use: a valid code is consumed here
+        result = verify_otp_code(user_id, str(otp_code))
+        if result == OTP_LOCKED:
+            return jsonify({'error': 'Too many verification attempts, please request a new code'}), 429
+        if result != OTP_VALID:
             return jsonify({'error': 'Invalid or expired OTP code'}), 401
         
-        # Mark OTP as used
-        otp.used = True
-        db.session.commit()
-        
         # Get user
         user = User.query.get(user_id)
         if not user:
@@ -111,7 +112,8 @@ def verify_otp():
         
         return jsonify({
             'message': 'OTP verified successfully',
-            'user': user.to_dict()
+            'user': user.to_dict(),
+            **issue_tokens(user)
         }), 200
         
     except Exception as e:
@@ -120,19 +122,50 @@ def verify_otp():
 @auth_bp.route('/logout', methods=['POST'])
 def logout():
     try:
+        # The caller is known from the session, a Bearer token or the refresh token being
+        # discarded; logging out revokes every refresh token the user holds
+        data = request.get_json(silent=True)
+        refresh_token = data.get('refresh_token') if isinstance(data, dict) else None
+        claims = get_request_claims() or load_refresh_token(refresh_token or '')
+        if claims:
+            user = User.query.get(claims['sub'])
+            if user:
+                revoke_refresh_tokens(user)
+                db.session.commit()
         session.clear()
         return jsonify({'message': 'Logged out successfully'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@auth_bp.route('/refresh', methods=['POST'])
+def refresh_token():
+    try:
+        data = request.get_json()
+        claims = load_refresh_token(data.get('refresh_token') or '')
+        if not claims:
+            return jsonify({'error': 'Invalid or expired refresh token'}), 401
+        
+        # Refreshing is the point where deactivated accounts lose access
+        user = User.query.get(claims['sub'])
+        if not user or not user.is_active:
+            return jsonify({'error': 'Account is deactivated'}), 401
+        if claims.get('ver') != user.token_version:
+            return jsonify({'error': 'Refresh token has been revoked'}), 401
+        
+        return jsonify({
+            'access_token': issue_access_token(user),
+            'token_type': 'Bearer',
+            'expires_in': access_token_max_age()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @auth_bp.route('/me', methods=['GET'])
+@require_auth
 def get_current_user():
     try:
-        user_id = session.get('user_id')
-        if not user_id:
-            return jsonify({'error': 'Not authenticated'}), 401
-        
-        user = User.query.get(user_id)
+        user = User.query.get(current_user_id())
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
@@ -154,18 +187,12 @@ def resend_otp():
         if not user or not user.phone:
             return jsonify({'error': 'User not found or no phone number'}), 404
         
-        # Generate new OTP
+        if not allow_otp_resend(user.id):
+            return jsonify({'error': 'Too many OTP requests, please try again later'}), 429
+        
+        # Generate new OTP; it replaces any code sent earlier
         otp_code = generate_otp()
-        expires_at = datetime.utcnow() + timedelta(minutes=5)
-        
-        # Save OTP to database
-        otp = OTPCode(
-            user_id=user.id,
-            code=otp_code,
-            expires_at=expires_at
-        )
-        db.session.add(otp)
-        db.session.commit()
+        issue_otp(user.id, otp_code)
         
         # Send OTP via SMS
         send_otp_sms(user.phone, otp_code)
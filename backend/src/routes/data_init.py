@@ -1,20 +1,17 @@
-from flask import Blueprint, jsonify, session
+from flask import Blueprint, current_app, jsonify
 from src.models.user import db, User, Role, UserRole, FormTemplate, Form, FormApproval
+from src.services.approvers import invalidate_role_approvers, resolve_approval_chain
+from src.services.field_index import index_forms
+from src.services.inbox import refresh_form_holders
+from src.services.migrations import BASE_REVISION, downgrade, upgrade
+from src.services.search_index import index_new_forms
+from src.services.statistics import rebuild_form_stats
+from src.services.authorization import invalidate_principal, require_admin
+from src.services.passwords import hash_passwords
 from datetime import datetime
 
 data_init_bp = Blueprint('data_init', __name__)
 
-def require_admin(f):
-    """Decorator to require admin role"""
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return jsonify({'error': 'Authentication required'}), 401
-        if session.get('user_role') != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        return f(*args, **kwargs)
-    decorated_function.__name__ = f.__name__
-    return decorated_function
-
 @data_init_bp.route('/initialize-sample-data', methods=['POST'])
 @require_admin
 def initialize_sample_data():
@@ -141,8 +138,11 @@ def initialize_sample_data():
             }
         ]
         
+        # Hash all sample passwords concurrently rather than one after another
+        password_hashes = hash_passwords([user_data['password'] for user_data in users_data])
+        
         created_users = {}
-        for user_data in users_data:
+        for user_data, password_hash in zip(users_data, password_hashes):
             # Check if user already exists
             existing_user = User.query.filter_by(email=user_data['email']).first()
             if existing_user:
@@ -156,7 +156,7 @@ def initialize_sample_data():
                 role=user_data['role'],
                 is_active=True
             )
-            user.set_password(user_data['password'])
+            user.password_hash = password_hash
             
             # Enable OTP for admin
             if user.role == 'admin':
@@ -198,6 +198,7 @@ def initialize_sample_data():
                         'type': 'select',
                         'required': True,
                         'options': ['מתקן א', 'מתקן ב', 'מתקן ג', 'מתקן ד'],
+                        'indexed': True,
                         'order': 2
                     },
                     {
@@ -212,6 +213,7 @@ def initialize_sample_data():
                         'label': 'שם ההודעה',
                         'type': 'text',
                         'required': True,
+                        'indexed': True,
                         'order': 4
                     },
                     {
@@ -233,6 +235,7 @@ def initialize_sample_data():
                         'label': 'שם התג',
                         'type': 'text',
                         'required': True,
+                        'indexed': True,
                         'order': 7
                     }
                 ],
@@ -256,6 +259,7 @@ def initialize_sample_data():
                         'label': 'שם התוכנה',
                         'type': 'text',
                         'required': True,
+                        'indexed': True,
                         'order': 2
                     },
                     {
@@ -264,6 +268,7 @@ def initialize_sample_data():
                         'type': 'select',
                         'required': True,
                         'options': ['הוספה', 'שינוי', 'מחיקה', 'עדכון'],
+                        'indexed': True,
                         'order': 3
                     },
                     {
@@ -301,6 +306,7 @@ def initialize_sample_data():
                         'label': 'שם התג',
                         'type': 'text',
                         'required': True,
+                        'indexed': True,
                         'order': 2
                     },
                     {
@@ -309,6 +315,7 @@ def initialize_sample_data():
                         'type': 'select',
                         'required': True,
                         'options': ['אנלוגי', 'דיגיטלי', 'מחרוזת', 'בוליאני'],
+                        'indexed': True,
                         'order': 3
                     },
                     {
@@ -383,6 +390,9 @@ def initialize_sample_data():
             }
         ]
         
+        # The users and role assignments above are new, so rebuild the approver index
+        invalidate_role_approvers()
+        
         for form_data in sample_forms:
             form = Form(**form_data)
             db.session.add(form)
@@ -390,25 +400,24 @@ def initialize_sample_data():
             
             # Create approval records
             template = FormTemplate.query.get(form_data['template_id'])
-            for step, role_id in enumerate(template.approval_chain):
-                # Find a user with this role
-                user_with_role = db.session.query(User).join(UserRole).filter(
-                    UserRole.role_id == role_id,
-                    User.is_active == True
-                ).first()
-                
-                if user_with_role:
-                    approval = FormApproval(
-                        form_id=form.id,
-                        approver_id=user_with_role.id,
-                        step_number=step,
-                        action='approved' if form_data['status'] == 'completed' else 'pending',
-                        action_date=datetime.utcnow() if form_data['status'] == 'completed' else None
-                    )
-                    db.session.add(approval)
+            index_forms([(form.id, template, form.form_data)])
+            index_new_forms([(form.id, template, form.form_data)])
+            for step, approver_id in resolve_approval_chain(template.approval_chain):
+                approval = FormApproval(
+                    form_id=form.id,
+                    approver_id=approver_id,
+                    step_number=step,
+                    action='approved' if form_data['status'] == 'completed' else 'pending',
+                    action_date=datetime.utcnow() if form_data['status'] == 'completed' else None
+                )
+                db.session.add(approval)
+            refresh_form_holders([form])
         
         db.session.commit()
         
+        # Sample forms are inserted directly, so recount the statistics counters
+        rebuild_form_stats()
+        
         return jsonify({
             'message': 'Sample data initialized successfully',
             'created': {
@@ -421,6 +430,7 @@ def initialize_sample_data():
         
     except Exception as e:
         db.session.rollback()
+        invalidate_role_approvers()
         return jsonify({'error': str(e)}), 500
 
 @data_init_bp.route('/reset-database', methods=['POST'])
@@ -428,9 +438,18 @@ def initialize_sample_data():
 def reset_database():
     """Reset the database (for development only)"""
     try:
-        # Drop all tables and recreate
-        db.drop_all()
-        db.create_all()
+        # Wipes every table, so only where explicitly enabled; schema changes go through `flask db upgrade`
+        if not (current_app.debug or current_app.config.get('ALLOW_DATABASE_RESET')):
+            return jsonify({'error': 'Database reset is disabled on this server'}), 403
+        
+        # Revert every migration and re-apply them, outside the request's open transaction.
+        # Upgrading first records the baseline on databases that predate migrations.
+        db.session.close()
+        upgrade(log=current_app.logger.info)
+        downgrade(BASE_REVISION, log=current_app.logger.info)
+        upgrade(log=current_app.logger.info)
+        invalidate_role_approvers()
+        invalidate_principal()
         
         return jsonify({'message': 'Database reset successfully'}), 200
         
@@ -1,38 +1,106 @@
-from flask import Blueprint, request, jsonify, session
-from src.models.user import db, User, FormTemplate, Form, FormApproval, UserRole, Role
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from src.models.user import db, User, FormTemplate, Form, FormApproval, FormInbox
+from src.services.approvers import resolve_approval_chain
+from src.services.statistics import (
+    get_form_count_for_initiator, get_form_summary, get_pending_count_for_approver, record_forms_created,
+    record_pending_approval, record_status_change, record_status_changes
+)
+from src.services.inbox import inbox_rows, new_form_holders, refresh_form_holders
+from src.services.inbox_stream import (
+    DEFAULT_INBOX_STREAM_HEARTBEAT_SECONDS, DEFAULT_INBOX_STREAM_POLL_SECONDS, DEFAULT_INBOX_STREAM_QUEUE_SIZE,
+    broker as inbox_broker, record_inbox_changes, stream_inbox, streaming_supported
+)
+from src.services.notifications import notify_users
+from src.services.tokens import accepts_query_token
+from src.services.authorization import (
+    can_view_form, current_user_id, current_user_role, require_admin, require_auth
+)
 from datetime import datetime
-from sqlalchemy import or_, and_
+from src.services.field_index import (
+    apply_field_filters, get_searchable_fields, index_forms, indexed_fields, parse_field_filters,
+    rebuild_field_index
+)
+from src.services.form_validation import validate_fields_config, validate_form_data
+from src.services.search_index import (
+    build_match_query, index_new_forms, is_search_supported, refresh_search_entries,
+    refresh_template_search_entries, search_matches
+)
+from src.services.http_cache import conditional_json, make_etag
+from sqlalchemy import or_, and_, func, insert
+import base64
 
 forms_bp = Blueprint('forms', __name__)
 
-def require_auth(f):
-    """Decorator to require authentication"""
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return jsonify({'error': 'Authentication required'}), 401
-        return f(*args, **kwargs)
-    decorated_function.__name__ = f.__name__
-    return decorated_function
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+STREAM_BATCH_SIZE = 500
+MAX_BULK_FORMS = 1000
+MAX_BATCH_ACTIONS = 500
 
-def require_admin(f):
-    """Decorator to require admin role"""
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return jsonify({'error': 'Authentication required'}), 401
-        if session.get('user_role') != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        return f(*args, **kwargs)
-    decorated_function.__name__ = f.__name__
-    return decorated_function
+def is_valid_id(value):
+    """True for integer IDs from JSON; bool is excluded because it subclasses int"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def parse_limit(value):
+    """Page size from a ?limit= value, capped at MAX_PAGE_SIZE; None when absent.
+
+    Raises ValueError unless the value is a positive integer.
+    """
+    if value is None:
+        return None
+    limit = int(value)
+    if limit < 1:
+        raise ValueError(value)
+    return min(limit, MAX_PAGE_SIZE)
+
+def encode_cursor(form):
+    """Encode the (created_at, id) keyset position of a form as an opaque cursor"""
+    raw = f"{form.created_at.isoformat()}|{form.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor, raising ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, form_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(form_id)
+    except (UnicodeError, TypeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+def filter_visible_forms(query, user_id, user_role):
+    """Restrict non-admins to forms they initiated or are an approver on"""
+    if user_role == 'admin':
+        return query
+    return query.filter(
+        or_(
+            Form.initiator_id == user_id,
+            Form.id.in_(
+                db.session.query(FormApproval.form_id).filter(
+                    FormApproval.approver_id == user_id
+                )
+            )
+        )
+    )
+
+def stream_forms_ndjson(query):
+    """Yield one JSON line per form, fetching rows from the database in batches"""
+    for form in query.yield_per(STREAM_BATCH_SIZE):
+        yield current_app.json.dumps(form.to_dict()) + '\n'
 
 @forms_bp.route('/templates', methods=['GET'])
 @require_auth
 def get_form_templates():
     try:
-        templates = FormTemplate.query.filter_by(is_active=True).all()
-        return jsonify({
-            'templates': [template.to_dict() for template in templates]
-        }), 200
+        # Any create, edit or deactivation changes the row count or the latest updated_at
+        count, last_updated = db.session.query(
+            func.count(FormTemplate.id), func.max(FormTemplate.updated_at)
+        ).one()
+        
+        def build_payload():
+            templates = FormTemplate.query.filter_by(is_active=True).all()
+            return {'templates': [template.to_dict() for template in templates]}
+        
+        return conditional_json(make_etag('templates', count, last_updated), build_payload)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -42,6 +110,10 @@ def create_form_template():
     try:
         data = request.get_json()
         
+        config_errors = validate_fields_config(data.get('fields_config'))
+        if config_errors:
+            return jsonify({'error': 'Invalid fields_config', 'details': config_errors}), 400
+        
         template = FormTemplate(
             name=data.get('name'),
             name_hebrew=data.get('name_hebrew'),
@@ -49,7 +121,7 @@ def create_form_template():
             form_type=data.get('form_type'),
             fields_config=data.get('fields_config'),
             approval_chain=data.get('approval_chain'),
-            created_by=session['user_id']
+            created_by=current_user_id()
         )
         
         db.session.add(template)
@@ -69,6 +141,13 @@ def update_form_template(template_id):
     try:
         template = FormTemplate.query.get_or_404(template_id)
         data = request.get_json()
+        previously_indexed = indexed_fields(template.fields_config)
+        previous_names = (template.name, template.name_hebrew)
+        
+        if 'fields_config' in data:
+            config_errors = validate_fields_config(data['fields_config'])
+            if config_errors:
+                return jsonify({'error': 'Invalid fields_config', 'details': config_errors}), 400
         
         template.name = data.get('name', template.name)
         template.name_hebrew = data.get('name_hebrew', template.name_hebrew)
@@ -77,8 +156,15 @@ def update_form_template(template_id):
         template.fields_config = data.get('fields_config', template.fields_config)
         template.approval_chain = data.get('approval_chain', template.approval_chain)
         
+        # Template names are part of every one of its forms' search text
+        if (template.name, template.name_hebrew) != previous_names:
+            refresh_template_search_entries(template.id)
         db.session.commit()
         
+        # Existing forms only gain or lose index rows when the indexed fields change
+        if indexed_fields(template.fields_config) != previously_indexed:
+            rebuild_field_index(template.id)
+        
         return jsonify({
             'message': 'Form template updated successfully',
             'template': template.to_dict()
@@ -110,37 +196,52 @@ def create_form():
         
         template = FormTemplate.query.get_or_404(template_id)
         
+        field_errors = validate_form_data(template, form_data)
+        if field_errors:
+            return jsonify({'error': 'Invalid form data', 'field_errors': field_errors}), 400
+        
+        approval_steps = resolve_approval_chain(template.approval_chain)
+        pending_step, current_approver_ids = new_form_holders(approval_steps)
+        
         form = Form(
             template_id=template_id,
-            initiator_id=session['user_id'],
+            initiator_id=current_user_id(),
             form_data=form_data,
             status='pending',
-            current_step=0
+            current_step=0,
+            pending_step=pending_step,
+            current_approver_ids=current_approver_ids
         )
         
         db.session.add(form)
         db.session.flush()  # Get the form ID
+        index_forms([(form.id, template, form_data)])
+        index_new_forms([(form.id, template, form_data)])
         
         # Create approval records based on template's approval chain
-        for step, role_id in enumerate(template.approval_chain):
-            # Find users with this role
-            users_with_role = db.session.query(User).join(UserRole).filter(
-                UserRole.role_id == role_id,
-                User.is_active == True
-            ).all()
-            
-            # For now, assign to the first user with this role
-            # In a real system, you might have more complex logic
-            if users_with_role:
-                approval = FormApproval(
-                    form_id=form.id,
-                    approver_id=users_with_role[0].id,
-                    step_number=step,
-                    action='pending'
-                )
-                db.session.add(approval)
+        for step, approver_id in approval_steps:
+            approval = FormApproval(
+                form_id=form.id,
+                approver_id=approver_id,
+                step_number=step,
+                action='pending'
+            )
+            db.session.add(approval)
+        
+        inbox = inbox_rows(form.id, form.created_at, approval_steps)
+        if inbox:
+            db.session.execute(insert(FormInbox), inbox)
         
+        record_forms_created(
+            [form.template_id],
+            [approver_id for _, approver_id in approval_steps],
+            form.initiator_id,
+            status=form.status
+        )
+        events = [('approval_requested', form.id, [a for step, a in approval_steps if step == 0])]
+        record_inbox_changes([(a, 'added', form.id) for _, a in approval_steps])
         db.session.commit()
+        notify_users(events)
         
         return jsonify({
             'message': 'Form created successfully',
@@ -150,94 +251,399 @@ def create_form():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@forms_bp.route('/bulk', methods=['POST'])
+@require_auth
+def create_forms_bulk():
+    """Create many forms in one transaction and report the outcome of each item"""
+    try:
+        data = request.get_json()
+        items = data.get('forms') if isinstance(data, dict) else data
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'A non-empty list of forms is required'}), 400
+        if len(items) > MAX_BULK_FORMS:
+            return jsonify({'error': f'At most {MAX_BULK_FORMS} forms can be submitted at once'}), 400
+        
+        user_id = current_user_id()
+        
+        # Load every referenced template once
+        template_ids = {
+            item.get('template_id') for item in items
+            if isinstance(item, dict) and is_valid_id(item.get('template_id'))
+        }
+        templates = {
+            template.id: template
+            for template in FormTemplate.query.filter(
+                FormTemplate.id.in_(template_ids),
+                FormTemplate.is_active == True
+            ).all()
+        }
+        
+        results = []
+        valid_items = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                results.append({'index': index, 'error': 'Item must be an object'})
+            elif not is_valid_id(item.get('template_id')):
+                results.append({'index': index, 'error': 'template_id must be an integer'})
+            elif item.get('template_id') not in templates:
+                results.append({'index': index, 'error': 'Form template not found'})
+            elif not isinstance(item.get('form_data'), dict):
+                results.append({'index': index, 'error': 'form_data must be an object'})
+            elif field_errors := validate_form_data(templates[item['template_id']], item['form_data']):
+                results.append({'index': index, 'error': 'Invalid form data', 'field_errors': field_errors})
+            else:
+                result = {'index': index}
+                results.append(result)
+                valid_items.append((result, item))
+        
+        if valid_items:
+            # Resolve each template's approvers once, not once per form
+            approval_steps = {
+                template.id: resolve_approval_chain(template.approval_chain)
+                for template in templates.values()
+            }
+            
+            holders = {
+                template_id: new_form_holders(steps)
+                for template_id, steps in approval_steps.items()
+            }
+            created_forms = db.session.execute(
+                insert(Form).returning(Form.id, Form.created_at, sort_by_parameter_order=True),
+                [
+                    {
+                        'template_id': item['template_id'],
+                        'initiator_id': user_id,
+                        'form_data': item['form_data'],
+                        'status': 'pending',
+                        'current_step': 0,
+                        'pending_step': holders[item['template_id']][0],
+                        'current_approver_ids': holders[item['template_id']][1]
+                    }
+                    for _, item in valid_items
+                ]
+            ).all()
+            
+            approval_rows = []
+            inbox = []
+            approver_ids = []
+            events = []
+            inbox_changes = []
+            for (result, item), (form_id, created_at) in zip(valid_items, created_forms):
+                result['form_id'] = form_id
+                inbox.extend(inbox_rows(form_id, created_at, approval_steps[item['template_id']]))
+                events.append((
+                    'approval_requested',
+                    form_id,
+                    [a for step, a in approval_steps[item['template_id']] if step == 0]
+                ))
+                for step, approver_id in approval_steps[item['template_id']]:
+                    approval_rows.append({
+                        'form_id': form_id,
+                        'approver_id': approver_id,
+                        'step_number': step,
+                        'action': 'pending'
+                    })
+                    approver_ids.append(approver_id)
+                    inbox_changes.append((approver_id, 'added', form_id))
+            
+            if approval_rows:
+                db.session.execute(insert(FormApproval), approval_rows)
+            if inbox:
+                db.session.execute(insert(FormInbox), inbox)
+            created = [
+                (result['form_id'], templates[item['template_id']], item['form_data'])
+                for result, item in valid_items
+            ]
+            index_forms(created)
+            index_new_forms(created)
+            
+            record_forms_created([item['template_id'] for _, item in valid_items], approver_ids, user_id)
+            record_inbox_changes(inbox_changes)
+            db.session.commit()
+            notify_users(events)
+        
+        return jsonify({
+            'message': f'{len(valid_items)} of {len(items)} forms created',
+            'created': len(valid_items),
+            'failed': len(items) - len(valid_items),
+            'results': results
+        }), 201 if valid_items else 400
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @forms_bp.route('/', methods=['GET'])
 @require_auth
 def get_forms():
     try:
-        user_id = session['user_id']
-        user_role = session['user_role']
+        user_id = current_user_id()
+        user_role = current_user_role()
         
         # Get query parameters
         status = request.args.get('status')
         my_forms_only = request.args.get('my_forms_only', 'false').lower() == 'true'
         pending_for_me = request.args.get('pending_for_me', 'false').lower() == 'true'
         
-        query = Form.query
+        query = Form.query_for_listing()
         
         if my_forms_only:
             # Only forms initiated by current user
             query = query.filter(Form.initiator_id == user_id)
         elif pending_for_me:
-            # Only forms pending approval by current user
-            query = query.join(FormApproval).filter(
-                FormApproval.approver_id == user_id,
-                FormApproval.action == 'pending'
-            )
-        elif user_role != 'admin':
+            # Only forms pending approval by current user, read from the inbox index
+            query = query.join(FormInbox, FormInbox.form_id == Form.id).filter(FormInbox.user_id == user_id)
+        else:
             # Regular users see only their forms and forms they need to approve
+            query = filter_visible_forms(query, user_id, user_role)
+        
+        if status:
+            query = query.filter(Form.status == status)
+        
+        field_filters = parse_field_filters(request.args)
+        if field_filters:
+            searchable_fields = get_searchable_fields()
+            unknown = sorted(set(field_filters) - set(searchable_fields))
+            if unknown:
+                return jsonify({'error': f"Fields are not indexed: {', '.join(unknown)}"}), 400
+            query = apply_field_filters(query, field_filters, searchable_fields)
+        
+        # Newest first; id breaks ties between forms created in the same instant.
+        # The inbox keeps copies of both, so its listing is served in index order.
+        if pending_for_me and not my_forms_only:
+            sort_created_at, sort_id = FormInbox.form_created_at, FormInbox.form_id
+        else:
+            sort_created_at, sort_id = Form.created_at, Form.id
+        query = query.order_by(sort_created_at.desc(), sort_id.desc())
+        
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                cursor_created_at, cursor_id = decode_cursor(cursor)
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
             query = query.filter(
                 or_(
-                    Form.initiator_id == user_id,
-                    and_(
-                        Form.id.in_(
-                            db.session.query(FormApproval.form_id).filter(
-                                FormApproval.approver_id == user_id
-                            )
-                        )
-                    )
+                    sort_created_at < cursor_created_at,
+                    and_(sort_created_at == cursor_created_at, sort_id < cursor_id)
                 )
             )
         
+        if request.args.get('format') == 'ndjson':
+            return Response(
+                stream_with_context(stream_forms_ndjson(query)),
+                mimetype='application/x-ndjson'
+            )
+        
+        try:
+            limit = parse_limit(request.args.get('limit'))
+        except ValueError:
+            return jsonify({'error': 'limit must be a positive integer'}), 400
+        if limit is None and not cursor:
+            forms = query.all()
+            return jsonify({
+                'forms': [form.to_dict() for form in forms]
+            }), 200
+        
+        limit = limit or DEFAULT_PAGE_SIZE
+        
+        # Fetch one extra row to know whether another page exists
+        forms = query.limit(limit + 1).all()
+        has_more = len(forms) > limit
+        forms = forms[:limit]
+        
+        return jsonify({
+            'forms': [form.to_dict() for form in forms],
+            'next_cursor': encode_cursor(forms[-1]) if has_more else None
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@forms_bp.route('/search', methods=['GET'])
+@require_auth
+def search_forms():
+    """Full-text search over form contents and approval comments, best matches first"""
+    try:
+        if not is_search_supported():
+            return jsonify({'error': 'Search is not available on this database'}), 501
+        
+        match_query = build_match_query(request.args.get('q'))
+        if not match_query:
+            return jsonify({'error': 'Search query is required'}), 400
+        
+        try:
+            limit = parse_limit(request.args.get('limit')) or DEFAULT_PAGE_SIZE
+        except ValueError:
+            return jsonify({'error': 'limit must be a positive integer'}), 400
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        
+        matches = search_matches(match_query)
+        query = Form.query_for_listing().join(matches, matches.c.form_id == Form.id)
+        query = filter_visible_forms(query, current_user_id(), current_user_role())
+        
+        status = request.args.get('status')
         if status:
             query = query.filter(Form.status == status)
         
-        forms = query.order_by(Form.created_at.desc()).all()
+        # Fetch one extra row to know whether another page exists
+        rows = query.add_columns(matches.c.rank).order_by(
+            matches.c.rank, Form.id.desc()
+        ).offset(offset).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
         
         return jsonify({
-            'forms': [form.to_dict() for form in forms]
+            'forms': [dict(form.to_dict(), search_rank=rank) for form, rank in rows],
+            'next_offset': offset + limit if has_more else None
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@forms_bp.route('/<int:form_id>', methods=['GET'])
+@forms_bp.route('/inbox/stream', methods=['GET'])
+@accepts_query_token
 @require_auth
-def get_form(form_id):
+def stream_inbox_updates():
+    """Server-Sent Events stream of changes to the current user's pending approvals.
+
+    EventSource cannot set headers, so token clients pass ?access_token=.
+    """
     try:
-        form = Form.query.get_or_404(form_id)
-        
-        # Check if user has access to this form
-        user_id = session['user_id']
-        user_role = session['user_role']
+        if not streaming_supported(request.environ):
+            return jsonify({'error': 'Streaming requires a threaded or gevent worker'}), 503
+        
+        user_id = current_user_id()
+        config = current_app.config
+        inbox_broker.start(
+            current_app._get_current_object(),
+            config.get('INBOX_STREAM_POLL_SECONDS', DEFAULT_INBOX_STREAM_POLL_SECONDS)
+        )
         
-        has_access = (
-            user_role == 'admin' or
-            form.initiator_id == user_id or
-            FormApproval.query.filter_by(form_id=form_id, approver_id=user_id).first()
+        # Subscribe before reading the snapshot so no change can fall between the two
+        subscription = inbox_broker.subscribe(
+            user_id, config.get('INBOX_STREAM_QUEUE_SIZE', DEFAULT_INBOX_STREAM_QUEUE_SIZE)
+        )
+        try:
+            snapshot = {'pending_for_me': get_pending_count_for_approver(user_id)}
+        except Exception:
+            inbox_broker.unsubscribe(subscription)
+            raise
+        
+        # The generator needs no request context, so the database session is released
+        # as soon as this view returns rather than held open for the life of the stream
+        return Response(
+            stream_inbox(
+                subscription,
+                snapshot,
+                config.get('INBOX_STREAM_HEARTBEAT_SECONDS', DEFAULT_INBOX_STREAM_HEARTBEAT_SECONDS),
+                inbox_broker
+            ),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
         )
         
-        if not has_access:
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@forms_bp.route('/<int:form_id>', methods=['GET'])
+@require_auth
+def get_form(form_id):
+    try:
+        form = Form.query_for_listing().filter(Form.id == form_id).first_or_404()
+        
+        # Approver names are part of the payload, so read them with the IDs for the ETag
+        approval_versions = db.session.query(
+            FormApproval.id, FormApproval.approver_id, FormApproval.action, FormApproval.action_date, User.full_name
+        ).join(User, FormApproval.approver_id == User.id).filter(
+            FormApproval.form_id == form_id
+        ).order_by(FormApproval.id).all()
+        approver_ids = [approval.approver_id for approval in approval_versions]
+        if not can_view_form(form, approver_ids):
             return jsonify({'error': 'Access denied'}), 403
         
-        # Get form approvals
-        approvals = FormApproval.query.filter_by(form_id=form_id).order_by(FormApproval.step_number).all()
+        # Covers everything build_payload reads: the form, its template, the initiator and the approvals
+        etag = make_etag(
+            'form', form.id, form.updated_at or form.created_at,
+            form.template.updated_at, form.initiator.full_name if form.initiator else None,
+            [tuple(approval) for approval in approval_versions]
+        )
         
-        return jsonify({
-            'form': form.to_dict(),
-            'template': form.template.to_dict(),
-            'approvals': [approval.to_dict() for approval in approvals]
-        }), 200
+        def build_payload():
+            approvals = FormApproval.query_for_listing().filter_by(form_id=form_id).order_by(FormApproval.step_number).all()
+            return {
+                'form': form.to_dict(),
+                'template': form.template.to_dict(),
+                'approvals': [approval.to_dict() for approval in approvals]
+            }
+        
+        return conditional_json(etag, build_payload)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def apply_approval(form, approval, comments):
+    """Mark a pending approval as approved and advance the form along its chain"""
+    # Update approval record
+    approval.action = 'approved'
+    approval.comments = comments
+    approval.action_date = datetime.utcnow()
+    form.updated_at = approval.action_date
+    
+    # Check if this is the last step in the approval chain
+    total_steps = len(form.template.approval_chain)
+    if approval.step_number == total_steps - 1:
+        # Last approval - form goes back to initiator for final confirmation
+        form.status = 'awaiting_final_approval'
+    else:
+        # Move to next step
+        form.current_step = approval.step_number + 1
+
+def apply_rejection(form, approval, comments):
+    """Mark a pending approval as rejected and move the form back along its chain"""
+    # Update approval record
+    approval.action = 'rejected'
+    approval.comments = comments
+    approval.action_date = datetime.utcnow()
+    form.updated_at = approval.action_date
+    
+    # Move form back to previous step or to initiator if first step
+    if approval.step_number > 0:
+        form.current_step = approval.step_number - 1
+        form.status = 'pending'
+    else:
+        form.status = 'rejected'
+
+def transition_events(transitions):
+    """Notification events for (form, 'approve' | 'reject') pairs, computed before commit"""
+    step_approvers = {}
+    for form_id, step, approver_id, action in db.session.query(
+        FormApproval.form_id, FormApproval.step_number, FormApproval.approver_id, FormApproval.action
+    ).filter(FormApproval.form_id.in_([form.id for form, _ in transitions])):
+        step_approvers.setdefault((form_id, step), []).append((approver_id, action))
+    
+    # Only users who now have to act are told to, plus the initiator about their own form;
+    # approvers who already acted on the step a rejection bounces back to have nothing left to do
+    events = []
+    for form, action in transitions:
+        must_act = [a for a, act in step_approvers.get((form.id, form.current_step), []) if act == 'pending']
+        if action == 'reject':
+            events.append(('form_rejected', form.id, [form.initiator_id]))
+            if form.status == 'pending' and must_act:
+                events.append(('approval_requested', form.id, must_act))
+        elif form.status == 'awaiting_final_approval':
+            events.append(('awaiting_final_approval', form.id, [form.initiator_id]))
+        else:
+            events.append(('approval_requested', form.id, must_act))
+    return events
+
 @forms_bp.route('/<int:form_id>/approve', methods=['POST'])
 @require_auth
 def approve_form(form_id):
     try:
         data = request.get_json()
         comments = data.get('comments', '')
-        user_id = session['user_id']
+        user_id = current_user_id()
         
         form = Form.query.get_or_404(form_id)
         
@@ -251,21 +657,18 @@ def approve_form(form_id):
         if not approval:
             return jsonify({'error': 'No pending approval found for this user'}), 404
         
-        # Update approval record
-        approval.action = 'approved'
-        approval.comments = comments
-        approval.action_date = datetime.utcnow()
-        
-        # Check if this is the last step in the approval chain
-        total_steps = len(form.template.approval_chain)
-        if approval.step_number == total_steps - 1:
-            # Last approval - form goes back to initiator for final confirmation
-            form.status = 'awaiting_final_approval'
-        else:
-            # Move to next step
-            form.current_step = approval.step_number + 1
+        previous_status = form.status
+        apply_approval(form, approval, comments)
+        refresh_form_holders([form])
+        if comments:
+            refresh_search_entries([form_id])
         
+        record_pending_approval(user_id, -1)
+        record_status_change(previous_status, form.status)
+        events = transition_events([(form, 'approve')])
+        record_inbox_changes([(user_id, 'removed', form_id)])
         db.session.commit()
+        notify_users(events)
         
         return jsonify({
             'message': 'Form approved successfully',
@@ -281,7 +684,7 @@ def reject_form(form_id):
     try:
         data = request.get_json()
         comments = data.get('comments', '')
-        user_id = session['user_id']
+        user_id = current_user_id()
         
         form = Form.query.get_or_404(form_id)
         
@@ -295,19 +698,18 @@ def reject_form(form_id):
         if not approval:
             return jsonify({'error': 'No pending approval found for this user'}), 404
         
-        # Update approval record
-        approval.action = 'rejected'
-        approval.comments = comments
-        approval.action_date = datetime.utcnow()
-        
-        # Move form back to previous step or to initiator if first step
-        if approval.step_number > 0:
-            form.current_step = approval.step_number - 1
-            form.status = 'pending'
-        else:
-            form.status = 'rejected'
+        previous_status = form.status
+        apply_rejection(form, approval, comments)
+        refresh_form_holders([form])
+        if comments:
+            refresh_search_entries([form_id])
         
+        record_pending_approval(user_id, -1)
+        record_status_change(previous_status, form.status)
+        events = transition_events([(form, 'reject')])
+        record_inbox_changes([(user_id, 'removed', form_id)])
         db.session.commit()
+        notify_users(events)
         
         return jsonify({
             'message': 'Form rejected successfully',
@@ -317,11 +719,86 @@ def reject_form(form_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@forms_bp.route('/batch-action', methods=['POST'])
+@require_auth
+def batch_action():
+    """Approve or reject many forms pending for the current user in one transaction"""
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'A JSON object is required'}), 400
+        action = data.get('action')
+        form_ids = data.get('form_ids')
+        comments = data.get('comments', '')
+        user_id = current_user_id()
+        
+        if action not in ('approve', 'reject'):
+            return jsonify({'error': "Action must be 'approve' or 'reject'"}), 400
+        if not isinstance(form_ids, list) or not form_ids or not all(is_valid_id(i) for i in form_ids):
+            return jsonify({'error': 'A non-empty list of form IDs is required'}), 400
+        if len(form_ids) > MAX_BATCH_ACTIONS:
+            return jsonify({'error': f'At most {MAX_BATCH_ACTIONS} forms can be processed at once'}), 400
+        
+        form_ids = list(dict.fromkeys(form_ids))
+        
+        forms = {
+            form.id: form
+            for form in Form.query_for_listing().filter(Form.id.in_(form_ids)).all()
+        }
+        
+        # First pending approval of this user on each form, as in the single-form endpoints
+        approvals = {}
+        for approval in FormApproval.query.filter(
+            FormApproval.form_id.in_(form_ids),
+            FormApproval.approver_id == user_id,
+            FormApproval.action == 'pending'
+        ).order_by(FormApproval.id).all():
+            approvals.setdefault(approval.form_id, approval)
+        
+        apply_action = apply_approval if action == 'approve' else apply_rejection
+        results = []
+        status_changes = []
+        transitions = []
+        for form_id in form_ids:
+            form = forms.get(form_id)
+            approval = approvals.get(form_id)
+            if not form:
+                results.append({'form_id': form_id, 'error': 'Form not found'})
+            elif not approval:
+                results.append({'form_id': form_id, 'error': 'No pending approval found for this user'})
+            else:
+                previous_status = form.status
+                apply_action(form, approval, comments)
+                status_changes.append((previous_status, form.status))
+                transitions.append((form, action))
+                results.append({'form_id': form_id, 'status': form.status})
+        
+        if status_changes:
+            refresh_form_holders([form for form, _ in transitions])
+            if comments:
+                refresh_search_entries([form.id for form, _ in transitions])
+            record_pending_approval(user_id, -len(status_changes))
+            record_status_changes(status_changes)
+            events = transition_events(transitions)
+            record_inbox_changes([(user_id, 'removed', form.id) for form, _ in transitions])
+            db.session.commit()
+            notify_users(events)
+        
+        return jsonify({
+            'message': f'{len(status_changes)} of {len(form_ids)} forms processed',
+            'processed': len(status_changes),
+            'failed': len(form_ids) - len(status_changes),
+            'results': results
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @forms_bp.route('/<int:form_id>/final-approve', methods=['POST'])
 @require_auth
 def final_approve_form(form_id):
     try:
-        user_id = session['user_id']
+        user_id = current_user_id()
         form = Form.query.get_or_404(form_id)
         
         # Only the initiator can give final approval
@@ -334,6 +811,7 @@ def final_approve_form(form_id):
         form.status = 'completed'
         form.completed_at = datetime.utcnow()
         
+        record_status_change('awaiting_final_approval', form.status)
         db.session.commit()
         
         return jsonify({
@@ -350,7 +828,7 @@ def add_approver(form_id):
     try:
         data = request.get_json()
         approver_id = data.get('approver_id')
-        user_id = session['user_id']
+        user_id = current_user_id()
         
         form = Form.query.get_or_404(form_id)
         
@@ -375,7 +853,12 @@ def add_approver(form_id):
         )
         
         db.session.add(additional_approval)
+        form.updated_at = datetime.utcnow()
+        refresh_form_holders([form])
+        record_pending_approval(approver_id, 1)
+        record_inbox_changes([(approver_id, 'added', form_id)])
         db.session.commit()
+        notify_users([('approval_requested', form_id, [approver_id])])
         
         return jsonify({
             'message': 'Additional approver added successfully',
@@ -389,31 +872,28 @@ def add_approver(form_id):
 @require_auth
 def get_statistics():
     try:
-        user_id = session['user_id']
-        user_role = session['user_role']
+        user_id = current_user_id()
+        user_role = current_user_role()
         
         stats = {}
         
         if user_role == 'admin':
             # Admin sees all statistics
-            stats['total_forms'] = Form.query.count()
-            stats['pending_forms'] = Form.query.filter(Form.status.in_(['pending', 'awaiting_final_approval'])).count()
-            stats['completed_forms'] = Form.query.filter_by(status='completed').count()
-            stats['rejected_forms'] = Form.query.filter_by(status='rejected').count()
+            form_summary = get_form_summary()
+            stats['total_forms'] = form_summary['total']
+            stats['pending_forms'] = form_summary['pending']
+            stats['completed_forms'] = form_summary['by_status'].get('completed', 0)
+            stats['rejected_forms'] = form_summary['by_status'].get('rejected', 0)
             
             # Forms by template type
             stats['forms_by_type'] = {}
             templates = FormTemplate.query.filter_by(is_active=True).all()
             for template in templates:
-                count = Form.query.filter_by(template_id=template.id).count()
-                stats['forms_by_type'][template.name_hebrew] = count
+                stats['forms_by_type'][template.name_hebrew] = form_summary['by_template'].get(template.id, 0)
         else:
             # Regular user sees limited statistics
-            stats['my_forms'] = Form.query.filter_by(initiator_id=user_id).count()
-            stats['pending_for_me'] = FormApproval.query.filter_by(
-                approver_id=user_id,
-                action='pending'
-            ).count()
+            stats['my_forms'] = get_form_count_for_initiator(user_id)
+            stats['pending_for_me'] = get_pending_count_for_approver(user_id)
         
         return jsonify({'statistics': stats}), 200
         
@@ -0,0 +1,56 @@
+from src.models.user import db, User, UserRole
+from threading import Lock
+import time
+
+# Role memberships change rarely (admin edits), so the index is rebuilt at most once
+# per TTL. Edits made in this process invalidate it immediately; the TTL bounds how
+# long other worker processes can keep serving an outdated index.
+ROLE_APPROVERS_TTL_SECONDS = 60
+
+_lock = Lock()
+_role_approvers = None
+_loaded_at = 0.0
+
+def _load_role_approvers():
+    """Map each role ID to its active users, in assignment order, with one query"""
+    rows = db.session.query(UserRole.role_id, User.id).join(
+        User, UserRole.user_id == User.id
+    ).filter(
+        User.is_active == True
+    ).order_by(UserRole.id).all()
+    
+    role_approvers = {}
+    for role_id, user_id in rows:
+        role_approvers.setdefault(role_id, []).append(user_id)
+    return role_approvers
+
+def get_role_approvers():
+    """Return the cached {role_id: [active user IDs]} index, reloading it when stale"""
+    global _role_approvers, _loaded_at
+    with _lock:
+        if _role_approvers is None or time.monotonic() - _loaded_at > ROLE_APPROVERS_TTL_SECONDS:
+            _role_approvers = _load_role_approvers()
+            _loaded_at = time.monotonic()
+        return _role_approvers
+
+def get_approver_for_role(role_id):
+    """ID of the active user who approves steps assigned to role_id, or None"""
+    approvers = get_role_approvers().get(role_id)
+    # For now, assign to the first user with this role
+    # In a real system, you might have more complex logic
+    return approvers[0] if approvers else None
+
+def invalidate_role_approvers():
+    """Drop the cached index; call after committing a change to users or role assignments"""
+    global _role_approvers
+    with _lock:
+        _role_approvers = None
+
+def resolve_approval_chain(approval_chain):
+    """Return (step_number, approver_id) for each step of a chain that has an active approver"""
+    steps = []
+    for step, role_id in enumerate(approval_chain):
+        approver_id = get_approver_for_role(role_id)
+        if approver_id:
+            steps.append((step, approver_id))
+    return steps
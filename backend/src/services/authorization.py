@@ -0,0 +1,109 @@
+from flask import g, jsonify
+from src.models.user import db, User, UserRole
+from src.services.tokens import get_request_claims
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+import time
+
+# Principals are cached per process for a short time; admin edits made in this process
+# invalidate them immediately and the TTL bounds staleness in other workers.
+PRINCIPAL_CACHE_TTL_SECONDS = 30
+PRINCIPAL_CACHE_SIZE = 1024
+
+class Principal:
+    """The authenticated caller: user ID, system role, assigned role IDs and active flag"""
+    __slots__ = ('user_id', 'role', 'role_ids', 'is_active')
+
+    def __init__(self, user_id, role, role_ids, is_active):
+        self.user_id = user_id
+        self.role = role
+        self.role_ids = role_ids
+        self.is_active = is_active
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+_cache_lock = Lock()
+_principal_cache = OrderedDict()  # user_id -> (loaded_at, Principal), least recently used first
+
+def _load_principal(user_id):
+    user = db.session.query(User.id, User.role, User.is_active).filter(User.id == user_id).first()
+    if not user:
+        return None
+    role_ids = frozenset(
+        role_id for role_id, in db.session.query(UserRole.role_id).filter(UserRole.user_id == user_id)
+    )
+    return Principal(user.id, user.role, role_ids, bool(user.is_active))
+
+def _get_cached_principal(user_id):
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _principal_cache.get(user_id)
+        if entry and now - entry[0] <= PRINCIPAL_CACHE_TTL_SECONDS:
+            _principal_cache.move_to_end(user_id)
+            return entry[1]
+    
+    principal = _load_principal(user_id)
+    if principal is None:
+        return None
+    
+    with _cache_lock:
+        _principal_cache[user_id] = (now, principal)
+        _principal_cache.move_to_end(user_id)
+        while len(_principal_cache) > PRINCIPAL_CACHE_SIZE:
+            _principal_cache.popitem(last=False)
+    return principal
+
+def invalidate_principal(user_id=None):
+    """Forget a cached principal (or all of them); call after committing user or role changes"""
+    with _cache_lock:
+        if user_id is None:
+            _principal_cache.clear()
+        else:
+            _principal_cache.pop(user_id, None)
+
+def get_current_principal():
+    """Resolve the caller once per request; None if unauthenticated or the user is gone"""
+    if 'principal' not in g:
+        claims = get_request_claims()
+        g.principal = _get_cached_principal(claims['sub']) if claims else None
+    return g.principal
+
+def current_user_id():
+    return get_current_principal().user_id
+
+def current_user_role():
+    return get_current_principal().role
+
+def can_view_form(form, approver_ids):
+    """Admins, the initiator and anyone in the form's approval chain may view a form"""
+    principal = get_current_principal()
+    return principal.is_admin or form.initiator_id == principal.user_id or principal.user_id in approver_ids
+
+def require_auth(f):
+    """Decorator to require authentication"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        principal = get_current_principal()
+        if principal is None:
+            return jsonify({'error': 'Authentication required'}), 401
+        if not principal.is_active:
+            return jsonify({'error': 'Account is deactivated'}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+def require_admin(f):
+    """Decorator to require admin role"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        principal = get_current_principal()
+        if principal is None:
+            return jsonify({'error': 'Authentication required'}), 401
+        if not principal.is_active:
+            return jsonify({'error': 'Account is deactivated'}), 401
+        if not principal.is_admin:
+            return jsonify({'error': 'Admin access required'}), 403
+        return f(*args, **kwargs)
+    return decorated_function
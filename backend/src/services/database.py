@@ -0,0 +1,144 @@
+import os
+import re
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from src.models.user import db
+
+# Applied to every new SQLite connection. WAL lets readers proceed while a writer
+# commits, and synchronous=NORMAL is durable in WAL mode except on power loss.
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # milliseconds to wait on a locked database before failing
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # negative values are KiB: 64 MB of page cache per connection
+    'temp_store': 'MEMORY',
+}
+
+# Environment variables override app.config['SQLITE_PRAGMAS'], which overrides the defaults
+SQLITE_PRAGMA_ENV = {
+    'journal_mode': 'SQLITE_JOURNAL_MODE',
+    'synchronous': 'SQLITE_SYNCHRONOUS',
+    'busy_timeout': 'SQLITE_BUSY_TIMEOUT_MS',
+    'mmap_size': 'SQLITE_MMAP_SIZE',
+    'cache_size': 'SQLITE_CACHE_SIZE',
+    'temp_store': 'SQLITE_TEMP_STORE',
+}
+
+# A file database allows one writer at a time, so a modest pool is enough to keep
+# readers from waiting on connection setup without piling up blocked writers
+DEFAULT_DB_POOL_SIZE = 10
+DEFAULT_DB_MAX_OVERFLOW = 10
+DEFAULT_DB_POOL_TIMEOUT = 30
+# Server databases: recycle before common idle-connection cutoffs, cap runaway queries
+DEFAULT_DB_POOL_RECYCLE = 1800
+DEFAULT_DB_STATEMENT_TIMEOUT_MS = 30000
+
+PRAGMA_VALUE = re.compile(r'^-?[A-Za-z0-9_]+$')
+
+def _setting(config, key, default, cast=str):
+    value = os.environ.get(key)
+    if value is None:
+        value = config.get(key, default)
+    return cast(value)
+
+def database_uri(config):
+    """DATABASE_URL from the environment wins over SQLALCHEMY_DATABASE_URI in config"""
+    uri = os.environ.get('DATABASE_URL') or config.get('SQLALCHEMY_DATABASE_URI')
+    if not uri:
+        raise RuntimeError('No database configured: set DATABASE_URL or SQLALCHEMY_DATABASE_URI')
+    # Hosting providers still hand out the scheme SQLAlchemy 1.4 dropped
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+def is_memory_database(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+def sqlite_pragmas(config, url):
+    """Effective pragmas for a SQLite URL; in-memory databases skip the file-only ones"""
+    pragmas = dict(DEFAULT_SQLITE_PRAGMAS)
+    pragmas.update(config.get('SQLITE_PRAGMAS') or {})
+    for name, env_key in SQLITE_PRAGMA_ENV.items():
+        if env_key in os.environ:
+            pragmas[name] = os.environ[env_key]
+    if is_memory_database(url):
+        pragmas.pop('journal_mode', None)
+        pragmas.pop('mmap_size', None)
+    for name, value in pragmas.items():
+        if not PRAGMA_VALUE.match(str(value)):
+            raise ValueError(f'Invalid value for SQLite pragma {name}: {value!r}')
+    return pragmas
+
+def statement_timeout_connect_args(backend, timeout_ms):
+    """Driver arguments that make the server abort statements running longer than timeout_ms"""
+    if not timeout_ms:
+        return {}
+    if backend == 'postgresql':
+        return {'options': f'-c statement_timeout={timeout_ms}'}
+    if backend in ('mysql', 'mariadb'):
+        return {'init_command': f'SET SESSION max_execution_time={timeout_ms}'}
+    return {}
+
+def engine_options(config, url):
+    """Pool and connection settings for the configured database.
+
+    In-memory SQLite keeps SQLAlchemy's static pool. SQLite has no server-side
+    statement timeout; busy_timeout bounds lock waits instead.
+    """
+    if is_memory_database(url):
+        return {}
+    backend = url.get_backend_name()
+    options = {
+        'pool_size': _setting(config, 'DB_POOL_SIZE', DEFAULT_DB_POOL_SIZE, int),
+        'max_overflow': _setting(config, 'DB_MAX_OVERFLOW', DEFAULT_DB_MAX_OVERFLOW, int),
+        'pool_timeout': _setting(config, 'DB_POOL_TIMEOUT', DEFAULT_DB_POOL_TIMEOUT, int),
+    }
+    if backend == 'sqlite':
+        # Pooled connections move between request threads
+        options['connect_args'] = {'check_same_thread': False}
+        return options
+    
+    options['pool_pre_ping'] = True
+    options['pool_recycle'] = _setting(config, 'DB_POOL_RECYCLE', DEFAULT_DB_POOL_RECYCLE, int)
+    connect_args = statement_timeout_connect_args(
+        backend, _setting(config, 'DB_STATEMENT_TIMEOUT_MS', DEFAULT_DB_STATEMENT_TIMEOUT_MS, int)
+    )
+    if connect_args:
+        options['connect_args'] = connect_args
+    return options
+
+def install_sqlite_pragmas(engine, pragmas):
+    """Run the PRAGMA statements on every connection the engine opens"""
+    statements = [f'PRAGMA {name} = {value}' for name, value in pragmas.items()]
+    
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+def init_database(app):
+    """Resolve the database URL, tune the engine for it and bind db to the app.
+
+    Replaces a bare db.init_app(app): engine options must be in place before
+    Flask-SQLAlchemy creates the engine, and SQLite pragmas are attached right after.
+    Options already set in SQLALCHEMY_ENGINE_OPTIONS take precedence.
+    """
+    uri = database_uri(app.config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    url = make_url(uri)
+    
+    options = engine_options(app.config, url)
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    
+    db.init_app(app)
+    
+    if url.get_backend_name() == 'sqlite':
+        pragmas = sqlite_pragmas(app.config, url)
+        with app.app_context():
+            install_sqlite_pragmas(db.engine, pragmas)
@@ -0,0 +1,62 @@
+from queue import Queue
+from threading import Lock, Thread
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class RetryingDispatcher:
+    """Runs queued jobs on a pool of daemon threads, retrying failures with exponential backoff.
+
+    Jobs must not need the Flask application context; resolve everything they
+    need before submitting them.
+    """
+
+    def __init__(self, name, workers=2, max_attempts=5, backoff_base_seconds=0.5, backoff_max_seconds=30):
+        self.name = name
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self._queue = Queue()
+        self._threads = []
+        self._lock = Lock()
+
+    def submit(self, job, *args):
+        """Queue job(*args) and return immediately"""
+        self._ensure_started()
+        self._queue.put((job, args))
+
+    def join(self):
+        """Block until every queued job has finished or given up (mainly for tests)"""
+        self._queue.join()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = Thread(target=self._work, name=f'{self.name}-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            job, args = self._queue.get()
+            try:
+                self._run_with_retries(job, args)
+            finally:
+                self._queue.task_done()
+
+    def _run_with_retries(self, job, args):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                job(*args)
+                return
+            except Exception:
+                if attempt == self.max_attempts:
+                    logger.exception('%s: giving up after %d attempts', self.name, attempt)
+                    return
+                delay = min(self.backoff_base_seconds * 2 ** (attempt - 1), self.backoff_max_seconds)
+                logger.warning('%s: attempt %d failed, retrying in %.1fs', self.name, attempt, delay, exc_info=True)
+                time.sleep(delay)
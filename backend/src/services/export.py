@@ -0,0 +1,77 @@
+import zlib
+from datetime import date, datetime
+from flask import current_app
+from sqlalchemy import select
+from src.models.user import User, Role, UserRole, FormTemplate, Form, FormApproval
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# Exported in dependency order so a restore can replay the lines top to bottom
+EXPORT_TABLES = [
+    ('users', User),
+    ('roles', Role),
+    ('user_roles', UserRole),
+    ('templates', FormTemplate),
+    ('forms', Form),
+    ('form_approvals', FormApproval),
+]
+
+# Credentials never leave the database
+EXCLUDED_COLUMNS = {'password_hash', 'otp_secret'}
+
+def _serialize(value):
+    return value.isoformat() if isinstance(value, (datetime, date)) else value
+
+def export_lines(session):
+    """Yield the backup as NDJSON lines: a header, then one line per row of each table.
+
+    Rows are read as plain column tuples through a server-side cursor in batches of
+    EXPORT_BATCH_SIZE, so no ORM objects or relationships are loaded and memory stays
+    flat however large the tables are.
+    """
+    dumps = current_app.json.dumps
+    yield dumps({
+        'type': 'export',
+        'export_date': datetime.utcnow().isoformat(),
+        'tables': [name for name, _ in EXPORT_TABLES]
+    }) + '\n'
+    
+    for name, model in EXPORT_TABLES:
+        columns = [column for column in model.__table__.columns if column.name not in EXCLUDED_COLUMNS]
+        statement = select(*columns).order_by(*model.__table__.primary_key.columns)
+        result = session.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        count = 0
+        for row in result:
+            count += 1
+            yield dumps({
+                'table': name,
+                'row': {column.name: _serialize(value) for column, value in zip(columns, row)}
+            }) + '\n'
+        yield dumps({'type': 'table_end', 'table': name, 'count': count}) + '\n'
+
+def export_chunks(lines, compress=False):
+    """Group lines into ~EXPORT_CHUNK_SIZE byte chunks, optionally gzip-compressed.
+
+    Handing the WSGI server a few large chunks instead of one per row keeps the
+    per-chunk overhead out of the export time.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    pending = []
+    pending_size = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        pending.append(data)
+        pending_size += len(data)
+        if pending_size >= EXPORT_CHUNK_SIZE:
+            chunk = b''.join(pending)
+            pending, pending_size = [], 0
+            if compressor:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+    chunk = b''.join(pending)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
@@ -0,0 +1,126 @@
+from sqlalchemy import delete, insert, select
+from src.models.user import db, Form, FormFieldValue, FormTemplate
+
+FIELD_FILTER_PREFIX = 'field.'
+MAX_INDEXED_VALUE_LENGTH = 500
+REINDEX_BATCH_SIZE = 500
+
+def indexed_fields(fields_config):
+    """Return {field name: field type} for the fields a template marks 'indexed'"""
+    return {
+        field['name']: field.get('type')
+        for field in fields_config or []
+        if field.get('indexed') and field.get('name')
+    }
+
+def normalize_field_value(value, field_type):
+    """Normalize a submitted or queried value to the text stored in FormFieldValue.
+
+    Numbers, dates and booleans get one canonical spelling so '5', 5 and 5.0 all
+    match the same rows.
+    """
+    if field_type == 'checkbox' or isinstance(value, bool):
+        if isinstance(value, str):
+            return 'true' if value.strip().lower() in ('true', '1', 'yes', 'on') else 'false'
+        return 'true' if value else 'false'
+    if field_type == 'number':
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            pass
+        else:
+            return str(int(number)) if number.is_integer() else repr(number)
+    text = str(value).strip()
+    if field_type == 'date':
+        text = text[:10]
+    return text[:MAX_INDEXED_VALUE_LENGTH]
+
+def extract_field_values(form_id, fields_config, form_data):
+    """Build FormFieldValue rows for one form; multi-value fields produce one row per value"""
+    rows = []
+    if not isinstance(form_data, dict):
+        return rows
+    for name, field_type in indexed_fields(fields_config).items():
+        value = form_data.get(name)
+        seen = set()
+        for item in value if isinstance(value, list) else [value]:
+            if item is None or item == '':
+                continue
+            normalized = normalize_field_value(item, field_type)
+            if normalized not in seen:
+                seen.add(normalized)
+                rows.append({'form_id': form_id, 'field_name': name, 'value': normalized})
+    return rows
+
+def index_forms(forms):
+    """Insert index rows for newly created forms, given (form_id, template, form_data) tuples.
+
+    Runs in the caller's transaction; the caller commits.
+    """
+    rows = []
+    for form_id, template, form_data in forms:
+        rows.extend(extract_field_values(form_id, template.fields_config, form_data))
+    if rows:
+        db.session.execute(insert(FormFieldValue), rows)
+    return len(rows)
+
+def rebuild_field_index(template_id=None):
+    """Re-extract index rows for every form, or only one template's forms, in batches.
+
+    Needed after a template changes which fields are indexed, and for databases
+    that had forms before the index existed. Commits; returns the number of rows written.
+    """
+    templates = FormTemplate.query
+    if template_id is not None:
+        templates = templates.filter(FormTemplate.id == template_id)
+    templates = {template.id: template for template in templates.all()}
+    
+    form_ids = select(Form.id)
+    if template_id is not None:
+        form_ids = form_ids.where(Form.template_id == template_id)
+    db.session.execute(delete(FormFieldValue).where(FormFieldValue.form_id.in_(form_ids)))
+    
+    query = db.session.query(Form.id, Form.template_id, Form.form_data).filter(
+        Form.template_id.in_([t_id for t_id, template in templates.items() if indexed_fields(template.fields_config)])
+    )
+    written = 0
+    batch = []
+    for form_id, form_template_id, form_data in query.yield_per(REINDEX_BATCH_SIZE):
+        batch.append((form_id, templates[form_template_id], form_data))
+        if len(batch) >= REINDEX_BATCH_SIZE:
+            written += index_forms(batch)
+            batch = []
+    written += index_forms(batch)
+    db.session.commit()
+    return written
+
+def get_searchable_fields():
+    """Return {field name: field type} for fields indexed by any active template"""
+    fields = {}
+    for (fields_config,) in db.session.query(FormTemplate.fields_config).filter(FormTemplate.is_active == True):
+        for name, field_type in indexed_fields(fields_config).items():
+            fields.setdefault(name, field_type)
+    return fields
+
+def parse_field_filters(args):
+    """Collect field.<name>=<value> query arguments as {name: [values]}; repeated values are OR-ed"""
+    return {
+        key[len(FIELD_FILTER_PREFIX):]: values
+        for key, values in args.lists()
+        if key.startswith(FIELD_FILTER_PREFIX) and len(key) > len(FIELD_FILTER_PREFIX)
+    }
+
+def apply_field_filters(query, filters, searchable_fields):
+    """Restrict a Form query to forms whose indexed fields match every filter.
+
+    Each filter is an IN-subquery answered from ix_form_field_value_lookup.
+    """
+    for name, values in filters.items():
+        field_type = searchable_fields[name]
+        query = query.filter(Form.id.in_(
+            select(FormFieldValue.form_id).where(
+                FormFieldValue.field_name == name,
+                FormFieldValue.value.in_({normalize_field_value(value, field_type) for value in values})
+            )
+        ))
+    return query
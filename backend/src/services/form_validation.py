@@ -0,0 +1,210 @@
+from collections import OrderedDict
+from datetime import date
+from threading import Lock
+
+# Compiled plans are keyed by (template id, updated_at), so editing a template's
+# fields_config naturally produces a new plan and the old one ages out of the LRU.
+VALIDATION_PLAN_CACHE_SIZE = 256
+
+def _is_empty(value):
+    return value is None or value == '' or value == [] or value is False
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value[:10]) if isinstance(value, str) else None
+    except ValueError:
+        return None
+
+def _parse_number(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value) if isinstance(value, str) else None
+    except ValueError:
+        return None
+
+def _parse_length(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value if value >= 0 else None
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return None
+
+OPTION_VALUE_TYPES = (str, int, float, bool)
+
+def _option_value(option):
+    """Options are plain values or {value, label} objects; None if neither"""
+    if isinstance(option, dict):
+        option = option.get('value')
+    return option if isinstance(option, OPTION_VALUE_TYPES) else None
+
+def _options(field):
+    options = field.get('options')
+    if not isinstance(options, list):
+        return frozenset()
+    return frozenset(value for value in map(_option_value, options) if value is not None)
+
+def _text_checks(field, label):
+    max_length = _parse_length(field.get('maxLength'))
+    
+    def check(value):
+        if not isinstance(value, str):
+            return f'{label} must be text'
+        if max_length is not None and len(value) > max_length:
+            return f'{label} must be at most {max_length} characters'
+    return check
+
+def _number_checks(field, label):
+    minimum = _parse_number(field.get('min'))
+    maximum = _parse_number(field.get('max'))
+    
+    def check(value):
+        number = _parse_number(value)
+        if number is None:
+            return f'{label} must be a number'
+        if minimum is not None and number < minimum:
+            return f'{label} must be at least {field["min"]}'
+        if maximum is not None and number > maximum:
+            return f'{label} must be at most {field["max"]}'
+    return check
+
+def _date_checks(field, label):
+    min_date = _parse_date(field.get('minDate'))
+    max_date = _parse_date(field.get('maxDate'))
+    
+    def check(value):
+        parsed = _parse_date(value)
+        if parsed is None:
+            return f'{label} must be a date (YYYY-MM-DD)'
+        if min_date and parsed < min_date:
+            return f'{label} must be on or after {min_date.isoformat()}'
+        if max_date and parsed > max_date:
+            return f'{label} must be on or before {max_date.isoformat()}'
+    return check
+
+def _options_checks(field, label):
+    options = _options(field)
+    multiple = bool(field.get('multiple'))
+    
+    def check(value):
+        values = value if multiple and isinstance(value, list) else [value]
+        # Submitted values must be plain values; {value, label} objects only appear in the config
+        if options and any(not isinstance(v, OPTION_VALUE_TYPES) or v not in options for v in values):
+            return f'{label} must be one of the allowed options'
+    return check
+
+def _checkbox_checks(field, label):
+    def check(value):
+        if not isinstance(value, bool):
+            return f'{label} must be true or false'
+    return check
+
+TYPE_CHECKS = {
+    'text': _text_checks,
+    'textarea': _text_checks,
+    'number': _number_checks,
+    'date': _date_checks,
+    'select': _options_checks,
+    'radio': _options_checks,
+    'checkbox': _checkbox_checks,
+}
+
+# Types the form builder offers (see admin.FIELD_TYPES); 'file' has no value checks
+FIELD_TYPE_NAMES = frozenset(TYPE_CHECKS) | {'file'}
+
+def validate_fields_config(fields_config):
+    """Return a list of problems with a template's fields_config; empty if it can be saved"""
+    if not isinstance(fields_config, list):
+        return ['fields_config must be a list of fields']
+    
+    errors = []
+    names = set()
+    for index, field in enumerate(fields_config):
+        if not isinstance(field, dict):
+            errors.append(f'Field {index} must be an object')
+            continue
+        name = field.get('name')
+        where = f'Field {name!r}' if isinstance(name, str) and name else f'Field {index}'
+        if not isinstance(name, str) or not name:
+            errors.append(f'{where} needs a name')
+        elif name in names:
+            errors.append(f'{where} is defined twice')
+        names.add(name if isinstance(name, str) else None)
+        
+        if field.get('type') not in FIELD_TYPE_NAMES:
+            errors.append(f"{where} has an unknown type {field.get('type')!r}")
+        if field.get('maxLength') is not None and _parse_length(field['maxLength']) is None:
+            errors.append(f'{where}: maxLength must be a non-negative integer')
+        for bound in ('min', 'max'):
+            if field.get(bound) is not None and _parse_number(field[bound]) is None:
+                errors.append(f'{where}: {bound} must be a number')
+        for bound in ('minDate', 'maxDate'):
+            if field.get(bound) is not None and _parse_date(field[bound]) is None:
+                errors.append(f'{where}: {bound} must be a date (YYYY-MM-DD)')
+        options = field.get('options')
+        if options is not None and (
+            not isinstance(options, list) or any(_option_value(option) is None for option in options)
+        ):
+            errors.append(f'{where}: options must be a list of values or {{value, label}} objects')
+    return errors
+
+def compile_fields_config(fields_config):
+    """Turn a template's fields_config into a list of (name, label, required, check) rules.
+
+    All per-field parsing (bounds, option sets) happens here once, so validating a
+    submission is a single pass of cheap comparisons.
+    """
+    plan = []
+    for field in fields_config if isinstance(fields_config, list) else []:
+        # Malformed entries are rejected when templates are saved; older rows are skipped here
+        if not isinstance(field, dict) or not isinstance(field.get('name'), str) or not field['name']:
+            continue
+        name = field['name']
+        label = field.get('label') or name
+        build_check = TYPE_CHECKS.get(field.get('type'))
+        plan.append((name, label, bool(field.get('required')), build_check(field, label) if build_check else None))
+    return plan
+
+_plan_cache = OrderedDict()
+_plan_cache_lock = Lock()
+
+def get_validation_plan(template):
+    """Compiled plan for a template, reused until the template is edited"""
+    key = (template.id, template.updated_at)
+    with _plan_cache_lock:
+        plan = _plan_cache.get(key)
+        if plan is not None:
+            _plan_cache.move_to_end(key)
+            return plan
+    
+    plan = compile_fields_config(template.fields_config)
+    with _plan_cache_lock:
+        _plan_cache[key] = plan
+        while len(_plan_cache) > VALIDATION_PLAN_CACHE_SIZE:
+            _plan_cache.popitem(last=False)
+    return plan
+
+def validate_form_data(template, form_data):
+    """Return {field name: error message} for form_data against the template; empty if valid.
+
+    Fields not declared in the template are left untouched.
+    """
+    if not isinstance(form_data, dict):
+        return {'form_data': 'form_data must be an object'}
+    
+    errors = {}
+    for name, label, required, check in get_validation_plan(template):
+        value = form_data.get(name)
+        if _is_empty(value):
+            if required:
+                errors[name] = f'{label} is required'
+            continue
+        if check:
+            error = check(value)
+            if error:
+                errors[name] = error
+    return errors
@@ -0,0 +1,24 @@
+from flask import jsonify, make_response, request
+import hashlib
+
+# Authenticated API data must never be stored by shared caches, and clients must
+# revalidate before reuse; the ETag makes revalidation a cheap 304.
+REVALIDATE_CACHE_CONTROL = 'private, no-cache'
+
+def make_etag(*parts):
+    """Strong ETag value derived from version markers such as row counts and updated_at stamps"""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+def conditional_json(etag, build_payload, cache_control=REVALIDATE_CACHE_CONTROL):
+    """304 if the client already holds etag, otherwise jsonify(build_payload()).
+
+    If-None-Match uses weak comparison, so W/ validators added by compressing proxies
+    still match. build_payload is only called on a miss, so a 304 skips loading and serializing the data.
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = make_response('', 304)
+    else:
+        response = jsonify(build_payload())
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
@@ -0,0 +1,104 @@
+from collections import defaultdict
+from sqlalchemy import delete, insert, select, tuple_, update
+from src.models.user import db, Form, FormApproval, FormInbox
+
+# Form.pending_step / Form.current_approver_ids and the FormInbox table are derived
+# from the pending FormApproval rows. Every code path that creates approvals or
+# changes their action calls into this module in the same transaction.
+
+def compute_holders(status, current_step, pending):
+    """(pending_step, current_approver_ids) for a form given its pending (step, approver_id) pairs.
+
+    A form nobody can act on right now (not pending, or no pending approval left
+    at its current step) has no holders and pending_step None.
+    """
+    if status != 'pending':
+        return None, []
+    approver_ids = sorted({approver_id for step, approver_id in pending if step == current_step})
+    if not approver_ids:
+        return None, []
+    return current_step, approver_ids
+
+def new_form_holders(approval_steps):
+    """Holders of a form just created at step 0 with the given (step, approver_id) chain"""
+    return compute_holders('pending', 0, approval_steps)
+
+def inbox_rows(form_id, form_created_at, approval_steps):
+    """FormInbox rows for a new form: every approver in its chain has a pending approval"""
+    return [
+        {'user_id': approver_id, 'form_id': form_id, 'form_created_at': form_created_at}
+        for approver_id in dict.fromkeys(approver_id for _, approver_id in approval_steps)
+    ]
+
+def _pending_approvals(connection, form_ids):
+    pending = defaultdict(list)
+    for form_id, step, approver_id in connection.execute(
+        select(FormApproval.form_id, FormApproval.step_number, FormApproval.approver_id).where(
+            FormApproval.form_id.in_(form_ids),
+            FormApproval.action == 'pending'
+        )
+    ):
+        pending[form_id].append((step, approver_id))
+    return pending
+
+def _sync_inbox(connection, forms_created_at, pending):
+    """Make FormInbox match the pending approvals of the given {form_id: created_at} forms"""
+    wanted = {
+        (approver_id, form_id)
+        for form_id in forms_created_at
+        for _, approver_id in pending.get(form_id, [])
+    }
+    existing = set(connection.execute(
+        select(FormInbox.user_id, FormInbox.form_id).where(FormInbox.form_id.in_(list(forms_created_at)))
+    ).all())
+
+    stale = existing - wanted
+    if stale:
+        connection.execute(delete(FormInbox).where(tuple_(FormInbox.user_id, FormInbox.form_id).in_(list(stale))))
+    missing = wanted - existing
+    if missing:
+        connection.execute(insert(FormInbox), [
+            {'user_id': user_id, 'form_id': form_id, 'form_created_at': forms_created_at[form_id]}
+            for user_id, form_id in missing
+        ])
+    return stale, missing
+
+def refresh_form_holders(forms):
+    """Recompute holders and inbox rows for forms loaded in the session after approvals changed.
+
+    Returns the inbox rows removed and added as (user_id, form_id) sets.
+    """
+    forms = list({form.id: form for form in forms}.values())
+    if not forms:
+        return set(), set()
+    db.session.flush()
+    pending = _pending_approvals(db.session, [form.id for form in forms])
+    for form in forms:
+        form.pending_step, form.current_approver_ids = compute_holders(
+            form.status, form.current_step, pending.get(form.id, [])
+        )
+    return _sync_inbox(db.session, {form.id: form.created_at for form in forms}, pending)
+
+def rebuild_form_holders(connection, form_ids):
+    """Recompute holders and inbox rows for a batch of form IDs using Core statements.
+
+    Used by migrations and repair tooling, where no ORM session is involved.
+    """
+    rows = connection.execute(
+        select(Form.id, Form.status, Form.current_step, Form.created_at).where(Form.id.in_(form_ids))
+    ).all()
+    if not rows:
+        return
+    pending = _pending_approvals(connection, [row.id for row in rows])
+    updates = []
+    for row in rows:
+        pending_step, approver_ids = compute_holders(row.status, row.current_step, pending.get(row.id, []))
+        updates.append({'form_id': row.id, 'pending_step': pending_step, 'current_approver_ids': approver_ids})
+    connection.execute(
+        update(Form.__table__).where(Form.__table__.c.id == db.bindparam('form_id')).values(
+            pending_step=db.bindparam('pending_step'),
+            current_approver_ids=db.bindparam('current_approver_ids')
+        ),
+        updates
+    )
+    _sync_inbox(connection, {row.id: row.created_at for row in rows}, pending)
@@ -0,0 +1,182 @@
+from src.models.user import db, InboxEvent
+from src.services.statistics import get_pending_counts_for_approvers
+from datetime import datetime, timedelta
+from queue import Empty, Full, Queue
+from sqlalchemy import insert
+from threading import Lock, Thread
+import json
+import logging
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable through the matching keys in app.config
+DEFAULT_INBOX_STREAM_QUEUE_SIZE = 100
+DEFAULT_INBOX_STREAM_HEARTBEAT_SECONDS = 15
+DEFAULT_INBOX_STREAM_POLL_SECONDS = 1
+
+# Each poll re-reads this much of the log, so an event whose transaction committed after
+# rows with higher IDs (possible on PostgreSQL) is still delivered; IDs already seen are skipped
+INBOX_EVENT_LOOKBACK_SECONDS = 5
+# Rows older than this are deleted by the pollers
+INBOX_EVENT_RETENTION_SECONDS = 10 * 60
+
+class InboxSubscription:
+    """One open stream: a bounded queue of inbox updates for a single user"""
+
+    def __init__(self, user_id, queue_size):
+        self.user_id = user_id
+        self.queue = Queue(maxsize=queue_size)
+        # Set when updates were dropped because the client fell behind; it must refetch
+        self.overflowed = False
+
+class InboxBroker:
+    """Fans inbox changes out to the streams open in this worker.
+
+    Changes travel between workers through the inbox_event table: the transaction
+    that changes an inbox logs them (record_inbox_changes), and one poller thread
+    per worker reads the new rows and hands them to its local subscribers.
+    """
+
+    def __init__(self):
+        self._subscriptions = {}  # user_id -> set of InboxSubscription
+        self._lock = Lock()
+        self._poll_lock = Lock()
+        self._seen = {}  # event id -> created_at, for events still inside the lookback window
+        self._last_prune = 0
+        self._poller = None
+
+    def start(self, app, poll_seconds):
+        """Start this worker's poller once; events logged before it started are not replayed"""
+        with self._lock:
+            if self._poller is not None:
+                return
+            self._poller = Thread(target=self._poll_forever, args=(app, poll_seconds),
+                                  name='inbox-events', daemon=True)
+        with app.app_context():
+            self.poll(deliver=False)
+        self._poller.start()
+
+    def _poll_forever(self, app, poll_seconds):
+        while True:
+            time.sleep(poll_seconds)
+            try:
+                with app.app_context():
+                    self.poll()
+            except Exception:
+                logger.exception('Failed to poll inbox events')
+
+    def poll(self, deliver=True):
+        """Publish events logged since the last poll to this worker's subscribers.
+
+        Must be called inside an application context.
+        """
+        with self._poll_lock:
+            now = datetime.utcnow()
+            window_start = now - timedelta(seconds=INBOX_EVENT_LOOKBACK_SECONDS)
+            events = [
+                event for event in db.session.query(
+                    InboxEvent.id, InboxEvent.user_id, InboxEvent.form_id, InboxEvent.change, InboxEvent.created_at
+                ).filter(InboxEvent.created_at >= window_start).order_by(InboxEvent.id)
+                if event.id not in self._seen
+            ]
+            self._seen = {
+                event_id: created_at for event_id, created_at in self._seen.items() if created_at >= window_start
+            }
+            self._seen.update((event.id, event.created_at) for event in events)
+
+            if time.monotonic() - self._last_prune >= INBOX_EVENT_RETENTION_SECONDS / 2:
+                self._last_prune = time.monotonic()
+                InboxEvent.query.filter(
+                    InboxEvent.created_at < now - timedelta(seconds=INBOX_EVENT_RETENTION_SECONDS)
+                ).delete(synchronize_session=False)
+
+            by_user = {}
+            for event in events:
+                by_user.setdefault(event.user_id, []).append({'type': event.change, 'form_id': event.form_id})
+            subscribed = self.has_subscribers(by_user) if deliver else []
+            pending_counts = get_pending_counts_for_approvers(subscribed) if subscribed else {}
+            db.session.commit()
+
+        for user_id in subscribed:
+            self.publish(user_id, {'changes': by_user[user_id], 'pending_for_me': pending_counts[user_id]})
+
+    def subscribe(self, user_id, queue_size):
+        subscription = InboxSubscription(user_id, queue_size)
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def has_subscribers(self, user_ids):
+        with self._lock:
+            return [user_id for user_id in user_ids if user_id in self._subscriptions]
+
+    def publish(self, user_id, update):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.queue.put_nowait(update)
+            except Full:
+                subscription.overflowed = True
+
+broker = InboxBroker()
+
+def streaming_supported(environ):
+    """False under a sync worker, where an open stream would hold the worker until it is killed.
+
+    Sync workers serve one request per process; threaded servers (gunicorn gthread,
+    the development server) and gevent workers can keep streams open alongside
+    other requests.
+    """
+    if environ.get('wsgi.multithread') or not environ.get('wsgi.multiprocess'):
+        return True
+    monkey = sys.modules.get('gevent.monkey')
+    return bool(monkey and monkey.is_module_patched('socket'))
+
+def _format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def stream_inbox(subscription, snapshot, heartbeat_seconds, inbox_broker=None):
+    """Yield SSE messages for a subscription until the client disconnects"""
+    inbox_broker = inbox_broker or broker
+    try:
+        yield _format_event('counters', snapshot)
+        while True:
+            if subscription.overflowed:
+                subscription.overflowed = False
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                yield _format_event('resync', {})
+                continue
+            try:
+                update = subscription.queue.get(timeout=heartbeat_seconds)
+            except Empty:
+                yield ': heartbeat\n\n'
+                continue
+            yield _format_event('inbox', update)
+    finally:
+        inbox_broker.unsubscribe(subscription)
+
+def record_inbox_changes(changes):
+    """Log (user_id, 'added' | 'removed', form_id) changes in the current transaction.
+
+    They reach open streams in every worker once committed, and vanish with a
+    rolled-back transaction.
+    """
+    if not changes:
+        return
+    now = datetime.utcnow()
+    db.session.execute(insert(InboxEvent), [
+        {'user_id': user_id, 'form_id': form_id, 'change': change_type, 'created_at': now}
+        for user_id, change_type, form_id in changes
+    ])
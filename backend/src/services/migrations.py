@@ -0,0 +1,236 @@
+import importlib.util
+import os
+import re
+import time
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Index, MetaData, String, Table, bindparam, inspect
+from src.models.user import db
+
+# Migration scripts live in src/migrations as NNNN_<name>.py, each defining
+# `revision`, `description`, `upgrade(op)` and `downgrade(op)`. History is linear
+# and ordered by revision.
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'migrations')
+MIGRATION_FILE = re.compile(r'^(\d{4})_\w+\.py$')
+BASE_REVISION = 'base'
+
+DEFAULT_BACKFILL_BATCH_SIZE = 1000
+
+# Kept out of db.metadata so create_all()/drop_all() never touch the version history
+version_metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations', version_metadata,
+    Column('revision', String(32), primary_key=True),
+    Column('description', String(200), nullable=True),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+class MigrationError(Exception):
+    pass
+
+class Migration:
+    def __init__(self, revision, description, upgrade, downgrade, path):
+        self.revision = revision
+        self.description = description
+        self.upgrade = upgrade
+        self.downgrade = downgrade
+        self.path = path
+
+class Operations:
+    """Schema and data operations handed to migration scripts as `op`.
+
+    Every operation runs and commits on its own, and schema operations are no-ops
+    when the change is already present, so a migration interrupted half way can
+    simply be run again. Backfills commit per batch to keep locks short while the
+    application keeps serving requests.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    @property
+    def dialect(self):
+        return self.engine.dialect.name
+
+    def quote(self, identifier):
+        """Quote a table, column or index name the way this database expects"""
+        return self.engine.dialect.identifier_preparer.quote(identifier)
+
+    def execute(self, sql, params=None):
+        with self.engine.begin() as connection:
+            return connection.execute(db.text(sql) if isinstance(sql, str) else sql, params or {})
+
+    def has_table(self, table_name):
+        return inspect(self.engine).has_table(table_name)
+
+    def has_column(self, table_name, column_name):
+        return any(column['name'] == column_name for column in inspect(self.engine).get_columns(table_name))
+
+    def has_index(self, table_name, index_name):
+        return any(index['name'] == index_name for index in inspect(self.engine).get_indexes(table_name))
+
+    def create_table(self, table):
+        """Create a Table defined in the migration, with its indexes, if it does not exist"""
+        table.create(bind=self.engine, checkfirst=True)
+
+    def drop_table(self, table_name):
+        self.execute(f'DROP TABLE IF EXISTS {self.quote(table_name)}')
+
+    def add_column(self, table_name, column):
+        """Add a Column; it must be nullable or carry a server_default so existing rows stay valid"""
+        if not column.nullable and column.server_default is None:
+            raise MigrationError(f'Column {table_name}.{column.name} needs nullable=True or a server_default')
+        if self.has_column(table_name, column.name):
+            return
+        column_type = column.type.compile(dialect=self.engine.dialect)
+        ddl = f'ALTER TABLE {self.quote(table_name)} ADD COLUMN {self.quote(column.name)} {column_type}'
+        if column.server_default is not None:
+            default = column.server_default.arg
+            ddl += ' DEFAULT ' + (default.text if hasattr(default, 'text') else "'" + str(default).replace("'", "''") + "'")
+        if not column.nullable:
+            ddl += ' NOT NULL'
+        self.execute(ddl)
+
+    def drop_column(self, table_name, column_name):
+        """Drop a column; drop any index that covers it first"""
+        if not self.has_column(table_name, column_name):
+            return
+        for index in inspect(self.engine).get_indexes(table_name):
+            if column_name in index['column_names']:
+                self.drop_index(index['name'], table_name)
+        self.execute(f'ALTER TABLE {self.quote(table_name)} DROP COLUMN {self.quote(column_name)}')
+
+    def create_index(self, index_name, table_name, columns, unique=False):
+        if self.has_index(table_name, index_name):
+            return
+        table = Table(table_name, MetaData(), autoload_with=self.engine)
+        index = Index(index_name, *[table.c[column] for column in columns], unique=unique)
+        index.create(bind=self.engine)
+
+    def drop_index(self, index_name, table_name):
+        if not self.has_index(table_name, index_name):
+            return
+        ddl = f'DROP INDEX {self.quote(index_name)}'
+        if self.dialect in ('mysql', 'mariadb'):
+            ddl += f' ON {self.quote(table_name)}'
+        self.execute(ddl)
+
+    def backfill(self, table_name, update, where=None, batch_size=DEFAULT_BACKFILL_BATCH_SIZE,
+                 pause_seconds=0, params=None):
+        """Update existing rows in id order, one committed batch at a time.
+
+        `update` is either a SQL SET clause (e.g. "pending_step = current_step"),
+        applied to the batch's rows, or a callable(connection, ids) that writes the
+        batch itself. `where` optionally limits the rows visited. Walking by id means
+        the loop ends even if `where` stays true after a row is updated. Returns the
+        number of rows visited.
+        """
+        condition = f' AND ({where})' if where else ''
+        select_ids = db.text(
+            f'SELECT id FROM {self.quote(table_name)} WHERE id > :after_id{condition} ORDER BY id LIMIT :batch_size'
+        )
+        if not callable(update):
+            update_sql = db.text(f'UPDATE {self.quote(table_name)} SET {update} WHERE id IN :ids').bindparams(
+                bindparam('ids', expanding=True)
+            )
+
+        visited = 0
+        after_id = 0
+        while True:
+            with self.engine.begin() as connection:
+                ids = connection.execute(
+                    select_ids, dict(params or {}, after_id=after_id, batch_size=batch_size)
+                ).scalars().all()
+                if not ids:
+                    return visited
+                if callable(update):
+                    update(connection, ids)
+                else:
+                    connection.execute(update_sql, dict(params or {}, ids=ids))
+            visited += len(ids)
+            after_id = ids[-1]
+            if pause_seconds:
+                time.sleep(pause_seconds)
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """Load every migration script, ordered by revision"""
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        path = os.path.join(directory, filename)
+        spec = importlib.util.spec_from_file_location(f'src.migrations.{filename[:-3]}', path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        if module.revision != match.group(1):
+            raise MigrationError(f'{filename} declares revision {module.revision}')
+        migrations.append(Migration(module.revision, module.description, module.upgrade, module.downgrade, path))
+    return migrations
+
+def applied_revisions():
+    """Revisions recorded in schema_migrations, oldest first"""
+    version_metadata.create_all(bind=db.engine, checkfirst=True)
+    with db.engine.connect() as connection:
+        return [
+            row.revision
+            for row in connection.execute(schema_migrations.select().order_by(schema_migrations.c.revision))
+        ]
+
+def current_revision():
+    applied = applied_revisions()
+    return applied[-1] if applied else BASE_REVISION
+
+def _find_revision(migrations, revision):
+    if revision in (None, BASE_REVISION):
+        return revision
+    if revision not in {migration.revision for migration in migrations}:
+        raise MigrationError(f'Unknown revision {revision}')
+    return revision
+
+def upgrade(target=None, log=print):
+    """Apply pending migrations up to target (default: the latest); returns the revisions applied.
+
+    Must be called inside an application context.
+    """
+    migrations = load_migrations()
+    target = _find_revision(migrations, target)
+    applied = set(applied_revisions())
+    operations = Operations(db.engine)
+    done = []
+    for migration in migrations:
+        if target is not None and migration.revision > target:
+            break
+        if migration.revision in applied:
+            continue
+        log(f'Upgrading to {migration.revision}: {migration.description}')
+        migration.upgrade(operations)
+        with db.engine.begin() as connection:
+            connection.execute(schema_migrations.insert().values(
+                revision=migration.revision,
+                description=migration.description,
+                applied_at=datetime.utcnow()
+            ))
+        done.append(migration.revision)
+    return done
+
+def downgrade(target, log=print):
+    """Revert applied migrations newer than target ('base' reverts all); returns the revisions reverted.
+
+    Must be called inside an application context.
+    """
+    migrations = load_migrations()
+    target = _find_revision(migrations, target)
+    applied = set(applied_revisions())
+    operations = Operations(db.engine)
+    done = []
+    for migration in reversed(migrations):
+        if target != BASE_REVISION and migration.revision <= target:
+            break
+        if migration.revision not in applied:
+            continue
+        log(f'Downgrading {migration.revision}: {migration.description}')
+        migration.downgrade(operations)
+        with db.engine.begin() as connection:
+            connection.execute(schema_migrations.delete().where(schema_migrations.c.revision == migration.revision))
+        done.append(migration.revision)
+    return done
@@ -0,0 +1,174 @@
+from flask import current_app
+from src.models.user import db, User
+from src.services.dispatch import RetryingDispatcher
+from src.services.sms import send_sms
+from collections import deque
+from email.message import EmailMessage
+from threading import Lock, Timer
+import json
+import logging
+import smtplib
+import urllib.request
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable through the matching keys in app.config
+DEFAULT_NOTIFICATION_SINKS = ('log',)  # any of 'log', 'email', 'sms', 'webhook'
+DEFAULT_NOTIFICATION_BATCH_SECONDS = 5
+DEFAULT_NOTIFICATION_WORKERS = 2
+
+# Batches LogSink remembers; older ones are dropped so long-running workers stay bounded
+LOG_SINK_HISTORY = 100
+
+EVENT_MESSAGES = {
+    'approval_requested': 'טופס {form_id} ממתין לאישורך',
+    'awaiting_final_approval': 'טופס {form_id} אושר וממתין לאישורך הסופי',
+    'form_rejected': 'טופס {form_id} נדחה',
+}
+
+class LogSink:
+    """Local stub: logs each batch and keeps the most recent ones in memory for inspection"""
+
+    def __init__(self, history=LOG_SINK_HISTORY):
+        self.delivered = deque(maxlen=history)
+
+    def deliver(self, recipient, notifications):
+        self.delivered.append((recipient, notifications))
+        logger.info('Notify %s: %s', recipient['email'], [n['message'] for n in notifications])
+
+class EmailSink:
+    """Sends one email per recipient batch through an SMTP relay"""
+
+    def __init__(self, host, port, sender):
+        self.host = host
+        self.port = port
+        self.sender = sender
+
+    def deliver(self, recipient, notifications):
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = recipient['email']
+        message['Subject'] = notifications[0]['message'] if len(notifications) == 1 else f'{len(notifications)} עדכוני טפסים'
+        message.set_content('\n'.join(n['message'] for n in notifications))
+        with smtplib.SMTP(self.host, self.port, timeout=10) as smtp:
+            smtp.send_message(message)
+
+class SMSSink:
+    """Hands one SMS per recipient batch to the SMS queue"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def deliver(self, recipient, notifications):
+        if not recipient['phone']:
+            return
+        with self.app.app_context():
+            send_sms(recipient['phone'], '\n'.join(n['message'] for n in notifications))
+
+class WebhookSink:
+    """POSTs each recipient batch as JSON to a configured URL"""
+
+    def __init__(self, url):
+        self.url = url
+
+    def deliver(self, recipient, notifications):
+        body = json.dumps({'recipient': recipient, 'notifications': notifications}).encode()
+        request = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=10):
+            pass
+
+def _build_sink(name, app):
+    config = app.config
+    if name == 'log':
+        return LogSink()
+    if name == 'email':
+        return EmailSink(
+            config.get('NOTIFICATION_SMTP_HOST', 'localhost'),
+            config.get('NOTIFICATION_SMTP_PORT', 25),
+            config.get('NOTIFICATION_EMAIL_FROM', 'forms@mofet.com')
+        )
+    if name == 'sms':
+        return SMSSink(app)
+    if name == 'webhook':
+        return WebhookSink(config['NOTIFICATION_WEBHOOK_URL'])
+    raise ValueError(f'Unknown notification sink: {name}')
+
+class Notifier:
+    """Buffers notifications per recipient for a short window, then fans each batch out to the sinks.
+
+    Within a window, repeated notifications about the same form and event reach a
+    recipient only once, and everything for one recipient is delivered together.
+    """
+
+    def __init__(self, sinks, batch_seconds, dispatcher):
+        self.sinks = sinks
+        self.batch_seconds = batch_seconds
+        self.dispatcher = dispatcher
+        self._pending = {}  # recipient_id -> (recipient, {(event_type, form_id): notification})
+        self._timer = None
+        self._lock = Lock()
+
+    def publish(self, recipients, event_type, form_id):
+        notification = {
+            'event': event_type,
+            'form_id': form_id,
+            'message': EVENT_MESSAGES[event_type].format(form_id=form_id)
+        }
+        with self._lock:
+            for recipient in recipients:
+                _, notifications = self._pending.setdefault(recipient['id'], (recipient, {}))
+                notifications[(event_type, form_id)] = notification
+            if self._pending and self._timer is None:
+                self._timer = Timer(self.batch_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Hand every buffered batch to the dispatcher now"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        for recipient, notifications in pending.values():
+            batch = list(notifications.values())
+            for sink in self.sinks:
+                self.dispatcher.submit(sink.deliver, recipient, batch)
+
+_notifier = None
+_notifier_lock = Lock()
+
+def get_notifier():
+    global _notifier
+    with _notifier_lock:
+        if _notifier is None:
+            app = current_app._get_current_object()
+            config = app.config
+            _notifier = Notifier(
+                [_build_sink(name, app) for name in config.get('NOTIFICATION_SINKS', DEFAULT_NOTIFICATION_SINKS)],
+                config.get('NOTIFICATION_BATCH_SECONDS', DEFAULT_NOTIFICATION_BATCH_SECONDS),
+                RetryingDispatcher('notifications', workers=config.get('NOTIFICATION_WORKERS', DEFAULT_NOTIFICATION_WORKERS))
+            )
+        return _notifier
+
+def notify_users(events):
+    """Publish (event_type, form_id, user_ids) events; call after the transition is committed.
+
+    Recipient contact details for all events are loaded with a single query. Failures
+    are logged rather than raised, since the transition itself has already succeeded.
+    """
+    user_ids = {user_id for _, _, ids in events for user_id in ids}
+    if not user_ids:
+        return
+    try:
+        recipients = {
+            user.id: {'id': user.id, 'email': user.email, 'phone': user.phone, 'full_name': user.full_name}
+            for user in db.session.query(User.id, User.email, User.phone, User.full_name).filter(
+                User.id.in_(user_ids), User.is_active == True
+            )
+        }
+        notifier = get_notifier()
+        for event_type, form_id, ids in events:
+            notifier.publish([recipients[i] for i in dict.fromkeys(ids) if i in recipients], event_type, form_id)
+    except Exception:
+        logger.exception('Failed to publish notifications')
@@ -0,0 +1,159 @@
+from flask import current_app
+from src.models.user import db, OTPCode
+from collections import deque
+from datetime import datetime, timedelta
+from sqlalchemy import func, update
+from threading import Lock
+import time
+
+# Defaults, overridable through the matching keys in app.config
+DEFAULT_OTP_BACKEND = 'database'  # 'database' works across workers; 'memory' is per process
+DEFAULT_OTP_TTL_SECONDS = 5 * 60
+DEFAULT_OTP_RESEND_LIMIT = 3  # resends per user per window
+DEFAULT_OTP_VERIFY_LIMIT = 5  # failed verifications before a code is invalidated
+DEFAULT_OTP_RATE_WINDOW_SECONDS = 5 * 60
+
+# Outcomes of verify_otp_code()
+OTP_VALID = 'valid'
+OTP_INVALID = 'invalid'  # wrong code, or no live code
+OTP_LOCKED = 'locked'  # the live code has used up its attempts; a new one must be requested
+
+def _config(key, default):
+    return current_app.config.get(key, default)
+
+class MemoryOTPStore:
+    """Keeps the latest code per user in process memory and evicts it once expired.
+
+    Only suitable when a single process serves both login and verification.
+    """
+
+    def __init__(self):
+        self._codes = {}  # user_id -> [code, expires_at as time.monotonic(), failed attempts]
+        self._issued = {}  # user_id -> deque of time.monotonic() issue times
+        self._lock = Lock()
+
+    def issue(self, user_id, code, ttl_seconds, window_seconds):
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now, window_seconds)
+            self._codes[user_id] = [code, now + ttl_seconds, 0]
+            self._issued.setdefault(user_id, deque()).append(now)
+
+    def issued_since(self, user_id, seconds):
+        since = time.monotonic() - seconds
+        with self._lock:
+            return sum(1 for issued_at in self._issued.get(user_id, ()) if issued_at > since)
+
+    def verify(self, user_id, code, max_attempts):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._codes.get(user_id)
+            if not entry or entry[1] <= now:
+                return OTP_INVALID
+            if entry[2] >= max_attempts:
+                return OTP_LOCKED
+            if entry[0] != code:
+                entry[2] += 1
+                return OTP_INVALID
+            del self._codes[user_id]
+            return OTP_VALID
+
+    def _evict_expired(self, now, window_seconds):
+        expired = [user_id for user_id, (_, expires_at, _) in self._codes.items() if expires_at <= now]
+        for user_id in expired:
+            del self._codes[user_id]
+        for user_id, issued in list(self._issued.items()):
+            while issued and issued[0] <= now - window_seconds:
+                issued.popleft()
+            if not issued:
+                del self._issued[user_id]
+
+class DatabaseOTPStore:
+    """Stores codes in the OTPCode table, so every worker sees the same codes and counters.
+
+    Issuing a code marks the user's earlier codes used; a code is also marked used
+    once verified. Each live code counts its failed attempts, and rows are kept
+    until both expired and older than the rate window, so recent rows double as
+    the resend history.
+    """
+
+    def issue(self, user_id, code, ttl_seconds, window_seconds):
+        now = datetime.utcnow()
+        OTPCode.query.filter(
+            OTPCode.expires_at <= now,
+            OTPCode.created_at <= now - timedelta(seconds=window_seconds)
+        ).delete(synchronize_session=False)
+        db.session.execute(
+            update(OTPCode).where(OTPCode.user_id == user_id, OTPCode.used == False).values(used=True)
+        )
+        db.session.add(OTPCode(
+            user_id=user_id,
+            code=code,
+            created_at=now,
+            expires_at=now + timedelta(seconds=ttl_seconds)
+        ))
+        db.session.commit()
+
+    def issued_since(self, user_id, seconds):
+        return db.session.query(func.count(OTPCode.id)).filter(
+            OTPCode.user_id == user_id,
+            OTPCode.created_at > datetime.utcnow() - timedelta(seconds=seconds)
+        ).scalar()
+
+    def verify(self, user_id, code, max_attempts):
+        # Each step is a single conditional UPDATE, so concurrent requests in any worker
+        # can neither use a code twice nor make more than max_attempts guesses
+        live = (
+            OTPCode.user_id == user_id,
+            OTPCode.used == False,
+            OTPCode.expires_at > datetime.utcnow(),
+        )
+        if db.session.execute(
+            update(OTPCode).where(*live, OTPCode.code == code, OTPCode.attempts < max_attempts).values(used=True)
+        ).rowcount:
+            result = OTP_VALID
+        elif db.session.execute(
+            update(OTPCode).where(*live, OTPCode.attempts < max_attempts).values(attempts=OTPCode.attempts + 1)
+        ).rowcount:
+            result = OTP_INVALID
+        else:
+            # Either no live code at all, or one that has run out of attempts
+            result = OTP_LOCKED if OTPCode.query.filter(*live).first() else OTP_INVALID
+        db.session.commit()
+        return result
+
+_memory_store = MemoryOTPStore()
+_database_store = DatabaseOTPStore()
+
+def get_otp_store():
+    backend = _config('OTP_BACKEND', DEFAULT_OTP_BACKEND)
+    if backend == 'memory':
+        return _memory_store
+    if backend == 'database':
+        return _database_store
+    raise ValueError(f'Unknown OTP backend: {backend}')
+
+def issue_otp(user_id, code):
+    """Store a new code for the user, superseding any earlier one"""
+    get_otp_store().issue(
+        user_id,
+        code,
+        _config('OTP_TTL_SECONDS', DEFAULT_OTP_TTL_SECONDS),
+        _config('OTP_RATE_WINDOW_SECONDS', DEFAULT_OTP_RATE_WINDOW_SECONDS)
+    )
+
+def verify_otp_code(user_id, code):
+    """Check a code against the user's live one: OTP_VALID, OTP_INVALID or OTP_LOCKED.
+
+    A valid code is used up. Every wrong guess counts against the live code, which
+    stops accepting anything, even the right code, after OTP_VERIFY_LIMIT of them.
+    """
+    return get_otp_store().verify(user_id, code, _config('OTP_VERIFY_LIMIT', DEFAULT_OTP_VERIFY_LIMIT))
+
+def allow_otp_resend(user_id):
+    """False once the user has had OTP_RESEND_LIMIT codes resent within the window.
+
+    The code sent at login counts too, so the limit applies on top of it.
+    """
+    issued = get_otp_store().issued_since(user_id, _config('OTP_RATE_WINDOW_SECONDS', DEFAULT_OTP_RATE_WINDOW_SECONDS))
+    return issued <= _config('OTP_RESEND_LIMIT', DEFAULT_OTP_RESEND_LIMIT)
@@ -0,0 +1,64 @@
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from threading import BoundedSemaphore, Lock
+import os
+
+# Werkzeug method string, e.g. 'scrypt', 'scrypt:16384:8:1' or 'pbkdf2:sha256:600000'.
+# Overridable through PASSWORD_HASH_METHOD in app.config.
+DEFAULT_PASSWORD_HASH_METHOD = 'scrypt'
+
+# Caps how many hashes or verifications run at once in a process; further callers wait
+# for a slot. This bounds CPU and (for scrypt) memory use during a burst of logins. It
+# does not make hashing faster or non-blocking: the calling thread still does the work.
+# Overridable through PASSWORD_HASH_WORKERS in app.config.
+DEFAULT_PASSWORD_HASH_WORKERS = os.cpu_count() or 1
+
+_slots = None
+_slots_lock = Lock()
+
+def _hash_workers():
+    return current_app.config.get('PASSWORD_HASH_WORKERS', DEFAULT_PASSWORD_HASH_WORKERS)
+
+def _hash_slots():
+    global _slots
+    with _slots_lock:
+        if _slots is None:
+            _slots = BoundedSemaphore(_hash_workers())
+        return _slots
+
+def hash_method():
+    return current_app.config.get('PASSWORD_HASH_METHOD', DEFAULT_PASSWORD_HASH_METHOD)
+
+@lru_cache(maxsize=8)
+def _method_prefix(method):
+    # Werkzeug fills in default parameters ('scrypt' -> 'scrypt:32768:8:1'), so read
+    # the fully specified prefix back from a real hash
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+def _capped_hash(slots, password, method):
+    with slots:
+        return generate_password_hash(password, method=method)
+
+def hash_password(password):
+    """Hash a password with the configured policy, waiting for a free hashing slot"""
+    return _capped_hash(_hash_slots(), password, hash_method())
+
+def hash_passwords(passwords):
+    """Hash several passwords, up to PASSWORD_HASH_WORKERS at a time.
+
+    hashlib releases the GIL while hashing, so a bulk load spreads over the cores.
+    """
+    slots, method = _hash_slots(), hash_method()
+    with ThreadPoolExecutor(max_workers=_hash_workers(), thread_name_prefix='password-hash') as pool:
+        return list(pool.map(lambda password: _capped_hash(slots, password, method), passwords))
+
+def verify_password(password_hash, password):
+    """Check a password against its hash, waiting for a free hashing slot"""
+    with _hash_slots():
+        return check_password_hash(password_hash, password)
+
+def needs_rehash(password_hash):
+    """True if a hash was produced with a different method or parameters than configured"""
+    return password_hash.split('$', 1)[0] != _method_prefix(hash_method())
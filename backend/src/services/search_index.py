@@ -0,0 +1,190 @@
+import re
+from sqlalchemy import bindparam
+from src.models.user import db, Form, FormApproval, FormTemplate
+
+# FTS5 full-text index over forms, keyed by rowid = form.id. Text is normalized in
+# Python before it reaches FTS5 (see normalize_search_text), so the same rules apply
+# when indexing and when querying.
+SEARCH_TABLE = 'form_search'
+REBUILD_BATCH_SIZE = 500
+
+# bm25 column weights: form content outranks approval comments
+CONTENT_WEIGHT = 2.0
+COMMENTS_WEIGHT = 1.0
+
+# Niqqud, cantillation and geresh/gershayim are dropped (so acronyms like צה"ל stay one word);
+# maqaf, paseq and sof pasuq split words
+HEBREW_MARKS = re.compile('[\u0591-\u05bd\u05bf\u05c1\u05c2\u05c4\u05c5\u05c7\u05f3\u05f4"\']')
+HEBREW_SEPARATORS = re.compile('[\u05be\u05c0\u05c3\u05c6]')
+FINAL_LETTERS = str.maketrans('ךםןףץ', 'כמנפצ')
+TOKEN = re.compile(r'\w+')
+HEBREW_WORD = re.compile('^[\u05d0-\u05ea]+$')
+
+# One-letter prefixes (ו, ה, ב, כ, ל, מ, ש) attach to Hebrew words; up to two are stripped
+HEBREW_PREFIXES = 'והבכלמש'
+MAX_PREFIX_LETTERS = 2
+MIN_STEM_LENGTH = 3
+
+def is_search_supported():
+    """FTS5 only exists on SQLite"""
+    return db.engine.dialect.name == 'sqlite'
+
+def normalize_search_text(text):
+    """Lower-case, strip niqqud and fold final letters so spelling variants share tokens"""
+    text = HEBREW_MARKS.sub('', text)
+    text = HEBREW_SEPARATORS.sub(' ', text)
+    return text.lower().translate(FINAL_LETTERS)
+
+def hebrew_variants(token):
+    """The token plus the forms left after stripping leading prefix letters"""
+    variants = [token]
+    if HEBREW_WORD.match(token):
+        for count in range(1, MAX_PREFIX_LETTERS + 1):
+            if len(token) - count < MIN_STEM_LENGTH or token[count - 1] not in HEBREW_PREFIXES:
+                break
+            variants.append(token[count:])
+    return variants
+
+def tokenize(text):
+    return TOKEN.findall(normalize_search_text(text))
+
+def index_text(values):
+    """Searchable text for a list of raw strings, with prefix-stripped variants appended"""
+    terms = []
+    for value in values:
+        for token in tokenize(value):
+            terms.extend(hebrew_variants(token))
+    return ' '.join(terms)
+
+def build_match_query(q):
+    """Turn free text into an FTS5 query: every word must match, as a prefix, in any of its variants"""
+    clauses = []
+    for token in tokenize(q or ''):
+        variants = ' OR '.join(f'"{variant}"*' for variant in dict.fromkeys(hebrew_variants(token)))
+        clauses.append(f'({variants})')
+    return ' AND '.join(clauses)
+
+def form_data_values(form_data):
+    values = []
+    for value in (form_data or {}).values() if isinstance(form_data, dict) else []:
+        for item in value if isinstance(value, list) else [value]:
+            if isinstance(item, (str, int, float)) and not isinstance(item, bool):
+                values.append(str(item))
+    return values
+
+def ensure_search_index():
+    """Create the FTS5 table if missing; returns True when it was just created"""
+    if not is_search_supported():
+        return False
+    exists = db.session.execute(
+        db.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': SEARCH_TABLE}
+    ).first()
+    if exists:
+        return False
+    db.session.execute(db.text(
+        f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(content, comments, tokenize = 'unicode61')"
+    ))
+    db.session.commit()
+    return True
+
+def search_index_is_empty():
+    """True when the FTS5 table holds no rows, e.g. right after the migration created it"""
+    if not is_search_supported():
+        return False
+    return db.session.execute(db.text(f'SELECT 1 FROM {SEARCH_TABLE} LIMIT 1')).first() is None
+
+def drop_search_index():
+    if is_search_supported():
+        db.session.execute(db.text(f'DROP TABLE IF EXISTS {SEARCH_TABLE}'))
+        db.session.commit()
+
+def write_search_rows(rows):
+    """Replace index rows given (form_id, content, comments) tuples; runs in the caller's transaction"""
+    if not rows or not is_search_supported():
+        return
+    db.session.execute(
+        db.text(f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN :form_ids').bindparams(
+            bindparam('form_ids', expanding=True)
+        ),
+        {'form_ids': [form_id for form_id, _, _ in rows]}
+    )
+    db.session.execute(
+        db.text(f'INSERT INTO {SEARCH_TABLE} (rowid, content, comments) VALUES (:form_id, :content, :comments)'),
+        [{'form_id': form_id, 'content': content, 'comments': comments} for form_id, content, comments in rows]
+    )
+
+def index_new_forms(forms):
+    """Index freshly created forms, given (form_id, template, form_data) tuples; they have no comments yet"""
+    write_search_rows([
+        (form_id, index_text([template.name_hebrew or '', template.name or ''] + form_data_values(form_data)), '')
+        for form_id, template, form_data in forms
+    ])
+
+def refresh_search_entries(form_ids):
+    """Re-index forms from the database, e.g. after approval comments were added"""
+    form_ids = list(dict.fromkeys(form_ids))
+    if not form_ids or not is_search_supported():
+        return
+    comments = {}
+    for form_id, comment in db.session.query(FormApproval.form_id, FormApproval.comments).filter(
+        FormApproval.form_id.in_(form_ids),
+        FormApproval.comments.isnot(None),
+        FormApproval.comments != ''
+    ).order_by(FormApproval.id):
+        comments.setdefault(form_id, []).append(comment)
+    
+    rows = db.session.query(Form.id, Form.form_data, FormTemplate.name, FormTemplate.name_hebrew).join(
+        FormTemplate, Form.template_id == FormTemplate.id
+    ).filter(Form.id.in_(form_ids))
+    write_search_rows([
+        (
+            form_id,
+            index_text([name_hebrew or '', name or ''] + form_data_values(form_data)),
+            index_text(comments.get(form_id, []))
+        )
+        for form_id, form_data, name, name_hebrew in rows
+    ])
+
+def rebuild_search_index():
+    """Drop and re-index every form in batches; commits and returns the number of forms indexed"""
+    if not is_search_supported():
+        return 0
+    drop_search_index()
+    ensure_search_index()
+    indexed = _refresh_in_batches(db.session.query(Form.id).order_by(Form.id))
+    db.session.commit()
+    return indexed
+
+def refresh_template_search_entries(template_id):
+    """Re-index one template's forms in batches, e.g. after the template was renamed.
+
+    Does not commit; returns the number of forms re-indexed.
+    """
+    if not is_search_supported():
+        return 0
+    return _refresh_in_batches(
+        db.session.query(Form.id).filter(Form.template_id == template_id).order_by(Form.id)
+    )
+
+def _refresh_in_batches(form_ids_query):
+    indexed = 0
+    batch = []
+    for (form_id,) in form_ids_query.yield_per(REBUILD_BATCH_SIZE):
+        batch.append(form_id)
+        if len(batch) >= REBUILD_BATCH_SIZE:
+            refresh_search_entries(batch)
+            indexed += len(batch)
+            batch = []
+    refresh_search_entries(batch)
+    indexed += len(batch)
+    return indexed
+
+def search_matches(match_query):
+    """Subquery of (form_id, rank) for an FTS5 query; lower rank is a better match"""
+    return db.text(
+        f'SELECT rowid AS form_id, bm25({SEARCH_TABLE}, {CONTENT_WEIGHT}, {COMMENTS_WEIGHT}) AS rank '
+        f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match_query'
+    ).bindparams(match_query=match_query).columns(
+        db.column('form_id', db.Integer), db.column('rank', db.Float)
+    ).subquery('search_matches')
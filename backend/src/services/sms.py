@@ -0,0 +1,58 @@
+from flask import current_app
+from src.services.dispatch import RetryingDispatcher
+from threading import Lock
+
+# Defaults, overridable through the matching keys in app.config
+DEFAULT_SMS_GATEWAY = 'console'  # 'console' or 'fake'
+DEFAULT_SMS_WORKERS = 2
+DEFAULT_SMS_MAX_ATTEMPTS = 5
+DEFAULT_SMS_RETRY_BASE_SECONDS = 0.5
+
+class ConsoleSMSGateway:
+    """Simulates sending SMS by printing - in production, integrate with SMS service"""
+
+    def send(self, phone, message):
+        print(f"SMS to {phone}: {message}")
+
+class FakeSMSGateway:
+    """Records messages instead of sending them; can be told to fail the next N sends"""
+
+    def __init__(self):
+        self.sent = []
+        self.failures_remaining = 0
+        self._lock = Lock()
+
+    def send(self, phone, message):
+        with self._lock:
+            if self.failures_remaining > 0:
+                self.failures_remaining -= 1
+                raise ConnectionError('Fake SMS gateway failure')
+            self.sent.append((phone, message))
+
+_gateways = {
+    'console': ConsoleSMSGateway(),
+    'fake': FakeSMSGateway()
+}
+
+_dispatcher = None
+_dispatcher_lock = Lock()
+
+def get_sms_gateway():
+    return _gateways[current_app.config.get('SMS_GATEWAY', DEFAULT_SMS_GATEWAY)]
+
+def get_sms_dispatcher():
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            config = current_app.config
+            _dispatcher = RetryingDispatcher(
+                'sms',
+                workers=config.get('SMS_WORKERS', DEFAULT_SMS_WORKERS),
+                max_attempts=config.get('SMS_MAX_ATTEMPTS', DEFAULT_SMS_MAX_ATTEMPTS),
+                backoff_base_seconds=config.get('SMS_RETRY_BASE_SECONDS', DEFAULT_SMS_RETRY_BASE_SECONDS)
+            )
+        return _dispatcher
+
+def send_sms(phone, message):
+    """Queue an SMS for background delivery; returns without waiting for the gateway"""
+    get_sms_dispatcher().submit(get_sms_gateway().send, phone, message)
@@ -0,0 +1,165 @@
+from src.models.user import db, Form, FormApproval, FormStats
+from sqlalchemy import func, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from collections import Counter
+
+PENDING_STATUSES = ('pending', 'awaiting_final_approval')
+
+STATUS_SCOPE = 'status'
+TEMPLATE_SCOPE = 'template'
+APPROVER_PENDING_SCOPE = 'approver_pending'
+INITIATOR_SCOPE = 'initiator'
+
+def get_form_counts():
+    """Count forms per (status, template_id) with a single GROUP BY scan"""
+    rows = db.session.query(
+        Form.status, Form.template_id, func.count(Form.id)
+    ).group_by(Form.status, Form.template_id).all()
+    return {(status, template_id): count for status, template_id, count in rows}
+
+def get_form_summary():
+    """Form totals by status and by template, read from the FormStats counters"""
+    by_status = {}
+    by_template = {}
+    for stat in FormStats.query.filter(FormStats.scope.in_([STATUS_SCOPE, TEMPLATE_SCOPE])).all():
+        if stat.scope == STATUS_SCOPE:
+            by_status[stat.key] = stat.count
+        else:
+            by_template[int(stat.key)] = stat.count
+    
+    return {
+        'total': sum(by_status.values()),
+        'pending': sum(by_status.get(status, 0) for status in PENDING_STATUSES),
+        'by_status': by_status,
+        'by_template': by_template
+    }
+
+def get_pending_count_for_approver(approver_id):
+    """Number of pending approvals assigned to a user, read from the FormStats counters"""
+    stat = FormStats.query.filter_by(scope=APPROVER_PENDING_SCOPE, key=str(approver_id)).first()
+    return stat.count if stat else 0
+
+def get_form_count_for_initiator(initiator_id):
+    """Number of forms a user has submitted, read from the FormStats counters"""
+    stat = FormStats.query.filter_by(scope=INITIATOR_SCOPE, key=str(initiator_id)).first()
+    return stat.count if stat else 0
+
+def adjust_stat(scope, key, delta):
+    """Add delta to a counter in the current transaction, creating it if needed.
+
+    Creating and incrementing is one upsert against the (scope, key) unique
+    constraint, so concurrent transactions that both find the counter missing
+    don't both insert it.
+    """
+    if not delta:
+        return
+    dialect = db.engine.dialect.name
+    values = {'scope': scope, 'key': str(key), 'count': delta}
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite_insert if dialect == 'sqlite' else postgresql_insert
+        db.session.execute(insert(FormStats).values(values).on_conflict_do_update(
+            index_elements=['scope', 'key'], set_={'count': FormStats.count + delta}
+        ))
+    elif dialect in ('mysql', 'mariadb'):
+        db.session.execute(mysql_insert(FormStats).values(values).on_duplicate_key_update(
+            count=FormStats.count + delta
+        ))
+    else:
+        _update_or_insert_stat(scope, str(key), delta)
+
+def _update_or_insert_stat(scope, key, delta):
+    """Portable fallback: a losing concurrent INSERT is rolled back to its savepoint and retried as an UPDATE"""
+    increment = (
+        update(FormStats)
+        .where(FormStats.scope == scope, FormStats.key == key)
+        .values(count=FormStats.count + delta)
+    )
+    if db.session.execute(increment).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(FormStats(scope=scope, key=key, count=delta))
+    except IntegrityError:
+        db.session.execute(increment)
+
+def record_forms_created(template_ids, approver_ids, initiator_id, status='pending'):
+    """Count one initiator's new forms and the pending approvals created for them, one update per counter"""
+    deltas = Counter()
+    for template_id in template_ids:
+        deltas[(STATUS_SCOPE, status)] += 1
+        deltas[(TEMPLATE_SCOPE, template_id)] += 1
+        deltas[(INITIATOR_SCOPE, initiator_id)] += 1
+    for approver_id in approver_ids:
+        deltas[(APPROVER_PENDING_SCOPE, approver_id)] += 1
+    
+    for (scope, key), delta in deltas.items():
+        adjust_stat(scope, key, delta)
+
+def record_status_change(old_status, new_status):
+    """Move one form between status counters"""
+    record_status_changes([(old_status, new_status)])
+
+def record_status_changes(transitions):
+    """Apply many (old_status, new_status) moves with one update per affected counter"""
+    deltas = Counter()
+    for old_status, new_status in transitions:
+        if old_status != new_status:
+            deltas[old_status] -= 1
+            deltas[new_status] += 1
+    
+    for status, delta in deltas.items():
+        adjust_stat(STATUS_SCOPE, status, delta)
+
+def record_pending_approval(approver_id, delta):
+    """Adjust an approver's pending counter when an approval is added (+1) or acted on (-1)"""
+    adjust_stat(APPROVER_PENDING_SCOPE, approver_id, delta)
+
+def rebuild_form_stats():
+    """Recompute every FormStats counter from the form tables.
+
+    Returns the counters that differed from the stored values as
+    {(scope, key): (stored, actual)}, so callers can report drift.
+    """
+    actual = {}
+    for (status, template_id), count in get_form_counts().items():
+        status_key = (STATUS_SCOPE, str(status))
+        template_key = (TEMPLATE_SCOPE, str(template_id))
+        actual[status_key] = actual.get(status_key, 0) + count
+        actual[template_key] = actual.get(template_key, 0) + count
+    
+    pending_rows = db.session.query(
+        FormApproval.approver_id, func.count(FormApproval.id)
+    ).filter(FormApproval.action == 'pending').group_by(FormApproval.approver_id).all()
+    for approver_id, count in pending_rows:
+        actual[(APPROVER_PENDING_SCOPE, str(approver_id))] = count
+    
+    initiator_rows = db.session.query(Form.initiator_id, func.count(Form.id)).group_by(Form.initiator_id).all()
+    for initiator_id, count in initiator_rows:
+        actual[(INITIATOR_SCOPE, str(initiator_id))] = count
+    
+    stored = {(stat.scope, stat.key): stat.count for stat in FormStats.query.all()}
+    drift = {
+        key: (stored.get(key, 0), actual.get(key, 0))
+        for key in set(stored) | set(actual)
+        if stored.get(key, 0) != actual.get(key, 0)
+    }
+    
+    FormStats.query.delete()
+    for (scope, key), count in actual.items():
+        db.session.add(FormStats(scope=scope, key=key, count=count))
+    db.session.commit()
+    
+    return drift
+
+def get_pending_counts_for_approvers(approver_ids):
+    """{approver_id: pending approvals} for several users with one query"""
+    counts = {approver_id: 0 for approver_id in approver_ids}
+    for stat in FormStats.query.filter(
+        FormStats.scope == APPROVER_PENDING_SCOPE,
+        FormStats.key.in_([str(approver_id) for approver_id in approver_ids])
+    ):
+        counts[int(stat.key)] = stat.count
+    return counts
@@ -0,0 +1,104 @@
+from flask import current_app, g, request, session
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+import time
+
+ACCESS_TOKEN_SALT = 'mofet-access-token'
+REFRESH_TOKEN_SALT = 'mofet-refresh-token'
+
+# Defaults in seconds, overridable through ACCESS_TOKEN_MAX_AGE / REFRESH_TOKEN_MAX_AGE in app.config
+DEFAULT_ACCESS_TOKEN_MAX_AGE = 15 * 60
+DEFAULT_REFRESH_TOKEN_MAX_AGE = 7 * 24 * 60 * 60
+
+def _serializer(salt):
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=salt)
+
+def access_token_max_age():
+    return current_app.config.get('ACCESS_TOKEN_MAX_AGE', DEFAULT_ACCESS_TOKEN_MAX_AGE)
+
+def refresh_token_max_age():
+    return current_app.config.get('REFRESH_TOKEN_MAX_AGE', DEFAULT_REFRESH_TOKEN_MAX_AGE)
+
+def issue_access_token(user):
+    """Signed, short-lived token carrying only what authorization needs.
+
+    The profile is not embedded: requests resolve the user from the database (see
+    authorization.get_current_principal), so deactivation and edits apply at once.
+    """
+    return _serializer(ACCESS_TOKEN_SALT).dumps({
+        'sub': user.id,
+        'role': user.role,
+        'type': 'access',
+        'exp': int(time.time()) + access_token_max_age()
+    })
+
+def issue_refresh_token(user):
+    """Signed, long-lived token that can only be exchanged for a new access token.
+
+    It carries the user's token_version; bumping that (see revoke_refresh_tokens)
+    invalidates every refresh token issued before.
+    """
+    return _serializer(REFRESH_TOKEN_SALT).dumps({
+        'sub': user.id,
+        'type': 'refresh',
+        'ver': user.token_version or 0,
+        'exp': int(time.time()) + refresh_token_max_age()
+    })
+
+def issue_tokens(user):
+    """Token fields added to successful login responses"""
+    return {
+        'access_token': issue_access_token(user),
+        'refresh_token': issue_refresh_token(user),
+        'token_type': 'Bearer',
+        'expires_in': access_token_max_age()
+    }
+
+def _load_token(token, salt, token_type, max_age):
+    try:
+        claims = _serializer(salt).loads(token, max_age=max_age)
+    except BadSignature:
+        return None
+    if not isinstance(claims, dict) or claims.get('type') != token_type or claims.get('exp', 0) <= time.time():
+        return None
+    return claims
+
+def load_access_token(token):
+    """Return the claims of a valid access token, or None if it is forged, expired or another kind of token"""
+    return _load_token(token, ACCESS_TOKEN_SALT, 'access', access_token_max_age())
+
+def load_refresh_token(token):
+    """Return the claims of a valid refresh token, or None if it is forged, expired or another kind of token.
+
+    Whether it has been revoked is up to the caller, which compares 'ver' with the user's token_version.
+    """
+    return _load_token(token, REFRESH_TOKEN_SALT, 'refresh', refresh_token_max_age())
+
+def revoke_refresh_tokens(user):
+    """Invalidate every refresh token issued to the user so far; the caller commits"""
+    user.token_version = (user.token_version or 0) + 1
+
+def accepts_query_token(view):
+    """Let a view also take the access token from ?access_token=, for clients that cannot set headers.
+
+    Kept to the views that need it, since URLs end up in logs and browser history.
+    """
+    view.accepts_query_token = True
+    return view
+
+def _resolve_request_claims():
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        # An explicit token never falls back to the cookie session
+        return load_access_token(auth_header[len('Bearer '):].strip())
+    view = current_app.view_functions.get(request.endpoint)
+    if getattr(view, 'accepts_query_token', False) and 'access_token' in request.args:
+        return load_access_token(request.args['access_token'])
+    if 'user_id' in session:
+        return {'sub': session['user_id'], 'role': session.get('user_role')}
+    return None
+
+def get_request_claims():
+    """Claims of the caller, from a Bearer access token (or ?access_token= where accepted) or the cookie session, or None"""
+    if 'auth_claims' not in g:
+        g.auth_claims = _resolve_request_claims()
+    return g.auth_claims
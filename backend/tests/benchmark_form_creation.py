@@ -0,0 +1,95 @@
+"""Form creation throughput, with the role-approver cache warm vs rebuilt per form.
+
+Not collected by pytest: numbers depend on the machine. Run from backend/:
+
+    python tests/benchmark_form_creation.py --forms 500 --steps 3 --approvers 20 --threads 4
+
+Each form goes through POST /api/forms/ on a template whose approval chain has
+--steps roles of --approvers users each. The cold run drops the approver cache
+before every form, which is what each creation cost before the cache existed.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.main import create_app
+from src.models.user import db, FormTemplate, Role, User, UserRole
+from src.services.approvers import invalidate_role_approvers
+from src.services.migrations import upgrade
+
+def populate(app, steps, approvers):
+    """Create the roles, their approvers, one initiator and a template; return (initiator, template) IDs"""
+    with app.app_context():
+        upgrade(log=lambda message: None)
+        initiator = User(email='initiator@mofet.com', full_name='initiator', role='user', is_active=True,
+                         password_hash='-')
+        db.session.add(initiator)
+        chain = []
+        for step in range(steps):
+            role = Role(name=f'approver{step}', name_hebrew=f'מאשר{step}', permissions={})
+            db.session.add(role)
+            db.session.flush()
+            chain.append(role.id)
+            for number in range(approvers):
+                user = User(email=f'approver{step}_{number}@mofet.com', full_name=f'approver {step}/{number}',
+                            role='user', is_active=True, password_hash='-')
+                db.session.add(user)
+                db.session.flush()
+                db.session.add(UserRole(user_id=user.id, role_id=role.id))
+        template = FormTemplate(name='benchmark', name_hebrew='benchmark', form_type='general',
+                                fields_config=[], approval_chain=chain, created_by=initiator.id)
+        db.session.add(template)
+        db.session.commit()
+        return initiator.id, template.id
+
+def run(label, forms, steps, approvers, threads, cold):
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, 'benchmark.db')}"})
+        initiator_id, template_id = populate(app, steps, approvers)
+        invalidate_role_approvers()
+
+        failures = []
+        def create_repeatedly(count):
+            client = app.test_client()
+            with client.session_transaction() as session:
+                session['user_id'] = initiator_id
+                session['user_role'] = 'user'
+            for _ in range(count):
+                if cold:
+                    invalidate_role_approvers()
+                response = client.post('/api/forms/', json={'template_id': template_id, 'form_data': {}})
+                if response.status_code != 201:
+                    failures.append(response.status_code)
+
+        # One form outside the timing warms the principal cache (and, for the warm run, the approvers)
+        create_repeatedly(1)
+        per_thread = max(forms // threads, 1)
+        clients = [threading.Thread(target=create_repeatedly, args=(per_thread,)) for _ in range(threads)]
+        started = time.perf_counter()
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        with app.app_context():
+            db.engine.dispose()
+        invalidate_role_approvers()
+
+    total = per_thread * threads
+    print(f'{label} steps={steps} approvers/step={approvers} threads={threads}: {total} forms in '
+          f'{elapsed:.2f}s = {total / elapsed:.1f} forms/s, {len(failures)} failed')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--forms', type=int, default=500, help='total forms per run')
+    parser.add_argument('--steps', type=int, default=3, help='roles in the approval chain')
+    parser.add_argument('--approvers', type=int, default=20, help='users holding each role')
+    parser.add_argument('--threads', type=int, default=4, help='concurrent clients')
+    args = parser.parse_args()
+    run('cold cache', args.forms, args.steps, args.approvers, args.threads, cold=True)
+    run('warm cache', args.forms, args.steps, args.approvers, args.threads, cold=False)
@@ -0,0 +1,68 @@
+"""Login throughput under the configured password hashing policy.
+
+Not collected by pytest: numbers depend on the machine. Run from backend/:
+
+    python tests/benchmark_login.py --method scrypt --threads 4 --logins 40
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.main import create_app
+from src.models.user import db, User
+from src.services.migrations import upgrade
+from src.services.passwords import DEFAULT_PASSWORD_HASH_METHOD, DEFAULT_PASSWORD_HASH_WORKERS
+
+def run(method, workers, threads, logins):
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, 'benchmark.db')}",
+            'PASSWORD_HASH_METHOD': method,
+            'PASSWORD_HASH_WORKERS': workers,
+        })
+        with app.app_context():
+            upgrade(log=lambda message: None)
+            user = User(email='benchmark@mofet.com', full_name='benchmark', role='user', is_active=True)
+            user.set_password('benchmark')
+            db.session.add(user)
+            db.session.commit()
+
+        failures = []
+        def login_repeatedly(count):
+            client = app.test_client()
+            for _ in range(count):
+                response = client.post('/api/auth/login', json={'email': 'benchmark@mofet.com', 'password': 'benchmark'})
+                if response.status_code != 200:
+                    failures.append(response.status_code)
+
+        per_thread = max(logins // threads, 1)
+        clients = [threading.Thread(target=login_repeatedly, args=(per_thread,)) for _ in range(threads)]
+        started = time.perf_counter()
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        with app.app_context():
+            db.engine.dispose()
+
+    total = per_thread * threads
+    # Hashing can occupy at most one core per slot, and no more cores than the machine has
+    cores = min(workers, os.cpu_count() or 1)
+    print(f'{method} cap={workers} threads={threads}: {total} logins in {elapsed:.2f}s '
+          f'= {total / elapsed:.1f} logins/s, {total / elapsed / cores:.1f} logins/s per core '
+          f'({cores} core(s)), {len(failures)} failed')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--method', default=DEFAULT_PASSWORD_HASH_METHOD)
+    parser.add_argument('--workers', type=int, default=DEFAULT_PASSWORD_HASH_WORKERS, help='PASSWORD_HASH_WORKERS')
+    parser.add_argument('--threads', type=int, default=4, help='concurrent clients')
+    parser.add_argument('--logins', type=int, default=40, help='total logins')
+    args = parser.parse_args()
+    run(args.method, args.workers, args.threads, args.logins)
@@ -0,0 +1,131 @@
+"""Concurrent reads and writes against a file SQLite database, stock vs tuned pragmas.
+
+Not collected by pytest: numbers depend on the machine and its disk. Run from backend/:
+
+    python tests/benchmark_sqlite_concurrency.py --forms 20000 --writers 4 --readers 4 --seconds 5
+
+Writers update a form and insert a field-index row per transaction; readers run the
+status GROUP BY and the newest-50 listing.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.exc import OperationalError
+from src.main import create_app
+from src.models.user import db
+from src.services.migrations import upgrade
+
+# SQLite's own defaults, with the same busy_timeout so both runs wait on locks rather than fail
+STOCK_PRAGMAS = {
+    'journal_mode': 'DELETE',
+    'synchronous': 'FULL',
+    'busy_timeout': 5000,
+    'mmap_size': 0,
+    'cache_size': -2000,
+    'temp_store': 'DEFAULT',
+}
+
+def make_app(path, pragmas):
+    return create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'SQLITE_PRAGMAS': pragmas,
+    })
+
+def populate(path, pragmas, forms):
+    # The journal mode is a property of the file, so it is set here, before any worker connects
+    app = make_app(path, pragmas)
+    with app.app_context():
+        upgrade(log=lambda message: None)
+        now = datetime.utcnow()
+        db.session.execute(db.text(
+            "INSERT INTO user (id, email, password_hash, full_name, role, is_active) "
+            "VALUES (1, 'benchmark@mofet.com', '-', 'benchmark', 'admin', 1)"
+        ))
+        db.session.execute(db.text(
+            "INSERT INTO form_template (id, name, name_hebrew, form_type, fields_config, approval_chain, created_by) "
+            "VALUES (1, 'benchmark', 'benchmark', 'general', '[]', '[]', 1)"
+        ))
+        db.session.execute(db.text(
+            "INSERT INTO form (template_id, initiator_id, form_data, status, current_step, created_at, updated_at) "
+            "VALUES (1, 1, '{}', :status, 0, :now, :now)"
+        ), [{'status': ('pending', 'approved', 'rejected', 'completed')[i % 4], 'now': now} for i in range(forms)])
+        db.session.commit()
+        db.engine.dispose()
+
+def writer(path, pragmas, forms, seconds, results):
+    app = make_app(path, pragmas)
+    writes = errors = 0
+    deadline = time.monotonic() + seconds
+    with app.app_context():
+        while time.monotonic() < deadline:
+            form_id = writes % forms + 1
+            try:
+                db.session.execute(db.text('UPDATE form SET updated_at = :now WHERE id = :id'),
+                                   {'now': datetime.utcnow(), 'id': form_id})
+                db.session.execute(db.text(
+                    "INSERT INTO form_field_value (form_id, field_name, value) VALUES (:id, 'benchmark', 'x')"
+                ), {'id': form_id})
+                db.session.commit()
+                writes += 1
+            except OperationalError:
+                db.session.rollback()
+                errors += 1
+    results.put(('write', writes, errors, []))
+
+def reader(path, pragmas, seconds, results):
+    app = make_app(path, pragmas)
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + seconds
+    with app.app_context():
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                db.session.execute(db.text('SELECT status, count(*) FROM form GROUP BY status')).all()
+                db.session.execute(db.text('SELECT * FROM form ORDER BY created_at DESC, id DESC LIMIT 50')).all()
+                db.session.commit()
+                latencies.append(time.perf_counter() - started)
+            except OperationalError:
+                db.session.rollback()
+                errors += 1
+    results.put(('read', len(latencies), errors, latencies))
+
+def run(label, pragmas, forms, writers, readers, seconds):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'benchmark.db')
+        populate(path, pragmas, forms)
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=writer, args=(path, pragmas, forms, seconds, results))
+                     for _ in range(writers)]
+        processes += [multiprocessing.Process(target=reader, args=(path, pragmas, seconds, results))
+                      for _ in range(readers)]
+        for process in processes:
+            process.start()
+        outcomes = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+    writes = sum(count for kind, count, _, _ in outcomes if kind == 'write')
+    reads = sum(count for kind, count, _, _ in outcomes if kind == 'read')
+    errors = sum(error_count for _, _, error_count, _ in outcomes)
+    latencies = sorted(latency for _, _, _, samples in outcomes for latency in samples)
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else float('nan')
+    print(f'{label}: {writes / seconds:.0f} writes/s, {reads / seconds:.0f} reads/s, '
+          f'p95 read {p95:.0f} ms, {errors} lock errors')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--forms', type=int, default=20000)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+    run('stock', STOCK_PRAGMAS, args.forms, args.writers, args.readers, args.seconds)
+    run('tuned', {}, args.forms, args.writers, args.readers, args.seconds)
@@ -0,0 +1,85 @@
+"""Per-worker boot cost: imports, create_app() and the first request, in fresh interpreters.
+
+Not collected by pytest: numbers depend on the machine. Run from backend/:
+
+    python tests/benchmark_startup.py --runs 10
+
+Every run is a new Python process, as a restarted worker would be, against a file
+database that `init-db` has already prepared. The "boot with init-db" line adds
+the schema check and admin seeding that every process used to do on start.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+def boot(uri, with_init_db):
+    """Time one worker boot in this process; returns {phase: seconds}"""
+    started = time.perf_counter()
+    from src.main import create_app, init_db
+    imported = time.perf_counter()
+    app = create_app({'SQLALCHEMY_DATABASE_URI': uri})
+    if with_init_db:
+        with app.app_context():
+            init_db()
+    created = time.perf_counter()
+
+    client = app.test_client()
+    # The first request into the database also opens its connection and loads the blueprints' models
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+        session['user_role'] = 'admin'
+    response = client.get('/api/forms/templates')
+    assert response.status_code == 200, response.status_code
+    answered = time.perf_counter()
+    return {'import': imported - started, 'create_app': created - imported, 'first request': answered - created}
+
+def prepare(uri):
+    """Migrate the database and seed the admin once, as `flask init-db` would"""
+    subprocess.run([sys.executable, __file__, '--prepare', uri], cwd=BACKEND_DIR, check=True,
+                   stdout=subprocess.DEVNULL)
+
+def measure(uri, runs, with_init_db):
+    timings = []
+    for _ in range(runs):
+        command = [sys.executable, __file__, '--child', uri] + (['--with-init-db'] if with_init_db else [])
+        output = subprocess.run(command, cwd=BACKEND_DIR, check=True, capture_output=True, text=True).stdout
+        timings.append(json.loads(output.strip().splitlines()[-1]))
+    return timings
+
+def report(label, timings):
+    phases = ', '.join(
+        f'{phase} {statistics.median(run[phase] for run in timings) * 1000:.0f} ms'
+        for phase in timings[0]
+    )
+    totals = sorted(sum(run.values()) for run in timings)
+    print(f'{label}: median {statistics.median(totals) * 1000:.0f} ms, max {totals[-1] * 1000:.0f} ms '
+          f'over {len(timings)} run(s) ({phases})')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='fresh processes per variant')
+    parser.add_argument('--child', metavar='URI', help=argparse.SUPPRESS)
+    parser.add_argument('--prepare', metavar='URI', help=argparse.SUPPRESS)
+    parser.add_argument('--with-init-db', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.prepare:
+        from src.main import create_app, init_db
+        with create_app({'SQLALCHEMY_DATABASE_URI': args.prepare}).app_context():
+            init_db()
+    elif args.child:
+        print(json.dumps(boot(args.child, args.with_init_db)))
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            uri = f"sqlite:///{os.path.join(directory, 'benchmark.db')}"
+            prepare(uri)
+            report('boot', measure(uri, args.runs, with_init_db=False))
+            report('boot with init-db', measure(uri, args.runs, with_init_db=True))
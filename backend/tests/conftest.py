@@ -0,0 +1,137 @@
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.main import create_app
+from src.models.user import db, User
+from src.services.approvers import invalidate_role_approvers
+from src.services.authorization import invalidate_principal
+from src.services.migrations import upgrade
+
+TEST_CONFIG = {
+    'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+    'TESTING': True,
+    # Keep hashing cheap; the policy itself is covered in test_passwords
+    'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+}
+
+@pytest.fixture
+def app(monkeypatch):
+    """A migrated in-memory database with one admin (id 1).
+
+    No application context is left pushed: requests must each get their own, or
+    they would share flask.g and with it the resolved principal.
+    """
+    monkeypatch.delenv('DATABASE_URL', raising=False)
+    app = create_app(TEST_CONFIG)
+    with app.app_context():
+        upgrade(log=lambda message: None)
+        admin = User(email='admin@mofet.com', full_name='מנהל המערכת', role='admin', is_active=True)
+        admin.set_password('admin123')
+        db.session.add(admin)
+        db.session.commit()
+    yield app
+    # Process-wide caches are keyed by user id, which the next test's database reuses
+    invalidate_principal()
+    invalidate_role_approvers()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def login(client, user_id, role='user'):
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+        session['user_role'] = role
+
+@pytest.fixture
+def admin_client(client):
+    login(client, 1, 'admin')
+    return client
+
+class StatementCounter:
+    """Records the (statement, parameters) pairs sent to the database while active"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, connection, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+@pytest.fixture
+def count_statements(app):
+    """Context manager recording the statements executed inside it"""
+    with app.app_context():
+        engine = db.engine
+
+    @contextmanager
+    def counting():
+        counter = StatementCounter()
+        event.listen(engine, 'before_cursor_execute', counter)
+        try:
+            yield counter
+        finally:
+            event.remove(engine, 'before_cursor_execute', counter)
+    return counting
+
+class FormFactory:
+    """Creates forms through the API, each on its own template and (by default) by its own initiator.
+
+    Every template uses the same approval chain of `steps` roles, each held by one
+    approver (approver_ids[step]). Distinct templates and initiators matter for
+    statement counts: a lazy load per row only shows up as extra statements when
+    the rows don't share the objects already in the identity map.
+    """
+
+    def __init__(self, client, steps=1):
+        self.client = client
+        self.created = 0
+        self.approval_chain = []
+        self.approver_ids = []
+        login(client, 1, 'admin')
+        for step in range(steps):
+            suffix = '' if step == 0 else str(step + 1)
+            role = client.post('/api/admin/roles', json={
+                'name': f'approver{suffix}', 'name_hebrew': f'מאשר{suffix}'
+            }).json['role']
+            self.approval_chain.append(role['id'])
+            self.approver_ids.append(self.add_user(f'approver{suffix}@mofet.com', [role['id']]))
+        self.approver_id = self.approver_ids[0]
+
+    def add_user(self, email, role_ids=()):
+        login(self.client, 1, 'admin')
+        response = self.client.post('/api/admin/users', json={
+            'email': email, 'full_name': email.split('@')[0], 'role_ids': list(role_ids)
+        })
+        assert response.status_code == 201, response.json
+        return response.json['user']['id']
+
+    def add_template(self, fields_config=()):
+        self.created += 1
+        login(self.client, 1, 'admin')
+        response = self.client.post('/api/forms/templates', json={
+            'name': f'template_{self.created}', 'name_hebrew': f'תבנית {self.created}',
+            'form_type': 'general', 'fields_config': list(fields_config), 'approval_chain': self.approval_chain
+        })
+        assert response.status_code == 201, response.json
+        return response.json['template']['id']
+
+    def add_forms(self, count, initiator_id=None):
+        """Create forms and return their IDs"""
+        form_ids = []
+        for _ in range(count):
+            template_id = self.add_template()
+            login(self.client, initiator_id or self.add_user(f'initiator{self.created}@mofet.com'))
+            response = self.client.post('/api/forms/', json={'template_id': template_id, 'form_data': {}})
+            assert response.status_code == 201, response.json
+            form_ids.append(response.json['form']['id'])
+        return form_ids
@@ -0,0 +1,53 @@
+import pytest
+from src.models.user import db, Form
+from conftest import FormFactory, login
+
+def test_batch_action_processes_allowed_forms_and_reports_the_rest(app, client):
+    factory = FormFactory(client)
+    mine = factory.add_forms(2)
+    # The second approver's role is not on these forms' chain
+    other_approver = factory.add_user('bystander@mofet.com')
+    login(client, factory.approver_id)
+    client.post(f'/api/forms/{mine[1]}/approve', json={})
+
+    login(client, factory.approver_id)
+    response = client.post('/api/forms/batch-action', json={
+        'action': 'approve', 'form_ids': [mine[0], mine[1], 999999], 'comments': 'ok'
+    })
+    assert response.status_code == 200, response.json
+    assert response.json['processed'] == 1
+    assert response.json['failed'] == 2
+    assert response.json['results'] == [
+        {'form_id': mine[0], 'status': response.json['results'][0]['status']},
+        {'form_id': mine[1], 'error': 'No pending approval found for this user'},
+        {'form_id': 999999, 'error': 'Form not found'},
+    ]
+
+    login(client, other_approver)
+    response = client.post('/api/forms/batch-action', json={'action': 'reject', 'form_ids': [mine[0]]})
+    assert response.json['processed'] == 0
+    assert response.json['results'] == [{'form_id': mine[0], 'error': 'No pending approval found for this user'}]
+    with app.app_context():
+        assert db.session.get(Form, mine[0]).status != 'rejected'
+
+@pytest.mark.parametrize('payload', [
+    {'action': 'approve', 'form_ids': [True]},
+    {'action': 'approve', 'form_ids': [1, False]},
+    {'action': 'approve', 'form_ids': ['1']},
+    {'action': 'approve', 'form_ids': [1.5]},
+    {'action': 'approve', 'form_ids': []},
+    {'action': 'approve', 'form_ids': 1},
+    {'action': 'approve'},
+    {'action': 'delete', 'form_ids': [1]},
+    [1, 2],
+    'approve',
+])
+def test_batch_action_rejects_malformed_payloads(client, payload):
+    login(client, 1, 'admin')
+    response = client.post('/api/forms/batch-action', json=payload)
+    assert response.status_code == 400, response.json
+
+def test_batch_action_requires_a_json_body(client):
+    login(client, 1, 'admin')
+    response = client.post('/api/forms/batch-action', data='form_ids=1', content_type='text/plain')
+    assert response.status_code == 400
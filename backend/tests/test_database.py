@@ -0,0 +1,111 @@
+import pytest
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects import mysql, postgresql
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.schema import CreateIndex, CreateTable
+from src.main import create_app
+from src.models.user import db
+from src.services.database import (
+    DEFAULT_SQLITE_PRAGMAS, database_uri, engine_options, sqlite_pragmas
+)
+
+@pytest.fixture(autouse=True)
+def clean_environment(monkeypatch):
+    for key in ('DATABASE_URL', 'DB_POOL_SIZE', 'DB_STATEMENT_TIMEOUT_MS', 'SQLITE_JOURNAL_MODE', 'SQLITE_BUSY_TIMEOUT_MS'):
+        monkeypatch.delenv(key, raising=False)
+
+def test_database_uri_prefers_the_environment(monkeypatch):
+    config = {'SQLALCHEMY_DATABASE_URI': 'sqlite:///config.db'}
+    assert database_uri(config) == 'sqlite:///config.db'
+    monkeypatch.setenv('DATABASE_URL', 'mysql+pymysql://app@db/forms')
+    assert database_uri(config) == 'mysql+pymysql://app@db/forms'
+
+def test_database_uri_rewrites_the_legacy_postgres_scheme(monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'postgres://app:secret@db:5432/forms')
+    assert database_uri({}) == 'postgresql://app:secret@db:5432/forms'
+
+def test_database_uri_requires_a_database():
+    with pytest.raises(RuntimeError):
+        database_uri({})
+
+def test_engine_options_for_sqlite():
+    assert engine_options({}, make_url('sqlite://')) == {}
+    assert engine_options({}, make_url('sqlite:///:memory:')) == {}
+    options = engine_options({'DB_POOL_SIZE': 3}, make_url('sqlite:////srv/app.db'))
+    assert options['pool_size'] == 3
+    assert options['connect_args'] == {'check_same_thread': False}
+    assert 'pool_pre_ping' not in options
+
+def test_engine_options_for_postgresql(monkeypatch):
+    monkeypatch.setenv('DB_POOL_SIZE', '20')
+    options = engine_options({'DB_POOL_SIZE': 3}, make_url('postgresql://app@db/forms'))
+    assert options['pool_size'] == 20
+    assert options['pool_pre_ping'] is True
+    assert options['pool_recycle'] == 1800
+    assert options['connect_args'] == {'options': '-c statement_timeout=30000'}
+
+def test_engine_options_for_mysql():
+    options = engine_options({'DB_STATEMENT_TIMEOUT_MS': 5000}, make_url('mysql+pymysql://app@db/forms'))
+    assert options['connect_args'] == {'init_command': 'SET SESSION max_execution_time=5000'}
+    options = engine_options({'DB_STATEMENT_TIMEOUT_MS': 0}, make_url('mysql+pymysql://app@db/forms'))
+    assert 'connect_args' not in options
+
+def test_sqlite_pragmas_resolve_environment_over_config_over_defaults(monkeypatch):
+    url = make_url('sqlite:////srv/app.db')
+    assert sqlite_pragmas({}, url) == DEFAULT_SQLITE_PRAGMAS
+    monkeypatch.setenv('SQLITE_BUSY_TIMEOUT_MS', '100')
+    pragmas = sqlite_pragmas({'SQLITE_PRAGMAS': {'busy_timeout': 50, 'synchronous': 'FULL'}}, url)
+    assert pragmas['busy_timeout'] == '100'
+    assert pragmas['synchronous'] == 'FULL'
+
+def test_sqlite_pragmas_skip_file_only_settings_in_memory():
+    pragmas = sqlite_pragmas({}, make_url('sqlite://'))
+    assert 'journal_mode' not in pragmas
+    assert 'mmap_size' not in pragmas
+    assert pragmas['busy_timeout'] == DEFAULT_SQLITE_PRAGMAS['busy_timeout']
+
+def test_sqlite_pragmas_reject_values_that_are_not_plain_words(monkeypatch):
+    monkeypatch.setenv('SQLITE_JOURNAL_MODE', 'WAL; DROP TABLE user')
+    with pytest.raises(ValueError):
+        sqlite_pragmas({}, make_url('sqlite:////srv/app.db'))
+
+def test_file_databases_open_connections_with_the_pragmas(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'app.db'}"})
+    with app.app_context():
+        assert db.session.execute(db.text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert db.session.execute(db.text('PRAGMA busy_timeout')).scalar() == 5000
+
+def test_create_app_runs_no_sql(tmp_path):
+    statements = []
+    def record(connection, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(Engine, 'before_cursor_execute', record)
+    try:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'app.db'}"})
+    finally:
+        event.remove(Engine, 'before_cursor_execute', record)
+    assert statements == []
+    with app.app_context():
+        assert inspect(db.engine).get_table_names() == []
+
+def test_init_db_command_is_repeatable(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'app.db'}"})
+    runner = app.test_cli_runner()
+    for _ in range(2):
+        result = runner.invoke(args=['init-db'])
+        assert result.exit_code == 0, result.output
+    assert result.output.endswith('Database is ready\n')
+    assert 'Default admin user created' not in result.output
+    with app.app_context():
+        assert db.session.execute(db.text('SELECT count(*) FROM user')).scalar() == 1
+
+@pytest.mark.parametrize('dialect', [postgresql.dialect(), mysql.dialect()], ids=['postgresql', 'mysql'])
+def test_models_compile_for_server_databases(dialect):
+    for table in db.metadata.sorted_tables:
+        str(CreateTable(table).compile(dialect=dialect))
+        for index in table.indexes:
+            str(CreateIndex(index).compile(dialect=dialect))
+
+def test_json_columns_use_jsonb_on_postgresql():
+    ddl = str(CreateTable(db.metadata.tables['form']).compile(dialect=postgresql.dialect()))
+    assert 'form_data JSONB NOT NULL' in ddl
@@ -0,0 +1,38 @@
+import pytest
+from conftest import FormFactory, login
+
+@pytest.mark.parametrize('limit', ['abc', '', '0', '-3', '1.5'])
+def test_listing_rejects_an_invalid_limit(admin_client, limit):
+    response = admin_client.get('/api/forms/', query_string={'limit': limit})
+    assert response.status_code == 400
+    assert response.json == {'error': 'limit must be a positive integer'}
+
+@pytest.mark.parametrize('limit', ['abc', '0'])
+def test_search_rejects_an_invalid_limit(admin_client, limit):
+    response = admin_client.get('/api/forms/search', query_string={'q': 'x', 'limit': limit})
+    assert response.status_code == 400
+
+def test_cursor_pages_cover_every_form_once(client):
+    factory = FormFactory(client)
+    form_ids = factory.add_forms(5)
+    login(client, 1, 'admin')
+
+    seen = []
+    params = {'limit': 2}
+    while True:
+        page = client.get('/api/forms/', query_string=params).json
+        assert len(page['forms']) <= 2
+        seen += [form['id'] for form in page['forms']]
+        if not page['next_cursor']:
+            break
+        params = {'limit': 2, 'cursor': page['next_cursor']}
+
+    assert seen == sorted(form_ids, reverse=True)
+
+def test_listing_without_limit_or_cursor_returns_everything(client):
+    factory = FormFactory(client)
+    factory.add_forms(3)
+    login(client, 1, 'admin')
+    response = client.get('/api/forms/')
+    assert len(response.json['forms']) == 3
+    assert 'next_cursor' not in response.json
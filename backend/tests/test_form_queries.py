@@ -0,0 +1,87 @@
+import pytest
+from src.models.user import db
+from conftest import FormFactory, login
+
+def listing_statements(client, count_statements, user_id, role, params):
+    login(client, user_id, role)
+    # Warm the per-process principal and approver caches first
+    assert client.get('/api/forms/', query_string=params).status_code == 200
+    with count_statements() as counter:
+        response = client.get('/api/forms/', query_string=params)
+    assert response.status_code == 200
+    return counter.count, len(response.json['forms'])
+
+@pytest.mark.parametrize('viewer, params', [
+    ('admin', {}),
+    ('approver', {}),
+    ('approver', {'pending_for_me': 'true'}),
+    ('initiator', {'my_forms_only': 'true'}),
+])
+def test_form_listing_statement_count_does_not_grow_with_forms(client, count_statements, viewer, params):
+    factory = FormFactory(client)
+    initiator_id = factory.add_user('owner@mofet.com') if viewer == 'initiator' else None
+    viewer_id, role = {'admin': (1, 'admin'), 'approver': (factory.approver_id, 'user')}.get(
+        viewer, (initiator_id, 'user')
+    )
+
+    factory.add_forms(2, initiator_id)
+    few_statements, few_forms = listing_statements(client, count_statements, viewer_id, role, params)
+    factory.add_forms(48, initiator_id)
+    many_statements, many_forms = listing_statements(client, count_statements, viewer_id, role, params)
+
+    assert (few_forms, many_forms) == (2, 50)
+    assert many_statements == few_statements
+
+def query_plans(app, statements):
+    """EXPLAIN QUERY PLAN details for each captured (statement, parameters) SELECT"""
+    with app.app_context():
+        connection = db.session.connection().connection.driver_connection
+        return {
+            statement: [row[3] for row in connection.execute(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+            for statement, parameters in statements
+            if statement.lstrip().upper().startswith('SELECT')
+        }
+
+# The approver's own listing is an OR of two indexed lookups; SQLite merges them and
+# sorts just those rows, so only the single-index listings are read in index order
+@pytest.mark.parametrize('viewer, params, sorted_by_index', [
+    ('admin', {}, True),
+    ('approver', {}, False),
+    ('approver', {'pending_for_me': 'true'}, True),
+    ('initiator', {'my_forms_only': 'true', 'status': 'pending'}, True),
+])
+def test_form_listing_queries_use_indexes(app, client, count_statements, viewer, params, sorted_by_index):
+    factory = FormFactory(client)
+    initiator_id = factory.add_user('owner@mofet.com')
+    factory.add_forms(3, initiator_id)
+    viewer_id, role = {'admin': (1, 'admin'), 'approver': (factory.approver_id, 'user')}.get(
+        viewer, (initiator_id, 'user')
+    )
+    login(client, viewer_id, role)
+    client.get('/api/forms/', query_string=params)
+
+    with count_statements() as counter:
+        assert client.get('/api/forms/', query_string=dict(params, limit=20)).status_code == 200
+
+    plans = query_plans(app, counter.statements)
+    assert plans
+    for statement, plan in plans.items():
+        for step in plan:
+            # A SCAN without USING walks the whole table; a temp B-tree sorts outside any index
+            assert not (step.startswith('SCAN') and 'USING' not in step), (statement, plan)
+            if sorted_by_index:
+                assert 'TEMP B-TREE' not in step, (statement, plan)
+
+def test_form_creation_reuses_the_cached_approvers(client, count_statements):
+    factory = FormFactory(client)
+    initiator_id = factory.add_user('owner@mofet.com')
+    factory.add_forms(1, initiator_id)
+    template_id = factory.add_template()
+
+    login(client, initiator_id)
+    with count_statements() as counter:
+        response = client.post('/api/forms/', json={'template_id': template_id, 'form_data': {}})
+    assert response.status_code == 201
+    assert response.json['form']['current_approver_ids'] == [factory.approver_id]
+    # Role resolution would read user_role.* columns; the index built by the first form is reused
+    assert not any('user_role.' in statement for statement, _ in counter.statements)
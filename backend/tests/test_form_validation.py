@@ -0,0 +1,120 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from src.services import form_validation
+from src.services.form_validation import get_validation_plan, validate_fields_config, validate_form_data
+from conftest import FormFactory, login
+
+FIELDS = [
+    {'name': 'title', 'label': 'Title', 'type': 'text', 'required': True, 'maxLength': 5},
+    {'name': 'notes', 'type': 'textarea'},
+    {'name': 'amount', 'label': 'Amount', 'type': 'number', 'min': 1, 'max': 10},
+    {'name': 'due', 'label': 'Due', 'type': 'date', 'minDate': '2025-01-01'},
+    {'name': 'site', 'label': 'Site', 'type': 'select', 'options': ['a', {'value': 'b', 'label': 'B'}]},
+    {'name': 'tags', 'label': 'Tags', 'type': 'select', 'multiple': True, 'options': ['x', 'y']},
+    {'name': 'agree', 'label': 'Agree', 'type': 'checkbox'},
+]
+
+def template(fields_config=FIELDS, template_id=1, updated_at=None):
+    return SimpleNamespace(id=template_id, updated_at=updated_at or datetime.utcnow(), fields_config=fields_config)
+
+def test_valid_data_passes():
+    data = {'title': 'Hi', 'notes': 'n', 'amount': '5', 'due': '2025-06-01', 'site': 'b', 'tags': ['x', 'y'], 'agree': True}
+    assert validate_form_data(template(), data) == {}
+
+def test_required_fields_must_be_filled():
+    for empty in (None, '', []):
+        assert validate_form_data(template(), {'title': empty}) == {'title': 'Title is required'}
+    assert validate_form_data(template(), {}) == {'title': 'Title is required'}
+
+@pytest.mark.parametrize('field, value, error', [
+    ('title', 7, 'Title must be text'),
+    ('title', 'too long', 'Title must be at most 5 characters'),
+    ('amount', 'many', 'Amount must be a number'),
+    ('amount', True, 'Amount must be a number'),
+    ('amount', 0, 'Amount must be at least 1'),
+    ('amount', 11, 'Amount must be at most 10'),
+    ('due', '01/06/2025', 'Due must be a date (YYYY-MM-DD)'),
+    ('due', '2024-12-31', 'Due must be on or after 2025-01-01'),
+    ('agree', 'yes', 'Agree must be true or false'),
+])
+def test_type_errors(field, value, error):
+    assert validate_form_data(template(), {'title': 'ok', field: value}) == {field: error}
+
+@pytest.mark.parametrize('field, value', [
+    ('site', 'c'),
+    ('site', 'B'),
+    ('site', {'value': 'a'}),
+    ('tags', ['x', 'z']),
+    ('tags', [['x']]),
+])
+def test_option_errors(field, value):
+    assert validate_form_data(template(), {'title': 'ok', field: value}) == {
+        field: f"{field.capitalize()} must be one of the allowed options"
+    }
+
+def test_undeclared_fields_and_malformed_data():
+    assert validate_form_data(template(), {'title': 'ok', 'extra': object()}) == {}
+    assert validate_form_data(template(), ['title']) == {'form_data': 'form_data must be an object'}
+
+def test_fields_config_problems_are_reported():
+    errors = validate_fields_config([
+        {'name': 'a', 'type': 'text', 'maxLength': -1},
+        {'name': 'a', 'type': 'text'},
+        {'type': 'bogus'},
+        {'name': 'n', 'type': 'number', 'min': 'low'},
+        {'name': 'd', 'type': 'date', 'maxDate': 'tomorrow'},
+        {'name': 's', 'type': 'select', 'options': [['nested']]},
+        'not a field',
+    ])
+    assert errors == [
+        "Field 'a': maxLength must be a non-negative integer",
+        "Field 'a' is defined twice",
+        'Field 2 needs a name',
+        "Field 2 has an unknown type 'bogus'",
+        "Field 'n': min must be a number",
+        "Field 'd': maxDate must be a date (YYYY-MM-DD)",
+        "Field 's': options must be a list of values or {value, label} objects",
+        'Field 6 must be an object',
+    ]
+    assert validate_fields_config({'name': 'a'}) == ['fields_config must be a list of fields']
+    assert validate_fields_config(FIELDS) == []
+
+def test_plans_are_cached_per_template_version(monkeypatch):
+    monkeypatch.setattr(form_validation, '_plan_cache', form_validation.OrderedDict())
+    stamp = datetime(2025, 1, 1)
+    first = get_validation_plan(template(template_id=7, updated_at=stamp))
+    assert get_validation_plan(template(template_id=7, updated_at=stamp)) is first
+
+    edited = template([{'name': 'title', 'type': 'text'}], template_id=7, updated_at=datetime(2025, 1, 2))
+    assert get_validation_plan(edited) is not first
+    assert validate_form_data(edited, {}) == {}
+
+def test_cache_size_is_bounded(monkeypatch):
+    monkeypatch.setattr(form_validation, '_plan_cache', form_validation.OrderedDict())
+    monkeypatch.setattr(form_validation, 'VALIDATION_PLAN_CACHE_SIZE', 3)
+    stamp = datetime(2025, 1, 1)
+    for template_id in range(5):
+        get_validation_plan(template(template_id=template_id, updated_at=stamp))
+    assert list(form_validation._plan_cache) == [(2, stamp), (3, stamp), (4, stamp)]
+
+def test_template_update_changes_the_rules_for_new_forms(client):
+    factory = FormFactory(client)
+    template_id = factory.add_template([{'name': 'title', 'label': 'Title', 'type': 'text', 'required': True}])
+    initiator_id = factory.add_user('owner@mofet.com')
+
+    login(client, initiator_id)
+    response = client.post('/api/forms/', json={'template_id': template_id, 'form_data': {}})
+    assert response.status_code == 400
+    assert response.json['field_errors'] == {'title': 'Title is required'}
+
+    login(client, 1, 'admin')
+    response = client.put(f'/api/forms/templates/{template_id}', json={
+        'fields_config': [{'name': 'title', 'label': 'Title', 'type': 'text', 'required': False}]
+    })
+    assert response.status_code == 200
+
+    login(client, initiator_id)
+    response = client.post('/api/forms/', json={'template_id': template_id, 'form_data': {}})
+    assert response.status_code == 201, response.json
@@ -0,0 +1,84 @@
+from sqlalchemy import select
+from src.models.user import db, Form, FormInbox
+from src.services.inbox import rebuild_form_holders
+from src.services.statistics import rebuild_form_stats
+from conftest import FormFactory, login
+
+def derived_state(connection):
+    """Every form's holders and the whole inbox, as rebuild_form_holders would write them"""
+    holders = {
+        row.id: (row.pending_step, row.current_approver_ids)
+        for row in connection.execute(select(Form.id, Form.pending_step, Form.current_approver_ids))
+    }
+    inbox = set(connection.execute(select(FormInbox.user_id, FormInbox.form_id, FormInbox.form_created_at)).all())
+    return holders, inbox
+
+def assert_derived_state_is_consistent(app):
+    """Rebuilding holders and counters from the approvals must find nothing to change"""
+    with app.app_context():
+        with db.engine.connect() as connection:
+            transaction = connection.begin()
+            maintained = derived_state(connection)
+            rebuild_form_holders(connection, list(maintained[0]))
+            rebuilt = derived_state(connection)
+            transaction.rollback()
+        assert rebuilt == maintained
+        assert rebuild_form_stats() == {}
+
+def post(client, user_id, url, payload, status=200):
+    login(client, user_id)
+    response = client.post(url, json=payload)
+    assert response.status_code == status, response.json
+    return response.json
+
+def test_every_transition_keeps_holders_inbox_and_counters_in_sync(app, client):
+    factory = FormFactory(client, steps=2)
+    first, second = factory.approver_ids
+    initiator = factory.add_user('owner@mofet.com')
+    extra = factory.add_user('extra@mofet.com')
+
+    # create, one by one and in bulk
+    approved, bounced, rejected, batched, extended = factory.add_forms(5, initiator)
+    template_id = factory.add_template()
+    bulk = post(client, initiator, '/api/forms/bulk', {'forms': [{'template_id': template_id, 'form_data': {}}] * 2}, 201)
+    batched_too = [result['form_id'] for result in bulk['results']]
+    assert_derived_state_is_consistent(app)
+
+    # approve through the whole chain, then the initiator's final approval
+    post(client, first, f'/api/forms/{approved}/approve', {'comments': 'ok'})
+    assert_derived_state_is_consistent(app)
+    post(client, second, f'/api/forms/{approved}/approve', {})
+    assert_derived_state_is_consistent(app)
+    post(client, initiator, f'/api/forms/{approved}/final-approve', {})
+    assert_derived_state_is_consistent(app)
+
+    # reject at the first step, and bounce back from the second
+    post(client, first, f'/api/forms/{rejected}/reject', {'comments': 'no'})
+    assert_derived_state_is_consistent(app)
+    post(client, first, f'/api/forms/{bounced}/approve', {})
+    post(client, second, f'/api/forms/{bounced}/reject', {})
+    assert_derived_state_is_consistent(app)
+
+    # an added approver holds the form alongside the chain's approver, and keeps it after a bounce
+    post(client, first, f'/api/forms/{extended}/add-approver', {'approver_id': extra}, 201)
+    assert_derived_state_is_consistent(app)
+    post(client, first, f'/api/forms/{extended}/approve', {})
+    post(client, second, f'/api/forms/{extended}/reject', {})
+    assert_derived_state_is_consistent(app)
+
+    # batch actions, including IDs that fail
+    result = post(client, first, '/api/forms/batch-action',
+                  {'action': 'approve', 'form_ids': [batched, batched_too[0], approved, 999999]})
+    assert result['processed'] == 2
+    assert_derived_state_is_consistent(app)
+    result = post(client, second, '/api/forms/batch-action', {'action': 'reject', 'form_ids': [batched, batched_too[0]]})
+    assert result['processed'] == 2
+    result = post(client, first, '/api/forms/batch-action', {'action': 'reject', 'form_ids': [batched_too[1]]})
+    assert result['processed'] == 1
+    assert_derived_state_is_consistent(app)
+
+    with app.app_context():
+        holders, inbox = derived_state(db.session)
+    assert holders[extended] == (0, [extra])
+    assert holders[bounced] == (None, [])
+    assert {(user_id, form_id) for user_id, form_id, _ in inbox} >= {(extra, extended)}
@@ -0,0 +1,143 @@
+import json
+import pytest
+from src.models.user import db, InboxEvent
+from src.services.inbox_stream import InboxBroker, record_inbox_changes
+from conftest import FormFactory, login
+from test_tokens import tokens
+
+@pytest.fixture
+def broker(app, monkeypatch):
+    """A fresh broker for the stream route; its poller never fires on its own, so tests call poll()"""
+    broker = InboxBroker()
+    monkeypatch.setattr('src.routes.forms.inbox_broker', broker)
+    app.config['INBOX_STREAM_POLL_SECONDS'] = 3600
+    return broker
+
+def poll(app, broker):
+    with app.app_context():
+        broker.poll()
+
+class Stream:
+    """An open inbox stream, read one SSE message at a time"""
+
+    def __init__(self, response):
+        assert response.status_code == 200, response.get_data(as_text=True)
+        assert response.mimetype == 'text/event-stream'
+        self.response = response
+        self.messages = iter(response.response)
+
+    def next_message(self):
+        message = next(self.messages)
+        return message.decode() if isinstance(message, bytes) else message
+
+    def next_event(self):
+        message = self.next_message()
+        lines = dict(line.split(': ', 1) for line in message.strip().split('\n'))
+        return lines['event'], json.loads(lines['data'])
+
+    def close(self):
+        self.response.close()
+
+def open_stream(client, **kwargs):
+    return Stream(client.get('/api/forms/inbox/stream', **kwargs))
+
+def test_subscribing_sends_the_current_counters(app, client, broker):
+    factory = FormFactory(client)
+    factory.add_forms(2)
+    login(client, factory.approver_id)
+    stream = open_stream(client)
+    assert stream.next_event() == ('counters', {'pending_for_me': 2})
+    assert broker.has_subscribers([factory.approver_id]) == [factory.approver_id]
+    stream.close()
+
+def test_a_transition_reaches_the_approvers_stream(app, client, broker):
+    factory = FormFactory(client, steps=2)
+    first = factory.approver_ids[0]
+    login(client, first)
+    stream = open_stream(client)
+    assert stream.next_event() == ('counters', {'pending_for_me': 0})
+
+    # The routes never touch the broker: changes reach it only through the event table
+    form_id, = factory.add_forms(1)
+    poll(app, broker)
+    assert stream.next_event() == ('inbox', {
+        'changes': [{'type': 'added', 'form_id': form_id}], 'pending_for_me': 1
+    })
+
+    login(client, first)
+    assert client.post(f'/api/forms/{form_id}/approve', json={}).status_code == 200
+    poll(app, broker)
+    assert stream.next_event() == ('inbox', {
+        'changes': [{'type': 'removed', 'form_id': form_id}], 'pending_for_me': 0
+    })
+    stream.close()
+
+def test_a_rolled_back_transaction_logs_no_events(app, broker):
+    with app.app_context():
+        record_inbox_changes([(1, 'added', 1)])
+        db.session.rollback()
+        assert InboxEvent.query.count() == 0
+
+def test_heartbeats_keep_an_idle_stream_open(app, client, broker):
+    app.config['INBOX_STREAM_HEARTBEAT_SECONDS'] = 0.01
+    login(client, 1, 'admin')
+    stream = open_stream(client)
+    stream.next_event()
+    assert stream.next_message() == ': heartbeat\n\n'
+    assert stream.next_message() == ': heartbeat\n\n'
+    stream.close()
+
+def test_disconnecting_unsubscribes(app, client, broker):
+    login(client, 1, 'admin')
+    first, second = open_stream(client), open_stream(client)
+    first.next_event()
+    second.next_event()
+    first.close()
+    assert broker.has_subscribers([1]) == [1]
+    second.close()
+    assert broker.has_subscribers([1]) == []
+
+def test_every_worker_delivers_events_to_its_own_streams(app, client, broker):
+    factory = FormFactory(client)
+    other_worker = InboxBroker()
+    with app.app_context():
+        other_worker.poll(deliver=False)
+    subscription = other_worker.subscribe(factory.approver_id, 10)
+
+    form_id, = factory.add_forms(1)
+    poll(app, other_worker)
+    assert subscription.queue.get_nowait() == {
+        'changes': [{'type': 'added', 'form_id': form_id}], 'pending_for_me': 1
+    }
+    # Each event is delivered once per worker
+    poll(app, other_worker)
+    assert subscription.queue.empty()
+
+def test_old_events_are_pruned(app, client, broker, monkeypatch):
+    factory = FormFactory(client)
+    factory.add_forms(1)
+    monkeypatch.setattr('src.services.inbox_stream.INBOX_EVENT_RETENTION_SECONDS', -1)
+    poll(app, broker)
+    with app.app_context():
+        assert InboxEvent.query.count() == 0
+
+def test_the_stream_accepts_an_access_token_in_the_query(app, admin_client, broker):
+    assert admin_client.post('/api/admin/users', json={
+        'email': 'token@mofet.com', 'full_name': 'token', 'password': 'secret'
+    }).status_code == 201
+    access_token = tokens(app)['access_token']
+    client = app.test_client()
+
+    stream = open_stream(client, query_string={'access_token': access_token})
+    assert stream.next_event() == ('counters', {'pending_for_me': 0})
+    stream.close()
+    assert client.get('/api/forms/inbox/stream', query_string={'access_token': 'forged'}).status_code == 401
+    # Other endpoints still require the header
+    assert client.get('/api/forms/', query_string={'access_token': access_token}).status_code == 401
+
+def test_the_stream_is_refused_under_a_sync_worker(app, admin_client, broker):
+    response = admin_client.get('/api/forms/inbox/stream', environ_overrides={
+        'wsgi.multithread': False, 'wsgi.multiprocess': True
+    })
+    assert response.status_code == 503
+    assert broker.has_subscribers([1]) == []
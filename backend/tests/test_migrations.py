@@ -0,0 +1,190 @@
+import ast
+from datetime import datetime
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import inspect
+from sqlalchemy.dialects import mysql, postgresql
+from src.main import create_app, init_db
+from src.models.user import db
+from src.services.inbox import rebuild_form_holders
+from src.services.migrations import Operations, current_revision, downgrade, load_migrations, upgrade
+from src.services.search_index import ensure_search_index, search_index_is_empty
+
+def quiet(message):
+    pass
+
+def latest_revision():
+    return load_migrations()[-1].revision
+
+def schema(engine):
+    """{table: (columns, indexes, unique constraints)} as reflected from the database"""
+    inspector = inspect(engine)
+    return {
+        table: (
+            sorted((column['name'], str(column['type']), column['nullable']) for column in inspector.get_columns(table)),
+            sorted((index['name'], tuple(index['column_names']), bool(index['unique'])) for index in inspector.get_indexes(table)),
+            sorted(tuple(constraint['column_names']) for constraint in inspector.get_unique_constraints(table)),
+        )
+        for table in inspector.get_table_names()
+        if table != 'schema_migrations'
+    }
+
+@pytest.fixture
+def empty_app(tmp_path, monkeypatch):
+    monkeypatch.delenv('DATABASE_URL', raising=False)
+    return create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'app.db'}", 'TESTING': True})
+
+def test_baseline_is_frozen_before_later_revisions(empty_app):
+    with empty_app.app_context():
+        upgrade('0001', log=quiet)
+        baseline = schema(db.engine)
+        assert 'form_inbox' not in baseline
+        assert 'pending_step' not in {column[0] for column in baseline['form'][0]}
+
+        upgrade(log=quiet)
+        assert 'form_inbox' in schema(db.engine)
+
+def test_migrations_build_the_model_schema(empty_app, tmp_path):
+    with empty_app.app_context():
+        upgrade(log=quiet)
+        migrated = schema(db.engine)
+
+    reference = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'reference.db'}"})
+    with reference.app_context():
+        db.create_all()
+        ensure_search_index()
+        assert migrated == schema(db.engine)
+
+def test_baseline_fills_gaps_in_a_legacy_database(empty_app):
+    with empty_app.app_context():
+        upgrade(log=quiet)
+        expected = schema(db.engine)
+        downgrade('base', log=quiet)
+        # A database made by create_all() before updated_at stamps, form_stats and some indexes existed
+        db.session.execute(db.text(
+            'CREATE TABLE form (id INTEGER NOT NULL, template_id INTEGER NOT NULL, initiator_id INTEGER NOT NULL, '
+            'form_data JSON NOT NULL, status VARCHAR(20) NOT NULL, current_step INTEGER, '
+            'created_at DATETIME, completed_at DATETIME, PRIMARY KEY (id))'
+        ))
+        db.session.commit()
+
+        upgrade(log=quiet)
+        assert schema(db.engine) == expected
+        assert current_revision() == latest_revision()
+
+def test_reset_database_reapplies_every_migration(app, admin_client):
+    app.config['ALLOW_DATABASE_RESET'] = True
+    assert admin_client.post('/api/data/reset-database').status_code == 200
+    with app.app_context():
+        assert current_revision() == latest_revision()
+        assert 'form_inbox' in schema(db.engine)
+
+def seed_legacy_rows():
+    """Two users, a template and forms as raw rows, as a database from before the application code"""
+    db.session.execute(db.text(
+        "INSERT INTO user (id, email, password_hash, full_name, role) VALUES "
+        "(1, 'a@mofet.com', '-', 'a', 'admin'), (2, 'b@mofet.com', '-', 'b', 'user')"
+    ))
+    db.session.execute(db.text(
+        "INSERT INTO form_template (id, name, name_hebrew, form_type, fields_config, approval_chain, created_by) "
+        "VALUES (1, 't', 'בקשה', 'general', '[]', '[]', 1)"
+    ))
+
+def test_migrations_do_not_import_application_code():
+    # A migration must keep doing what it did when it was written, whatever the models become
+    for migration in load_migrations():
+        with open(migration.path) as source:
+            tree = ast.parse(source.read())
+        imported = [node.module for node in ast.walk(tree) if isinstance(node, ast.ImportFrom)]
+        imported += [alias.name for node in ast.walk(tree) if isinstance(node, ast.Import) for alias in node.names]
+        assert not [name for name in imported if name.split('.')[0] == 'src'], migration.path
+
+def test_holder_backfill_matches_the_application_rules(empty_app):
+    with empty_app.app_context():
+        upgrade('0001', log=quiet)
+        seed_legacy_rows()
+        now = datetime.utcnow()
+        db.session.execute(db.text(
+            "INSERT INTO form (id, template_id, initiator_id, form_data, status, current_step, created_at) VALUES "
+            "(1, 1, 1, '{}', 'pending', 0, :now), (2, 1, 1, '{}', 'pending', 1, :now), "
+            "(3, 1, 1, '{}', 'rejected', 0, :now), (4, 1, 1, '{}', 'pending', 0, :now)"
+        ), {'now': now})
+        db.session.execute(db.text(
+            "INSERT INTO form_approval (form_id, approver_id, step_number, action) VALUES "
+            "(1, 2, 0, 'pending'), (1, 1, 1, 'pending'), (2, 1, 0, 'approved'), (2, 2, 1, 'pending'), "
+            "(3, 2, 0, 'rejected'), (4, 1, 0, 'approved')"
+        ))
+        db.session.commit()
+
+        upgrade('0002', log=quiet)
+        def state():
+            holders = db.session.execute(db.text(
+                'SELECT id, pending_step, current_approver_ids FROM form ORDER BY id'
+            )).all()
+            inbox = db.session.execute(db.text('SELECT user_id, form_id FROM form_inbox ORDER BY form_id, user_id')).all()
+            return [tuple(row) for row in holders], [tuple(row) for row in inbox]
+        migrated = state()
+        assert migrated == (
+            [(1, 0, '[2]'), (2, 1, '[2]'), (3, None, '[]'), (4, None, '[]')],
+            [(1, 1), (2, 1), (2, 2)],
+        )
+
+        with db.engine.begin() as connection:
+            rebuild_form_holders(connection, [1, 2, 3, 4])
+        db.session.commit()
+        assert state() == migrated
+
+def test_init_db_fills_the_search_table_the_migration_created(empty_app):
+    with empty_app.app_context():
+        upgrade(log=quiet)
+        seed_legacy_rows()
+        db.session.execute(db.text(
+            "INSERT INTO form (template_id, initiator_id, form_data, status) VALUES (1, 1, '{}', 'pending')"
+        ))
+        db.session.commit()
+        assert search_index_is_empty()
+
+        init_db()
+        assert not search_index_is_empty()
+
+def test_drop_column_drops_the_indexes_covering_it(empty_app):
+    with empty_app.app_context():
+        op = Operations(db.engine)
+        op.execute('CREATE TABLE sample (id INTEGER PRIMARY KEY, kept INTEGER, dropped INTEGER)')
+        op.execute('CREATE INDEX ix_sample_kept ON sample (kept)')
+        op.execute('CREATE INDEX ix_sample_both ON sample (kept, dropped)')
+
+        op.drop_column('sample', 'dropped')
+        assert not op.has_column('sample', 'dropped')
+        assert [index['name'] for index in inspect(db.engine).get_indexes('sample')] == ['ix_sample_kept']
+
+@pytest.mark.parametrize('dialect, identifier, quoted', [
+    (mysql.dialect(), 'order', '`order`'),
+    (postgresql.dialect(), 'user', '"user"'),
+    (postgresql.dialect(), 'form', 'form'),
+])
+def test_identifiers_are_quoted_for_the_database_in_use(dialect, identifier, quoted):
+    assert Operations(SimpleNamespace(dialect=dialect)).quote(identifier) == quoted
+
+def test_initiator_counts_are_backfilled_only_into_seeded_counters(empty_app):
+    with empty_app.app_context():
+        upgrade('0002', log=quiet)
+        seed_legacy_rows()
+        db.session.execute(db.text(
+            "INSERT INTO form (template_id, initiator_id, form_data, status) VALUES "
+            "(1, 1, '{}', 'pending'), (1, 2, '{}', 'pending'), (1, 2, '{}', 'approved')"
+        ))
+        db.session.commit()
+
+        # Unseeded counters are left empty for init-db to rebuild whole
+        upgrade('0003', log=quiet)
+        assert db.session.execute(db.text('SELECT count(*) FROM form_stats')).scalar() == 0
+
+        downgrade('0002', log=quiet)
+        db.session.execute(db.text("INSERT INTO form_stats (scope, key, count) VALUES ('status', 'pending', 2)"))
+        db.session.commit()
+        upgrade('0003', log=quiet)
+        rows = db.session.execute(db.text(
+            "SELECT key, count FROM form_stats WHERE scope = 'initiator' ORDER BY key"
+        )).all()
+        assert [tuple(row) for row in rows] == [('1', 1), ('2', 2)]
@@ -0,0 +1,146 @@
+import time
+import pytest
+from src.models.user import db, User
+from src.services.dispatch import RetryingDispatcher
+from src.services.notifications import Notifier, get_notifier, notify_users
+from conftest import FormFactory, login
+
+class ImmediateDispatcher:
+    def submit(self, job, *args):
+        job(*args)
+
+class RecordingSink:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.delivered = []
+
+    def deliver(self, recipient, notifications):
+        if self.failures:
+            self.failures -= 1
+            raise OSError('sink unavailable')
+        self.delivered.append((recipient['id'], sorted((n['event'], n['form_id']) for n in notifications)))
+
+def recipient(user_id):
+    return {'id': user_id, 'email': f'user{user_id}@mofet.com', 'phone': None, 'full_name': f'user {user_id}'}
+
+def test_notifications_are_batched_and_deduplicated_per_recipient():
+    sinks = [RecordingSink(), RecordingSink()]
+    notifier = Notifier(sinks, batch_seconds=60, dispatcher=ImmediateDispatcher())
+    notifier.publish([recipient(1), recipient(2)], 'approval_requested', 10)
+    notifier.publish([recipient(1)], 'approval_requested', 10)
+    notifier.publish([recipient(1)], 'form_rejected', 11)
+    assert all(not sink.delivered for sink in sinks)
+
+    notifier.flush()
+    for sink in sinks:
+        assert sorted(sink.delivered) == [
+            (1, [('approval_requested', 10), ('form_rejected', 11)]),
+            (2, [('approval_requested', 10)]),
+        ]
+
+def test_a_batch_is_delivered_when_its_window_closes():
+    sink = RecordingSink()
+    notifier = Notifier([sink], batch_seconds=0.01, dispatcher=ImmediateDispatcher())
+    notifier.publish([recipient(1)], 'approval_requested', 10)
+    deadline = time.monotonic() + 5
+    while not sink.delivered and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sink.delivered == [(1, [('approval_requested', 10)])]
+
+def test_a_failing_sink_is_retried_without_holding_up_the_others():
+    flaky, steady = RecordingSink(failures=2), RecordingSink()
+    dispatcher = RetryingDispatcher('test-notifications', workers=2, backoff_base_seconds=0)
+    notifier = Notifier([flaky, steady], batch_seconds=60, dispatcher=dispatcher)
+    notifier.publish([recipient(1)], 'form_rejected', 10)
+    notifier.flush()
+    dispatcher.join()
+    assert flaky.delivered == steady.delivered == [(1, [('form_rejected', 10)])]
+
+def test_notify_users_loads_recipients_once_and_skips_inactive_users(app, client, count_statements, monkeypatch):
+    factory = FormFactory(client)
+    inactive = factory.add_user('former@mofet.com')
+    with app.app_context():
+        db.session.get(User, inactive).is_active = False
+        db.session.commit()
+    sink = RecordingSink()
+    monkeypatch.setattr('src.services.notifications._notifier',
+                        Notifier([sink], batch_seconds=60, dispatcher=ImmediateDispatcher()))
+
+    with app.app_context():
+        with count_statements() as counter:
+            notify_users([('approval_requested', 10, [factory.approver_id, inactive]),
+                          ('form_rejected', 11, [factory.approver_id])])
+        notify_users([('form_rejected', 12, [inactive])])
+    get_notifier().flush()
+    assert counter.count == 1
+    assert sink.delivered == [(factory.approver_id, [('approval_requested', 10), ('form_rejected', 11)])]
+
+@pytest.fixture
+def sent(monkeypatch):
+    """The (event_type, form_id, user_ids) events the form routes publish"""
+    events = []
+    monkeypatch.setattr('src.routes.forms.notify_users', events.extend)
+    return events
+
+@pytest.fixture
+def chain(client):
+    """A two-step approval chain and an initiator"""
+    factory = FormFactory(client, steps=2)
+    factory.initiator_id = factory.add_user('owner@mofet.com')
+    return factory
+
+def act(client, user_id, form_id, action):
+    login(client, user_id)
+    response = client.post(f'/api/forms/{form_id}/{action}', json={'comments': ''})
+    assert response.status_code == 200, response.json
+
+def test_creation_and_approval_notify_the_next_step(client, chain, sent):
+    first, second = chain.approver_ids
+    [form_id] = chain.add_forms(1, chain.initiator_id)
+    act(client, first, form_id, 'approve')
+    act(client, second, form_id, 'approve')
+    assert sent == [
+        ('approval_requested', form_id, [first]),
+        ('approval_requested', form_id, [second]),
+        ('awaiting_final_approval', form_id, [chain.initiator_id]),
+    ]
+
+def test_a_first_step_rejection_notifies_only_the_initiator(client, chain, sent):
+    [form_id] = chain.add_forms(1, chain.initiator_id)
+    act(client, chain.approver_ids[0], form_id, 'reject')
+    assert sent[-1:] == [('form_rejected', form_id, [chain.initiator_id])]
+
+def test_a_bounced_rejection_skips_approvers_who_already_acted(client, chain, sent):
+    first, second = chain.approver_ids
+    [form_id] = chain.add_forms(1, chain.initiator_id)
+    act(client, first, form_id, 'approve')
+    del sent[:]
+    act(client, second, form_id, 'reject')
+    assert sent == [('form_rejected', form_id, [chain.initiator_id])]
+
+def test_a_bounced_rejection_asks_approvers_still_pending_on_that_step(client, chain, sent):
+    first, second = chain.approver_ids
+    extra = chain.add_user('extra@mofet.com')
+    [form_id] = chain.add_forms(1, chain.initiator_id)
+    login(client, first)
+    assert client.post(f'/api/forms/{form_id}/add-approver', json={'approver_id': extra}).status_code == 201
+    act(client, first, form_id, 'approve')
+    del sent[:]
+    act(client, second, form_id, 'reject')
+    assert sent == [
+        ('form_rejected', form_id, [chain.initiator_id]),
+        ('approval_requested', form_id, [extra]),
+    ]
+
+def test_add_approver_and_batch_actions_notify_who_must_act(client, chain, sent):
+    first, second = chain.approver_ids
+    extra = chain.add_user('extra@mofet.com')
+    form_ids = chain.add_forms(2, chain.initiator_id)
+    login(client, first)
+    assert client.post(f'/api/forms/{form_ids[0]}/add-approver', json={'approver_id': extra}).status_code == 201
+    assert sent[-1] == ('approval_requested', form_ids[0], [extra])
+
+    del sent[:]
+    response = client.post('/api/forms/batch-action', json={'action': 'approve', 'form_ids': form_ids})
+    assert response.json['processed'] == 2
+    assert sent == [('approval_requested', form_id, [second]) for form_id in form_ids]
@@ -0,0 +1,71 @@
+import itertools
+from types import SimpleNamespace
+import pytest
+from src.models.user import db, OTPCode, User
+from src.services.otp import MemoryOTPStore
+
+WRONG_CODE = '000000'  # never generated by the fixture
+
+@pytest.fixture(params=['database', 'memory'])
+def otp(request, app, client, monkeypatch):
+    """Logs in a user with 2FA enabled; `otp.sent` collects the codes texted to them, each one distinct"""
+    app.config['OTP_BACKEND'] = request.param
+    monkeypatch.setattr('src.services.otp._memory_store', MemoryOTPStore())
+    codes = (str(number) for number in itertools.count(100001))
+    monkeypatch.setattr('src.routes.auth.generate_otp', lambda: next(codes))
+    sent = []
+    monkeypatch.setattr('src.routes.auth.send_otp_sms', lambda phone, code: sent.append(code))
+    with app.app_context():
+        user = User(email='2fa@mofet.com', full_name='2fa', phone='0500000000', role='user',
+                    is_active=True, otp_enabled=True)
+        user.set_password('secret')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    response = client.post('/api/auth/login', json={'email': '2fa@mofet.com', 'password': 'secret'})
+    assert response.json['requires_otp'] is True
+    return SimpleNamespace(user_id=user_id, sent=sent)
+
+def verify(client, user_id, code):
+    return client.post('/api/auth/verify-otp', json={'user_id': user_id, 'otp_code': code}).status_code
+
+def resend(client, user_id):
+    return client.post('/api/auth/resend-otp', json={'user_id': user_id}).status_code
+
+def test_a_code_works_once(client, otp):
+    code = otp.sent[-1]
+    assert verify(client, otp.user_id, code) == 200
+    assert verify(client, otp.user_id, code) == 401
+
+def test_a_new_code_supersedes_the_old_one(client, otp):
+    old_code = otp.sent[-1]
+    assert resend(client, otp.user_id) == 200
+    assert verify(client, otp.user_id, old_code) == 401
+    assert verify(client, otp.user_id, otp.sent[-1]) == 200
+
+def test_an_expired_code_is_rejected(app, client, otp):
+    app.config['OTP_TTL_SECONDS'] = -1
+    assert resend(client, otp.user_id) == 200
+    assert verify(client, otp.user_id, otp.sent[-1]) == 401
+
+def test_a_code_is_invalidated_after_too_many_failures(app, client, otp):
+    app.config['OTP_VERIFY_LIMIT'] = 3
+    code = otp.sent[-1]
+    assert [verify(client, otp.user_id, WRONG_CODE) for _ in range(3)] == [401, 401, 401]
+    # Even the right code is refused now, until a new one is sent
+    assert verify(client, otp.user_id, code) == 429
+    assert resend(client, otp.user_id) == 200
+    assert verify(client, otp.user_id, otp.sent[-1]) == 200
+
+@pytest.mark.parametrize('otp', ['database'], indirect=True)
+def test_failed_attempts_are_counted_in_the_database(app, client, otp):
+    verify(client, otp.user_id, WRONG_CODE)
+    verify(client, otp.user_id, WRONG_CODE)
+    with app.app_context():
+        live = OTPCode.query.filter_by(user_id=otp.user_id, used=False).one()
+        assert live.attempts == 2
+
+def test_resends_are_limited(app, client, otp):
+    app.config['OTP_RESEND_LIMIT'] = 2
+    assert [resend(client, otp.user_id) for _ in range(3)] == [200, 200, 429]
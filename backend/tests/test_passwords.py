@@ -0,0 +1,71 @@
+import threading
+import time
+
+import pytest
+from src.models.user import db, User
+from src.services import passwords
+
+@pytest.fixture
+def fresh_slots(monkeypatch):
+    """Size the process-wide hashing cap from the next app config that asks for it"""
+    monkeypatch.setattr(passwords, '_slots', None)
+
+class ConcurrencyProbe:
+    """Stands in for a werkzeug hash function and records how many calls overlap"""
+
+    def __init__(self, result):
+        self.result = result
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.02)
+        with self.lock:
+            self.active -= 1
+        return self.result(*args)
+
+def test_login_rehashes_under_a_new_policy(app, client):
+    assert client.post('/api/auth/login', json={'email': 'admin@mofet.com', 'password': 'admin123'}).status_code == 200
+    with app.app_context():
+        assert db.session.get(User, 1).password_hash.startswith('pbkdf2:sha256:1000$')
+
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:2000'
+    assert client.post('/api/auth/login', json={'email': 'admin@mofet.com', 'password': 'admin123'}).status_code == 200
+    with app.app_context():
+        user = db.session.get(User, 1)
+        assert user.password_hash.startswith('pbkdf2:sha256:2000$')
+        assert not user.password_needs_rehash()
+    assert client.post('/api/auth/login', json={'email': 'admin@mofet.com', 'password': 'wrong'}).status_code == 401
+
+def test_verifications_are_capped(app, fresh_slots, monkeypatch):
+    app.config['PASSWORD_HASH_WORKERS'] = 2
+    probe = ConcurrencyProbe(lambda password_hash, password: password_hash == password)
+    monkeypatch.setattr(passwords, 'check_password_hash', probe)
+
+    results = []
+    def verify():
+        with app.app_context():
+            results.append(passwords.verify_password('secret', 'secret'))
+    threads = [threading.Thread(target=verify) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [True] * 8
+    assert probe.peak == 2
+
+def test_bulk_hashing_is_capped_and_ordered(app, fresh_slots, monkeypatch):
+    app.config['PASSWORD_HASH_WORKERS'] = 3
+    probe = ConcurrencyProbe(lambda password: f'hashed:{password}')
+    monkeypatch.setattr(passwords, 'generate_password_hash', probe)
+
+    with app.app_context():
+        hashes = passwords.hash_passwords([str(i) for i in range(10)])
+
+    assert hashes == [f'hashed:{i}' for i in range(10)]
+    assert probe.peak == 3
@@ -0,0 +1,33 @@
+import re
+from src.models.user import db, FormStats
+from src.services.statistics import adjust_stat, rebuild_form_stats
+from conftest import FormFactory, login
+
+def test_adjust_stat_creates_and_increments_with_one_upsert(app, count_statements):
+    with app.app_context():
+        with count_statements() as counter:
+            adjust_stat('status', 'pending', 2)
+            adjust_stat('status', 'pending', 3)
+        db.session.commit()
+        assert [stat.count for stat in FormStats.query.filter_by(scope='status', key='pending')] == [5]
+    assert counter.count == 2
+    assert all('ON CONFLICT' in statement for statement, _ in counter.statements)
+
+def test_my_forms_is_read_from_the_initiator_counter(app, client, count_statements):
+    factory = FormFactory(client)
+    initiator_id = factory.add_user('owner@mofet.com')
+    factory.add_forms(2, initiator_id)
+    template_id = factory.add_template()
+    login(client, initiator_id)
+    response = client.post('/api/forms/bulk', json={'forms': [{'template_id': template_id, 'form_data': {}}] * 3})
+    assert response.status_code == 201, response.json
+
+    client.get('/api/forms/statistics')
+    with count_statements() as counter:
+        response = client.get('/api/forms/statistics')
+    assert response.json['statistics']['my_forms'] == 5
+    # Counting the user's forms would scan the form table
+    assert not any(re.search(r'FROM form\b', statement) for statement, _ in counter.statements)
+
+    with app.app_context():
+        assert rebuild_form_stats() == {}
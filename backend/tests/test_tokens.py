@@ -0,0 +1,84 @@
+import pytest
+from src.services.tokens import load_access_token
+from conftest import login
+
+@pytest.fixture
+def user(admin_client):
+    """A plain user created through the admin API; returns its ID"""
+    response = admin_client.post('/api/admin/users', json={
+        'email': 'token@mofet.com', 'full_name': 'token', 'password': 'secret'
+    })
+    assert response.status_code == 201, response.json
+    return response.json['user']['id']
+
+def tokens(app, email='token@mofet.com', password='secret'):
+    """Log in from a fresh client, so no session cookie stands in for the tokens"""
+    response = app.test_client().post('/api/auth/login', json={'email': email, 'password': password})
+    assert response.status_code == 200, response.json
+    return response.json
+
+def me(app, token):
+    return app.test_client().get('/api/auth/me', headers={'Authorization': f'Bearer {token}'})
+
+def refresh(app, token):
+    return app.test_client().post('/api/auth/refresh', json={'refresh_token': token})
+
+def tampered(token):
+    """The token with the first character of its signature changed"""
+    payload, signature = token.rsplit('.', 1)
+    return f"{payload}.{'A' if signature[0] != 'A' else 'B'}{signature[1:]}"
+
+def test_access_tokens_carry_only_authorization_claims(app, user):
+    access_token = tokens(app)['access_token']
+    with app.app_context():
+        claims = load_access_token(access_token)
+    assert set(claims) == {'sub', 'role', 'type', 'exp'}
+    assert (claims['sub'], claims['role'], claims['type']) == (user, 'user', 'access')
+
+    response = me(app, access_token)
+    assert response.status_code == 200
+    assert response.json['user']['email'] == 'token@mofet.com'
+
+def test_tampered_tokens_are_rejected(app, user):
+    issued = tokens(app)
+    assert me(app, tampered(issued['access_token'])).status_code == 401
+    assert refresh(app, tampered(issued['refresh_token'])).status_code == 401
+
+def test_expired_tokens_are_rejected(app, user):
+    app.config['ACCESS_TOKEN_MAX_AGE'] = -1
+    app.config['REFRESH_TOKEN_MAX_AGE'] = -1
+    issued = tokens(app)
+    assert me(app, issued['access_token']).status_code == 401
+    assert refresh(app, issued['refresh_token']).status_code == 401
+
+def test_each_token_only_works_for_its_own_purpose(app, user):
+    issued = tokens(app)
+    assert refresh(app, issued['access_token']).status_code == 401
+    assert me(app, issued['refresh_token']).status_code == 401
+
+    response = refresh(app, issued['refresh_token'])
+    assert response.status_code == 200
+    assert me(app, response.json['access_token']).status_code == 200
+
+def test_a_deactivated_user_is_refused_with_a_valid_token(app, admin_client, user):
+    issued = tokens(app)
+    assert admin_client.put(f'/api/admin/users/{user}', json={'is_active': False}).status_code == 200
+    assert me(app, issued['access_token']).status_code == 401
+    assert refresh(app, issued['refresh_token']).status_code == 401
+
+@pytest.mark.parametrize('identify_by', ['access_token', 'refresh_token', 'session'])
+def test_logout_revokes_the_users_refresh_tokens(app, user, identify_by):
+    issued, other_device = tokens(app), tokens(app)
+    client = app.test_client()
+    if identify_by == 'access_token':
+        response = client.post('/api/auth/logout', headers={'Authorization': f"Bearer {issued['access_token']}"})
+    elif identify_by == 'refresh_token':
+        response = client.post('/api/auth/logout', json={'refresh_token': issued['refresh_token']})
+    else:
+        login(client, user)
+        response = client.post('/api/auth/logout')
+    assert response.status_code == 200
+
+    assert refresh(app, issued['refresh_token']).status_code == 401
+    assert refresh(app, other_device['refresh_token']).status_code == 401
+    assert refresh(app, tokens(app)['refresh_token']).status_code == 200